@@ -0,0 +1,162 @@
+"""
+Analysis cache module for CyberShield-AI.
+Memoizes /analyze results by a hash of the normalized text and the analyzer version.
+"""
+
+from analysis_store import analysis_store
+from database import mongo
+from inference import hate_speech_analyzer
+from lexicon import normalize
+from repositories import run_db
+from response_cache import InMemoryCacheBackend
+import hashlib
+import logging
+import os
+import time
+
+# Set up logging
+logger = logging.getLogger("analysis_cache")
+
+
+def content_hash(text, version):
+    """Key for one text under one analyzer version; edits that only change case, accents or spacing share a key."""
+    return hashlib.sha256(f"{version}\x00{normalize(text)}".encode("utf-8")).hexdigest()
+
+
+def _result_from_document(doc):
+    return {
+        "isHateSpeech": doc["is_hate_speech"],
+        "matchedTerms": doc["matched_terms"],
+        "score": doc["score"],
+        "modelScore": doc.get("model_score"),
+    }
+
+
+class AnalysisCache:
+    """LRU+TTL memo in front of the analyzer, optionally backed by analysis_results deduplicated on content_hash."""
+
+    def __init__(self, analyzer=None, store=None, collection="analysis_results"):
+        self.analyzer = analyzer or hate_speech_analyzer
+        self.store = store or analysis_store
+        self.collection_name = collection
+        self.ttl = float(os.environ.get("ANALYSIS_CACHE_TTL_SECONDS", "3600"))
+        self.persist = os.environ.get("ANALYSIS_CACHE_PERSIST", "true").lower() == "true"
+        self.memory = InMemoryCacheBackend(int(os.environ.get("ANALYSIS_CACHE_MAX_ENTRIES", "10000")))
+        self.hits = 0
+        self.persisted_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _collection(self):
+        return mongo.get_database()[self.collection_name]
+
+    def _load(self, keys):
+        cursor = self._collection().find(
+            {"content_hash": {"$in": keys}},
+            {"_id": 0, "content_hash": 1, "is_hate_speech": 1, "matched_terms": 1, "score": 1, "model_score": 1}
+        )
+        return {doc["content_hash"]: _result_from_document(doc) for doc in cursor}
+
+    def _remember(self, key, result, now):
+        self.memory.set(key, {"value": result, "expires_at": now + self.ttl})
+
+    async def analyze_many(self, texts, record=True):
+        """
+        Return one result dict per text, running the analyzer only for content it has not seen.
+        With record=False the texts bypass the memo and analysis_results, e.g. windows of a chunked document.
+        """
+        if not record:
+            return [dict(result) for result in await self.analyzer.analyze_many(texts)]
+        version = self.analyzer.version
+        now = time.time()
+        keys = [content_hash(text, version) for text in texts]
+        found = {}
+        for key in set(keys):
+            entry = self.memory.get(key, now)
+            if entry is not None:
+                found[key] = entry["value"]
+        self.hits += sum(1 for key in keys if key in found)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing and self.persist:
+            try:
+                persisted = await run_db(self._load, missing)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Failed to read cached analysis results: {e}")
+                persisted = {}
+            for key, result in persisted.items():
+                found[key] = result
+                self._remember(key, result, now)
+            self.persisted_hits += sum(1 for key in keys if key in persisted)
+            missing = [key for key in missing if key not in persisted]
+
+        if missing:
+            # Duplicates inside one request are analyzed once
+            first_text = {}
+            for key, text in zip(keys, texts):
+                first_text.setdefault(key, text)
+            results = await self.analyzer.analyze_many([first_text[key] for key in missing])
+            self.misses += sum(1 for key in keys if key in first_text and key not in found)
+            for key, result in zip(missing, results):
+                found[key] = result
+                self._remember(key, result, now)
+            if self.persist:
+                # Written in batches by the log pipeline; the response does not wait for it
+                self.store.record([first_text[key] for key in missing], results, missing, version)
+
+        return [dict(found[key]) for key in keys]
+
+    async def analyze(self, text):
+        return (await self.analyze_many([text]))[0]
+
+    async def lookup(self, text):
+        """Cached result for text from memory or analysis_results, or None; never runs the analyzer."""
+        key = content_hash(text, self.analyzer.version)
+        now = time.time()
+        entry = self.memory.get(key, now)
+        if entry is not None:
+            self.hits += 1
+            return dict(entry["value"])
+        if self.persist:
+            try:
+                persisted = await run_db(self._load, [key])
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Failed to read cached analysis results: {e}")
+                persisted = {}
+            if key in persisted:
+                self.persisted_hits += 1
+                self._remember(key, persisted[key], now)
+                return dict(persisted[key])
+        self.misses += 1
+        return None
+
+    def remember(self, text, result):
+        """Cache and persist a result computed outside analyze_many, such as a chunked document's merged result."""
+        version = self.analyzer.version
+        key = content_hash(text, version)
+        now = time.time()
+        # A document analyzed again while still cached is already stored
+        known = self.memory.get(key, now) is not None
+        self._remember(key, result, now)
+        if self.persist and not known:
+            self.store.record([text], [result], [key], version)
+
+    def stats(self):
+        lookups = self.hits + self.persisted_hits + self.misses
+        return {
+            "persist": self.persist,
+            "ttl_seconds": self.ttl,
+            "entries": self.memory.size(),
+            "max_entries": self.memory.max_entries,
+            "hits": self.hits,
+            "persisted_hits": self.persisted_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.persisted_hits) / lookups, 4) if lookups else 0,
+        }
+
+
+# Create a single instance
+analysis_cache = AnalysisCache()
@@ -0,0 +1,150 @@
+"""
+Analysis store module for CyberShield-AI.
+Persists /analyze verdicts to analysis_results off the request path, as excerpts or compressed text, with sampling.
+"""
+
+from bson import Binary
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from database import mongo
+from log_pipeline import LogPipeline
+import logging
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zlib is always available; zstd is used when the package is installed
+    zstandard = None
+
+# Set up logging
+logger = logging.getLogger("analysis_store")
+
+COLLECTION = "analysis_results"
+
+MODE_HASH = "hash"
+MODE_EXCERPT = "excerpt"
+MODE_FULL = "full"
+
+
+def compress(text, codec):
+    raw = text.encode("utf-8")
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    if codec == "zlib":
+        return zlib.compress(raw, 6)
+    return raw
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(bytes(data)).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(bytes(data)).decode("utf-8")
+    return bytes(data).decode("utf-8")
+
+
+def stored_text(doc):
+    """Original text of a document written in full mode, or its excerpt otherwise."""
+    if "text_compressed" in doc:
+        return decompress(doc["text_compressed"], doc.get("compression", "none"))
+    return doc.get("text", doc.get("excerpt"))
+
+
+def _sample_point(content_hash):
+    # Derived from the content hash, so every worker makes the same keep/skip decision for a text
+    return int(content_hash[:8], 16) / 0x100000000
+
+
+def _upsert_writer(collection, documents):
+    """Log pipeline sink: one row per content hash; repeats and replays leave the first row untouched."""
+    try:
+        mongo.get_database()[collection].bulk_write([
+            UpdateOne(
+                {"content_hash": doc["content_hash"]},
+                {"$setOnInsert": {field: value for field, value in doc.items() if field != "content_hash"}},
+                upsert=True
+            )
+            for doc in documents
+        ], ordered=False)
+    except BulkWriteError as e:
+        # Two workers upserting the same new hash: the unique index rejects the loser, which is fine
+        logger.warning(f"Analysis upsert into {collection} skipped {len(e.details.get('writeErrors', []))} documents")
+
+
+class AnalysisStore:
+    """Turns analysis results into compact documents and writes them through a pipeline of their own."""
+
+    def __init__(self, pipeline=None):
+        # Not the audit log pipeline: a burst of /analyze traffic must never push audit records out of its queue
+        self.pipeline = pipeline or LogPipeline(
+            writer=_upsert_writer, name="analysis-pipeline", env_prefix="ANALYSIS_PIPELINE", spill_path="analysis_spill.jsonl"
+        )
+        self.mode = os.environ.get("ANALYSIS_STORE_MODE", MODE_EXCERPT)
+        self.excerpt_chars = int(os.environ.get("ANALYSIS_EXCERPT_CHARS", "200"))
+        self.compression = os.environ.get("ANALYSIS_STORE_COMPRESSION", "zstd" if zstandard is not None else "zlib")
+        if self.compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed; compressing stored analysis text with zlib")
+            self.compression = "zlib"
+        self.sample_positives = float(os.environ.get("ANALYSIS_SAMPLE_POSITIVES", "1.0"))
+        self.sample_negatives = float(os.environ.get("ANALYSIS_SAMPLE_NEGATIVES", "1.0"))
+        self.recorded = 0
+        self.sampled_out = 0
+        self.text_bytes = 0
+        self.stored_bytes = 0
+
+    def start(self):
+        self.pipeline.start()
+
+    def stop(self):
+        self.pipeline.stop()
+
+    def keep(self, key, result):
+        rate = self.sample_positives if result["isHateSpeech"] else self.sample_negatives
+        return rate >= 1.0 or _sample_point(key) < rate
+
+    def document(self, text, result, key, version):
+        doc = {
+            "content_hash": key,
+            "is_hate_speech": result["isHateSpeech"],
+            "matched_terms": result["matchedTerms"],
+            "score": result["score"],
+            "model_score": result["modelScore"],
+            "analyzer_version": version,
+            "text_length": len(text),
+            "timestamp": datetime.utcnow()
+        }
+        if self.mode == MODE_FULL:
+            doc["text_compressed"] = Binary(compress(text, self.compression))
+            doc["compression"] = self.compression
+            self.text_bytes += len(text.encode("utf-8"))
+            self.stored_bytes += len(doc["text_compressed"])
+        elif self.mode == MODE_EXCERPT:
+            doc["excerpt"] = text[:self.excerpt_chars]
+        return doc
+
+    def record(self, texts, results, keys, version):
+        """Queue a write for every sampled result; never blocks on the database."""
+        for text, result, key in zip(texts, results, keys):
+            if not self.keep(key, result):
+                self.sampled_out += 1
+                continue
+            self.pipeline.enqueue(COLLECTION, self.document(text, result, key, version))
+            self.recorded += 1
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "compression": self.compression if self.mode == MODE_FULL else None,
+            "sample_positives": self.sample_positives,
+            "sample_negatives": self.sample_negatives,
+            "recorded": self.recorded,
+            "sampled_out": self.sampled_out,
+            "compression_ratio": round(self.stored_bytes / self.text_bytes, 4) if self.text_bytes else None,
+            "pipeline": self.pipeline.stats(),
+        }
+
+
+# Create a single instance
+analysis_store = AnalysisStore()
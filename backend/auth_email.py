@@ -3,15 +3,18 @@ import firebase_admin
 from firebase_admin import auth, credentials
 from fastapi import APIRouter, HTTPException, Depends, Form, Request
 from pydantic import BaseModel, EmailStr, validator
-from pymongo import MongoClient
 from security_logger import security_logger
-import bcrypt
+from password_hasher import password_hasher
+from rate_limiter import login_rate_limiter
+from dashboard_metrics import dashboard_metrics
+from repositories import repos, run_db
+from database import get_db
+from validators import ALLOWED_EMAIL_DOMAINS, ALLOWED_EMAIL_DOMAINS_ORDERED, email_domain, evaluate_password_strength, validate_password
 from datetime import datetime
 import pytz  # Add this import for timezone conversion
 from fastapi.responses import JSONResponse, RedirectResponse
 from typing import Optional
 import logging
-import re
 import os
 import traceback
 import time
@@ -36,76 +39,11 @@ if not firebase_admin._apps:
 
 router = APIRouter()
 
-# Password strength evaluation function
-def evaluate_password_strength(password: str) -> int:
-    strength = 0
-    if len(password) >= 8:
-        strength += 1
-    if re.search(r"[a-z]", password) and re.search(r"[A-Z]", password):
-        strength += 1
-    if re.search(r"[0-9]", password):
-        strength += 1
-    if re.search(r"[^a-zA-Z0-9]", password):
-        strength += 1
-    return strength
-
-# Password validation function
-def validate_password(password: str) -> bool:
-    if len(password) < 8:
-        raise HTTPException(status_code=400, detail="Password must be at least 8 characters.")
-    if len(password) > 64:
-        raise HTTPException(status_code=400, detail="Password must be at most 64 characters.")
-    return True
-
-# MongoDB connection function with better error handling
-def get_db():
-    MONGO_URI = os.environ.get("MONGO_URI", "mongodb://cybershield-mongodb:27017/cybershield_db")
-    logger.info(f"Connecting to MongoDB at: {MONGO_URI}")
-    
-    try:
-        # Create a client with explicit timeouts
-        client = MongoClient(
-            MONGO_URI,
-            serverSelectionTimeoutMS=5000,  # 5 second timeout for server selection
-            connectTimeoutMS=5000,          # 5 second timeout for initial connection
-            socketTimeoutMS=30000           # 30 second timeout for operations
-        )
-        
-        # Determine database name
-        if MONGO_URI.endswith("/cybershield_db"):
-            db_name = MONGO_URI.split("/")[-1]
-        else:
-            db_name = 'cybershield_db'
-            
-        db = client[db_name]
-        
-        # Test the connection
-        client.admin.command('ping')
-        logger.info("MongoDB connection successful")
-        
-        # Ensure critical collections exist
-        collections = db.list_collection_names()
-        logger.info(f"Available collections: {collections}")
-        
-        if "users" not in collections:
-            db.create_collection("users")
-            logger.info("Created users collection")
-            
-        if "login_logs" not in collections:
-            db.create_collection("login_logs")
-            logger.info("Created login_logs collection")
-            
-        return db
-    except Exception as e:
-        logger.error(f"MongoDB connection error: {e}")
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Database connection error: {str(e)}")
-
 # Function to create login log with robust error handling
 # This function is kept for backward compatibility but uses the security_logger internally
-def create_login_log(email, status, reason=None, source=None):
+async def create_login_log(email, status, reason=None, source=None):
     try:
-        return security_logger.log_login_attempt(
+        return await security_logger.log_login_attempt(
             email=email,
             status=status,
             reason=reason,
@@ -115,15 +53,8 @@ def create_login_log(email, status, reason=None, source=None):
         logger.error(f"Failed to create login log through security_logger: {e}")
         logger.error(traceback.format_exc())
         
-        # Fallback to direct MongoDB connection
+        # Fallback to a direct write through the login_logs repository
         try:
-            client = MongoClient("mongodb://cybershield-mongodb:27017")
-            db = client.cybershield_db
-            
-            # Ensure login_logs collection exists
-            if "login_logs" not in db.list_collection_names():
-                db.create_collection("login_logs")
-            
             # Create log document
             log_doc = {
                 "email": email,
@@ -135,13 +66,12 @@ def create_login_log(email, status, reason=None, source=None):
             if reason:
                 log_doc["reason"] = reason
             
-            # Insert document with write concern
-            result = db.login_logs.insert_one(log_doc, write_concern={"w": 1})
+            result = await repos.login_logs.insert_one(log_doc)
             logger.info(f"Created login log with ID: {result.inserted_id}")
             
             return result.inserted_id
         except Exception as inner_e:
-            logger.error(f"Failed to create login log with direct MongoDB: {inner_e}")
+            logger.error(f"Failed to create login log with direct write: {inner_e}")
             logger.error(traceback.format_exc())
             # Don't raise exception - logging should not interrupt main flow
             return None
@@ -179,35 +109,33 @@ async def register_user(
     # Normalize email
     email = email.strip().lower()
     
-    allowed_domains = ['gmail.com', 'yahoo.com', 'charusat.edu.in', 'charusat.ac.in']
-    
-    try:
-        domain = email.split('@')[1]
-    except IndexError:
+    domain = email_domain(email)
+    if domain is None:
         # Log validation failure
-        security_logger.log_security_event(
+        await security_logger.log_security_event(
             event_type="validation_failure",
             severity="medium",
             details={"email": email, "reason": "invalid_format"},
         )
         raise HTTPException(status_code=400, detail="Invalid email format")
         
-    if domain not in allowed_domains:
+    if domain not in ALLOWED_EMAIL_DOMAINS:
         # Log domain restriction
-        security_logger.log_security_event(
+        await security_logger.log_security_event(
             event_type="domain_restriction",
             severity="medium",
-            details={"email": email, "domain": domain, "allowed_domains": allowed_domains},
+            details={"email": email, "domain": domain, "allowed_domains": list(ALLOWED_EMAIL_DOMAINS_ORDERED)},
         )
         raise HTTPException(status_code=400, detail="Invalid email domain. Please use gmail.com, yahoo.com, charusat.edu.in, or charusat.ac.in")
     
-    validate_password(password)
+    # Length limits only; strength is scored below so weak attempts can be logged
+    validate_password(password, min_strength=0)
     
     # Evaluate password strength
     password_strength = evaluate_password_strength(password)
     if password_strength < 4:
         # Log weak password attempt
-        security_logger.log_security_event(
+        await security_logger.log_security_event(
             event_type="weak_password",
             severity="medium",
             details={"email": email, "strength": password_strength},
@@ -215,16 +143,12 @@ async def register_user(
         raise HTTPException(status_code=400, detail="Password is too weak. Please use a stronger password.")
 
     try:
-        # Get database connection
-        db = get_db()
-        users_collection = db["users"]
-        
         # Check if user already exists
-        existing_user = users_collection.find_one({"email": email})
+        existing_user = await repos.users.find_by_email(email, {"_id": 1})
         if existing_user:
             # Log registration attempt for existing user
             ip_address, user_agent = _extract_request_info(request)
-            security_logger.log_login_attempt(
+            await security_logger.log_login_attempt(
                 email=email,
                 status="failed",
                 reason="user_already_exists",
@@ -234,22 +158,23 @@ async def register_user(
             )
             raise HTTPException(status_code=409, detail="User with this email already exists")
             
-        # Hash the password
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        # Hash the password on the bounded hashing pool
+        hashed_password = await password_hasher.hash(password)
 
         # Insert user data into MongoDB
         user_data = {
             "email": email,
-            "hashed_password": hashed_password.decode('utf-8'),
+            "hashed_password": hashed_password,
             "created_at": datetime.utcnow(),
         }
         
-        result = users_collection.insert_one(user_data)
+        result = await repos.users.insert_one(user_data)
+        await dashboard_metrics.record_user_created(user_data["created_at"])
         user_id = str(result.inserted_id)
         
         # Log successful registration using enhanced security logger
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_login_attempt(
+        await security_logger.log_login_attempt(
             email=email,
             status="register_success",
             source="register_endpoint",
@@ -259,7 +184,7 @@ async def register_user(
         
         # Log access
         duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/register",
             method="POST",
             user_id=user_id,
@@ -274,7 +199,7 @@ async def register_user(
         # Log API access for failed request
         duration_ms = round((time.time() - start_time) * 1000)
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/register",
             method="POST",
             ip_address=ip_address,
@@ -288,7 +213,7 @@ async def register_user(
         logger.error(traceback.format_exc())
         
         # Log unexpected error
-        security_logger.log_security_event(
+        await security_logger.log_security_event(
             event_type="registration_error",
             severity="high",
             details={"email": email, "error": str(e), "traceback": traceback.format_exc()},
@@ -297,7 +222,7 @@ async def register_user(
         # Log API access for failed request
         duration_ms = round((time.time() - start_time) * 1000)
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/register",
             method="POST",
             ip_address=ip_address,
@@ -320,23 +245,38 @@ async def login_user(
     email = email.strip().lower()
     
     try:
-        # Get database connection
         logger.info(f"Login attempt for: {email}")
-        db = get_db()
-        users_collection = db["users"]
-        
-        # Retrieve user from MongoDB
-        user = users_collection.find_one({"email": email})
         
         # Extract request information for logging
         ip_address, user_agent = _extract_request_info(request)
         
+        # Reject locked-out emails and IPs before touching the database or bcrypt
+        retry_after = await login_rate_limiter.lockout_remaining(email, ip_address)
+        if retry_after:
+            logger.info(f"Login blocked: too many failed attempts for {email} / {ip_address}")
+            await security_logger.log_login_attempt(
+                email=email,
+                status="blocked",
+                reason="rate_limited",
+                source="login_endpoint",
+                ip_address=ip_address,
+                user_agent=user_agent
+            )
+            raise HTTPException(
+                status_code=429,
+                detail="Too many failed login attempts. Please try again later.",
+                headers={"Retry-After": str(retry_after)}
+            )
+        
+        # Retrieve user from MongoDB
+        user = await repos.users.find_by_email(email)
+        
         # Check if user exists
         if not user:
             logger.info(f"Login failed: User not found for email {email}")
             
             # Log failed login attempt with enhanced security logger
-            security_logger.log_login_attempt(
+            await security_logger.log_login_attempt(
                 email=email,
                 status="failed",
                 reason="user_not_found",
@@ -345,36 +285,22 @@ async def login_user(
                 user_agent=user_agent
             )
             
-            # Log security event for multiple failed attempts (example)
-            failed_attempts = db.login_logs.count_documents({
-                "email": email,
-                "status": "failed",
-                "timestamp": {"$gte": datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)}
-            })
-            
-            if failed_attempts >= 3:
-                security_logger.log_security_event(
-                    event_type="multiple_failed_logins",
-                    severity="medium",
-                    details={"email": email, "count": failed_attempts, "time_window": "today"}
-                )
+            # Count towards the lockout; threshold alerts come from the threat detector
+            await login_rate_limiter.record_failure(email, ip_address, "user_not_found")
             
             raise HTTPException(status_code=404, detail="User not found")
         
         # Get the stored hashed password
         stored_hash = user["hashed_password"]
         
-        # Verify password
-        password_correct = bcrypt.checkpw(
-            password.encode('utf-8'),
-            stored_hash.encode('utf-8')
-        )
+        # Verify password on the bounded hashing pool
+        password_correct = await password_hasher.check(password, stored_hash)
         
         if not password_correct:
             logger.info(f"Login failed: Incorrect password for {email}")
             
             # Log failed login with enhanced security logger
-            security_logger.log_login_attempt(
+            await security_logger.log_login_attempt(
                 email=email,
                 status="failed",
                 reason="incorrect_password",
@@ -383,32 +309,19 @@ async def login_user(
                 user_agent=user_agent
             )
             
-            # Check for multiple failed password attempts
-            failed_pwd_attempts = db.login_logs.count_documents({
-                "email": email,
-                "status": "failed",
-                "reason": "incorrect_password",
-                "timestamp": {"$gte": datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)}
-            })
-            
-            if failed_pwd_attempts >= 5:
-                security_logger.log_security_event(
-                    event_type="password_guessing",
-                    severity="high",
-                    details={
-                        "email": email,
-                        "attempts": failed_pwd_attempts,
-                        "ip_address": ip_address
-                    }
-                )
+            # Count towards the lockout; threshold alerts come from the threat detector
+            await login_rate_limiter.record_failure(email, ip_address, "incorrect_password")
             
             raise HTTPException(status_code=401, detail="Incorrect password")
         
         # Password is correct, login successful
         logger.info(f"Login SUCCESS: User {email} authenticated successfully")
         
+        # Earlier failures from this caller no longer count towards a lockout
+        await login_rate_limiter.reset(email, ip_address)
+        
         # Log successful login with enhanced security logger
-        log_id = security_logger.log_login_attempt(
+        log_id = await security_logger.log_login_attempt(
             email=email,
             status="success",
             source="login_endpoint",
@@ -421,7 +334,7 @@ async def login_user(
         
         # Log API access
         duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/login",
             method="POST",
             user_id=user_id,
@@ -453,7 +366,7 @@ async def login_user(
         # Log API access for failed request
         duration_ms = round((time.time() - start_time) * 1000)
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/login",
             method="POST",
             ip_address=ip_address,
@@ -467,7 +380,7 @@ async def login_user(
         logger.error(traceback.format_exc())
         
         # Log unexpected error
-        security_logger.log_security_event(
+        await security_logger.log_security_event(
             event_type="login_error",
             severity="high",
             details={"email": email, "error": str(e), "traceback": traceback.format_exc()},
@@ -476,7 +389,7 @@ async def login_user(
         # Log API access for error
         duration_ms = round((time.time() - start_time) * 1000)
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/login",
             method="POST",
             ip_address=ip_address,
@@ -494,7 +407,6 @@ async def check_logs(request: Request):
     
     try:
         db = get_db()
-        login_logs_collection = db["login_logs"]
         
         # Insert a test document
         test_doc = {
@@ -504,19 +416,19 @@ async def check_logs(request: Request):
             "source": "check_logs_endpoint"
         }
         
-        test_result = login_logs_collection.insert_one(test_doc)
+        test_result = await repos.login_logs.insert_one(test_doc)
         logger.info(f"Inserted test document with ID: {test_result.inserted_id}")
         
         # Count documents
-        log_count = login_logs_collection.count_documents({})
+        log_count = await repos.login_logs.count_documents({})
         
         # Use enhanced security logger to get logs
-        logs = security_logger.get_security_logs(log_type="login_logs", limit=10)
+        logs = await security_logger.get_security_logs(log_type="login_logs", limit=10)
         
         # Log API access
         duration_ms = round((time.time() - start_time) * 1000)
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/check-logs",
             method="GET",
             ip_address=ip_address,
@@ -539,7 +451,7 @@ async def check_logs(request: Request):
         # Log API error
         duration_ms = round((time.time() - start_time) * 1000)
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/check-logs",
             method="GET",
             ip_address=ip_address,
@@ -559,17 +471,16 @@ async def view_login_logs(request: Request):
     
     try:
         # Use security logger to get logs
-        login_logs = security_logger.get_security_logs(log_type="login_logs", limit=100)
+        login_logs = await security_logger.get_security_logs(log_type="login_logs", limit=100)
         
         # Get users for reference
-        db = get_db()
-        users = list(db.users.find({}, {"email": 1}))
+        users = await repos.users.find({}, {"email": 1})
         user_emails = [user.get("email") for user in users]
         
         # Log API access
         duration_ms = round((time.time() - start_time) * 1000)
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/view-login-logs",
             method="GET",
             ip_address=ip_address,
@@ -592,7 +503,7 @@ async def view_login_logs(request: Request):
         # Log API error
         duration_ms = round((time.time() - start_time) * 1000)
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/view-login-logs",
             method="GET",
             ip_address=ip_address,
@@ -611,16 +522,10 @@ async def direct_logs(request: Request):
     start_time = time.time()
     
     try:
-        # Direct MongoDB connection
-        client = MongoClient("mongodb://cybershield-mongodb:27017")
-        db = client.cybershield_db
+        db = get_db()
         
         # Check all collections
-        collections = db.list_collection_names()
-        
-        # Ensure login_logs collection exists
-        if "login_logs" not in collections:
-            db.create_collection("login_logs")
+        collections = await run_db(db.list_collection_names)
         
         # Insert a test document
         test_doc = {
@@ -630,18 +535,18 @@ async def direct_logs(request: Request):
             "source": "direct_logs_endpoint"
         }
         
-        result = db.login_logs.insert_one(test_doc)
+        result = await repos.login_logs.insert_one(test_doc)
         logger.info(f"Inserted direct test document with ID: {result.inserted_id}")
         
         # Get all types of logs using security logger
-        login_logs = security_logger.get_security_logs(log_type="login_logs", limit=50)
-        security_events = security_logger.get_security_logs(log_type="security_events", limit=20)
-        access_logs = security_logger.get_security_logs(log_type="access_logs", limit=20)
+        login_logs = await security_logger.get_security_logs(log_type="login_logs", limit=50)
+        security_events = await security_logger.get_security_logs(log_type="security_events", limit=20)
+        access_logs = await security_logger.get_security_logs(log_type="access_logs", limit=20)
         
         # Log API access
         duration_ms = round((time.time() - start_time) * 1000)
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/direct-logs",
             method="GET",
             ip_address=ip_address,
@@ -667,7 +572,7 @@ async def direct_logs(request: Request):
         # Log API error
         duration_ms = round((time.time() - start_time) * 1000)
         ip_address, user_agent = _extract_request_info(request)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/direct-logs",
             method="GET",
             ip_address=ip_address,
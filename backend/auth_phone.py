@@ -1,13 +1,18 @@
 import firebase_admin
 from firebase_admin import auth, credentials
-from fastapi import APIRouter, HTTPException, Depends, Form
+from fastapi import APIRouter, HTTPException, Depends, Form, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import re
-from pymongo import MongoClient
 from datetime import datetime
+from repositories import repos
+from log_pipeline import log_pipeline
+from token_verifier import token_verifier
+from validators import is_valid_indian_phone
+from pagination import EXPORT_MAX_ROWS, date_range_filter, iter_batches, stream_json_object
 import os
 import logging
 import traceback
+from typing import Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -37,63 +42,9 @@ class VerifyOTP(BaseModel):
     phone_number: str
     id_token: str  # Firebase ID token after OTP verification
 
-# Phone number validation function (Indian Format)
-def is_valid_phone_number(phone: str) -> bool:
-    """Validate Indian phone number format (+91XXXXXXXXXX)"""
-    return bool(re.fullmatch(r"^\+91[6-9]\d{9}$", phone))
-
-# MongoDB connection function with better error handling
-def get_db():
-    MONGO_URI = os.environ.get("MONGO_URI", "mongodb://cybershield-mongodb:27017/cybershield_db")
-    logger.info(f"Connecting to MongoDB at: {MONGO_URI}")
-    
-    try:
-        # Create a client with explicit timeouts
-        client = MongoClient(
-            MONGO_URI,
-            serverSelectionTimeoutMS=5000,  # 5 second timeout for server selection
-            connectTimeoutMS=5000,          # 5 second timeout for initial connection
-            socketTimeoutMS=30000           # 30 second timeout for operations
-        )
-        
-        # Determine database name
-        if MONGO_URI.endswith("/cybershield_db"):
-            db_name = MONGO_URI.split("/")[-1]
-        else:
-            db_name = 'cybershield_db'
-            
-        db = client[db_name]
-        
-        # Test the connection
-        client.admin.command('ping')
-        logger.info("MongoDB connection successful")
-        
-        # Ensure phone_verifications collection exists
-        collections = db.list_collection_names()
-        if "phone_verifications" not in collections:
-            db.create_collection("phone_verifications")
-            logger.info("Created phone_verifications collection")
-        
-        # Create index on phone_number for faster lookups
-        db.phone_verifications.create_index("phone_number")
-        
-        return db
-    except Exception as e:
-        logger.error(f"MongoDB connection error: {e}")
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Database connection error: {str(e)}")
-
-# Function to create activity log with robust error handling
+# Function to create activity log; written in batches by the shared log pipeline
 def create_phone_log(phone_number, status, reason=None, source=None):
     try:
-        # Use a direct connection for logging to minimize middleware issues
-        client = MongoClient("mongodb://cybershield-mongodb:27017")
-        db = client.cybershield_db
-        
-        # Ensure login_logs collection exists
-        if "phone_logs" not in db.list_collection_names():
-            db.create_collection("phone_logs")
-        
         # Create log document
         log_doc = {
             "phone_number": phone_number,
@@ -105,14 +56,9 @@ def create_phone_log(phone_number, status, reason=None, source=None):
         if reason:
             log_doc["reason"] = reason
         
-        # Insert document with write concern
-        result = db.phone_logs.insert_one(log_doc, write_concern={"w": 1})
-        logger.info(f"Created phone log with ID: {result.inserted_id}")
-        
-        return result.inserted_id
+        return log_pipeline.enqueue("phone_logs", log_doc)
     except Exception as e:
-        logger.error(f"Failed to create phone log: {e}")
-        logger.error(traceback.format_exc())
+        logger.error(f"Failed to queue phone log: {e}")
         # Don't raise exception - logging should not interrupt main flow
         return None
 
@@ -123,7 +69,7 @@ async def send_otp(user: UserPhone):
         phone_number = user.phone_number.strip()
         logger.info(f"OTP request for phone number: {phone_number}")
         
-        if not is_valid_phone_number(phone_number):
+        if not is_valid_indian_phone(phone_number):
             logger.warning(f"Invalid phone number format: {phone_number}")
             create_phone_log(phone_number, "invalid_format", "Invalid phone number format")
             raise HTTPException(
@@ -150,14 +96,14 @@ async def send_otp(user: UserPhone):
 
 # Endpoint to verify OTP
 @router.post("/verify-otp")
-async def verify_otp(user: VerifyOTP, db = Depends(get_db)):
+async def verify_otp(user: VerifyOTP):
     try:
         phone_number = user.phone_number.strip()
         id_token = user.id_token
         
         logger.info(f"Verifying OTP for phone number: {phone_number}")
         
-        if not is_valid_phone_number(phone_number):
+        if not is_valid_indian_phone(phone_number):
             logger.warning(f"Invalid phone number format in verification: {phone_number}")
             create_phone_log(phone_number, "verification_failed", "Invalid phone number format")
             raise HTTPException(
@@ -166,8 +112,8 @@ async def verify_otp(user: VerifyOTP, db = Depends(get_db)):
             )
         
         try:
-            # Verify the Firebase token
-            decoded_token = auth.verify_id_token(id_token)
+            # Verify the Firebase token against cached signing keys; repeats are served from the token cache
+            decoded_token = await token_verifier.verify(id_token)
             
             # Check if the phone number matches
             if "phone_number" not in decoded_token:
@@ -191,12 +137,6 @@ async def verify_otp(user: VerifyOTP, db = Depends(get_db)):
                     detail="Phone number in token does not match the provided phone number."
                 )
                 
-            # Store phone verification in MongoDB
-            phone_verifications_collection = db["phone_verifications"]
-            
-            # Check if this phone has been verified before
-            existing_verification = phone_verifications_collection.find_one({"phone_number": phone_number})
-            
             verification_data = {
                 "phone_number": phone_number,
                 "firebase_uid": decoded_token["uid"],
@@ -205,18 +145,11 @@ async def verify_otp(user: VerifyOTP, db = Depends(get_db)):
                 "ip_address": decoded_token.get("ip_address", "unknown")
             }
             
-            if existing_verification:
-                # Update existing verification
-                phone_verifications_collection.update_one(
-                    {"phone_number": phone_number},
-                    {"$set": verification_data}
-                )
-                logger.info(f"Updated verification for phone number: {phone_number}")
-            else:
-                # Create new verification record
-                verification_data["created_at"] = datetime.utcnow()
-                phone_verifications_collection.insert_one(verification_data)
-                logger.info(f"New verification for phone number: {phone_number}")
+            # One atomic upsert creates or refreshes the record; created_at is only set on first verification
+            is_new = await repos.phone_verifications.record_verification(
+                phone_number, verification_data, verification_data["verified_at"]
+            )
+            logger.info(f"{'New' if is_new else 'Updated'} verification for phone number: {phone_number}")
             
             # Log the successful verification
             create_phone_log(phone_number, "verification_success", source="verify_otp_endpoint")
@@ -227,16 +160,17 @@ async def verify_otp(user: VerifyOTP, db = Depends(get_db)):
                 "firebase_uid": decoded_token["uid"]
             }
             
-        except auth.InvalidIdTokenError as token_error:
-            logger.warning(f"Invalid token: {token_error}")
-            create_phone_log(phone_number, "verification_failed", f"Invalid token: {str(token_error)}")
-            raise HTTPException(status_code=401, detail="Invalid authentication token")
-            
+        # ExpiredIdTokenError subclasses InvalidIdTokenError, so it has to be caught first
         except auth.ExpiredIdTokenError:
             logger.warning(f"Expired token for phone: {phone_number}")
             create_phone_log(phone_number, "verification_failed", "Expired token")
             raise HTTPException(status_code=401, detail="Token has expired. Please authenticate again.")
             
+        except auth.InvalidIdTokenError as token_error:
+            logger.warning(f"Invalid token: {token_error}")
+            create_phone_log(phone_number, "verification_failed", f"Invalid token: {str(token_error)}")
+            raise HTTPException(status_code=401, detail="Invalid authentication token")
+            
     except HTTPException as http_exception:
         raise http_exception
     except Exception as e:
@@ -246,17 +180,16 @@ async def verify_otp(user: VerifyOTP, db = Depends(get_db)):
 
 # Endpoint to check verification status
 @router.get("/verification-status/{phone_number}")
-async def verification_status(phone_number: str, db = Depends(get_db)):
+async def verification_status(phone_number: str):
     try:
-        if not is_valid_phone_number(phone_number):
+        if not is_valid_indian_phone(phone_number):
             raise HTTPException(
                 status_code=400,
                 detail="Invalid phone number format. Use Indian format (+91XXXXXXXXXX)."
             )
         
         # Check if the phone number has been verified
-        phone_verifications_collection = db["phone_verifications"]
-        verification = phone_verifications_collection.find_one({"phone_number": phone_number})
+        verification = await repos.phone_verifications.find_by_phone(phone_number)
         
         if not verification:
             return {
@@ -280,18 +213,17 @@ async def verification_status(phone_number: str, db = Depends(get_db)):
 
 # Check phone logs
 @router.get("/check-logs", tags=["logs"])
-async def check_phone_logs():
-    """View phone authentication logs."""
+async def check_phone_logs(
+    limit: int = Query(1000, ge=1, le=EXPORT_MAX_ROWS, description="Maximum phone logs and verifications to return"),
+    from_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    to_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
+):
+    """View phone authentication logs, streamed in bounded batches."""
     try:
-        # Use direct MongoDB connection
-        client = MongoClient("mongodb://cybershield-mongodb:27017")
-        db = client.cybershield_db
+        log_filter = date_range_filter(from_date, to_date)
         
-        # Ensure phone_logs collection exists
-        collections = db.list_collection_names()
-        if "phone_logs" not in collections:
-            db.create_collection("phone_logs")
-            
+        # Seed an empty phone_logs collection with a test document
+        if not await repos.phone_logs.find_one({}, {"_id": 1}):
             # Insert a test document
             test_doc = {
                 "phone_number": "+911234567890",
@@ -299,41 +231,41 @@ async def check_phone_logs():
                 "status": "test",
                 "source": "check_phone_logs_endpoint"
             }
-            db.phone_logs.insert_one(test_doc)
+            await repos.phone_logs.insert_one(test_doc)
             logger.info("Created phone_logs collection with test document")
-        
-        # Get all logs
-        phone_logs = list(db.phone_logs.find().sort("timestamp", -1))
-        logger.info(f"Found {len(phone_logs)} phone log documents")
-        
-        # Format response
-        formatted_logs = [
-            {
-                "id": str(log.get("_id")),
-                "phone_number": log.get("phone_number", ""),
-                "timestamp": str(log.get("timestamp", "")),
-                "status": log.get("status", ""),
-                "reason": log.get("reason", ""),
-                "source": log.get("source", "")
-            }
-            for log in phone_logs
-        ]
-        
-        # Get verifications for reference
-        verifications = list(db.phone_verifications.find({}, {"phone_number": 1}))
-        verified_phones = [v.get("phone_number") for v in verifications]
-        
-        return {
-            "message": "Phone logs retrieved",
-            "phone_logs_count": len(phone_logs),
-            "verification_count": len(verifications),
-            "verified_phones": verified_phones,
-            "phone_logs": formatted_logs
-        }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in check_phone_logs: {e}")
         logger.error(traceback.format_exc())
         return {
             "error": str(e),
             "traceback": traceback.format_exc()
-        }
\ No newline at end of file
+        }
+    
+    def format_log(log):
+        return {
+            "id": str(log.get("_id")),
+            "phone_number": log.get("phone_number", ""),
+            "timestamp": str(log.get("timestamp", "")),
+            "status": log.get("status", ""),
+            "reason": log.get("reason", ""),
+            "source": log.get("source", "")
+        }
+    
+    phone_logs = iter_batches(
+        repos.phone_logs, log_filter, format_log, limit=limit,
+        projection={"phone_number": 1, "timestamp": 1, "status": 1, "reason": 1, "source": 1}
+    )
+    verified_phones = iter_batches(
+        repos.phone_verifications, {}, lambda verification: verification.get("phone_number"),
+        limit=limit, projection={"phone_number": 1}, field=None
+    )
+    return StreamingResponse(
+        stream_json_object([
+            ("message", "Phone logs retrieved", None),
+            ("phone_logs", phone_logs, "phone_logs_count"),
+            ("verified_phones", verified_phones, "verification_count"),
+        ]),
+        media_type="application/json"
+    )
@@ -0,0 +1,149 @@
+"""
+Dashboard query benchmark for CyberShield-AI.
+Compares round trips and latency of the per-metric dashboard queries against the $facet query plans.
+
+Needs a scratch MongoDB database; it is dropped and reseeded for every size:
+
+    python benchmarks/dashboard_bench.py --uri mongodb://localhost:27017 --rows 1000000 10000000
+"""
+
+from datetime import datetime, timedelta
+from pymongo import MongoClient, monitoring
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboard_metrics import DashboardMetrics  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+from security_dashboard import threats_analysis_plan  # noqa: E402
+
+SEED_BATCH = 10000
+
+
+class RoundTripCounter(monitoring.CommandListener):
+    """Counts commands sent to the server, including getMore batches."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name in ("aggregate", "count", "find", "getMore"):
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def seed(db, rows, rng):
+    for name in ("login_logs", "security_events", "users"):
+        db.drop_collection(name)
+    ensure_indexes(db)
+    now = datetime.utcnow()
+    emails = [f"user{i}@gmail.com" for i in range(max(1, rows // 50))]
+    ips = [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(max(1, rows // 200))]
+
+    def login(_):
+        failed = rng.random() < 0.2
+        return {
+            "email": rng.choice(emails),
+            "status": "failed" if failed else "success",
+            "reason": rng.choice(["incorrect_password", "user_not_found"]) if failed else None,
+            "ip_address": rng.choice(ips),
+            "timestamp": now - timedelta(seconds=rng.randrange(30 * 86400)),
+        }
+
+    def event(_):
+        return {
+            "event_type": rng.choice(["password_guessing", "brute_force", "domain_restriction", "weak_password"]),
+            "severity": rng.choice(["low", "medium", "high", "critical"]),
+            "timestamp": now - timedelta(seconds=rng.randrange(30 * 86400)),
+            "details": {"email": rng.choice(emails)},
+        }
+
+    for name, factory, count in (("login_logs", login, rows), ("security_events", event, rows // 10)):
+        for start in range(0, count, SEED_BATCH):
+            db[name].insert_many([factory(i) for i in range(min(SEED_BATCH, count - start))], ordered=False)
+    db.users.insert_many([{"email": email, "created_at": now - timedelta(days=rng.randrange(60))} for email in emails])
+
+
+def legacy_summary(db):
+    # The per-metric queries the summary endpoint issued before it was materialized
+    now = datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today_start - timedelta(days=7)
+    db.login_logs.count_documents({"status": "success"})
+    db.login_logs.count_documents({"status": "success", "timestamp": {"$gte": today_start}})
+    db.login_logs.count_documents({"status": "failed"})
+    db.login_logs.count_documents({"status": "failed", "timestamp": {"$gte": today_start}})
+    for severity in ("high", "medium", "low"):
+        db.security_events.count_documents({"severity": severity})
+    db.users.count_documents({})
+    db.users.count_documents({"created_at": {"$gte": today_start}})
+    list(db.login_logs.aggregate([
+        {"$match": {"timestamp": {"$gte": week_start}}},
+        {"$group": {"_id": {"date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}, "status": "$status"}, "count": {"$sum": 1}}},
+    ]))
+    list(db.security_events.find().sort("timestamp", -1).limit(10))
+
+
+def legacy_threats(db):
+    # One aggregation per metric, issued one after another
+    plan = threats_analysis_plan()
+    for collection in plan.collections:
+        for name, (match, stages) in plan._facets[collection].items():
+            list(db[collection].aggregate([{"$match": match}] + stages, allowDiskUse=True))
+
+
+def measure(fn, db, counter, repeat):
+    latencies = []
+    trips = 0
+    for _ in range(repeat):
+        counter.count = 0
+        started = time.perf_counter()
+        fn(db)
+        latencies.append((time.perf_counter() - started) * 1000)
+        trips = counter.count
+    return trips, statistics.median(latencies), min(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dashboard queries: per-metric vs $facet plans")
+    parser.add_argument("--uri", default=os.environ.get("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="cybershield_bench")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000, 10000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data already in --database")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    counter = RoundTripCounter()
+    db = MongoClient(args.uri, event_listeners=[counter])[args.database]
+    metrics = DashboardMetrics()
+    variants = [
+        ("summary", "per-metric", legacy_summary),
+        ("summary", "facet", metrics.compute),
+        ("threats", "per-metric", legacy_threats),
+        ("threats", "facet", lambda database: threats_analysis_plan().execute(database)),
+    ]
+
+    print(f"{'rows':>10} {'report':>8} {'variant':>11} {'round_trips':>12} {'median_ms':>10} {'best_ms':>9}")
+    for rows in args.rows:
+        if not args.skip_seed:
+            started = time.perf_counter()
+            seed(db, rows, random.Random(args.seed))
+            print(f"seeded {rows} login rows in {time.perf_counter() - started:.0f}s")
+        for report, variant, fn in variants:
+            trips, median, best = measure(fn, db, counter, args.repeat)
+            print(f"{rows:>10} {report:>8} {variant:>11} {trips:>12} {median:>10.1f} {best:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Lexicon benchmark for CyberShield-AI.
+Measures compile time and per-text match latency as the lexicon grows, against the old substring loop.
+
+Runs in-process, no backend needed:
+
+    python benchmarks/lexicon_bench.py --sizes 3 1000 10000 50000 --texts 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexicon import LexiconEngine  # noqa: E402
+
+SAMPLE_WORDS = (
+    "the quick brown fox jumps over lazy dog this is a normal friendly message about skills "
+    "classroom assassin grasshopper chateau whatever we should meet tomorrow at the station"
+).split()
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def synthetic_lexicon(size, rng):
+    terms = {"hate*", "kill*", "stupid*"}
+    while len(terms) < size:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+        terms.add(word + "*" if rng.random() < 0.1 else word)
+    return [(term, 1.0) for term in sorted(terms)]
+
+
+def synthetic_texts(count, rng, lexicon):
+    texts = []
+    for _ in range(count):
+        words = [rng.choice(SAMPLE_WORDS) for _ in range(rng.randint(10, 60))]
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), rng.choice(lexicon)[0].rstrip("*"))
+        texts.append(" ".join(words))
+    return texts
+
+
+def substring_loop(keywords, text):
+    # The detector this engine replaced
+    text = text.lower()
+    for keyword in keywords:
+        if keyword in text:
+            return True
+    return False
+
+
+def time_calls(fn, texts):
+    latencies = []
+    for text in texts:
+        started = time.perf_counter()
+        fn(text)
+        latencies.append((time.perf_counter() - started) * 1_000_000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled hate-speech lexicon")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 1000, 10000, 50000])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'terms':>7} {'engine':>10} {'compile_s':>10} {'p50_us':>9} {'p99_us':>9} {'mean_us':>9}")
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        lexicon = synthetic_lexicon(size, rng)
+        texts = synthetic_texts(args.texts, rng, lexicon)
+
+        engine = LexiconEngine()
+        started = time.perf_counter()
+        engine.load(entries=lexicon)
+        compile_seconds = time.perf_counter() - started
+        compiled = time_calls(engine.analyze, texts)
+        print(f"{size:>7} {'compiled':>10} {compile_seconds:>10.3f} {percentile(compiled, 50):>9.1f} "
+              f"{percentile(compiled, 99):>9.1f} {statistics.mean(compiled):>9.1f}")
+
+        keywords = [term.rstrip("*") for term, _ in lexicon]
+        naive = time_calls(lambda text: substring_loop(keywords, text), texts)
+        print(f"{size:>7} {'substring':>10} {0:>10.3f} {percentile(naive, 50):>9.1f} "
+              f"{percentile(naive, 99):>9.1f} {statistics.mean(naive):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
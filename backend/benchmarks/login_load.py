@@ -0,0 +1,81 @@
+"""
+Login load benchmark for CyberShield-AI.
+Measures p50/p99 latency of /auth/email/login under concurrent clients.
+
+Run it against a live backend once per build to compare before/after:
+
+    python benchmarks/login_load.py --base-url http://localhost:8000 --clients 200 --requests 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run(base_url, clients, total_requests, email, password):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        # Make sure the benchmark account exists; 409 means it already does
+        await client.post("/auth/email/register", data={"email": email, "password": password})
+
+        latencies = []
+        statuses = {}
+        queue = asyncio.Queue()
+        for _ in range(total_requests):
+            queue.put_nowait(None)
+
+        async def worker():
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                response = await client.post("/auth/email/login", data={"email": email, "password": password})
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        wall_seconds = time.perf_counter() - wall_start
+
+    return {
+        "clients": clients,
+        "requests": total_requests,
+        "statuses": statuses,
+        "throughput_rps": round(total_requests / wall_seconds, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "mean_ms": round(statistics.mean(latencies), 1) if latencies else 0.0,
+        "max_ms": round(max(latencies), 1) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /auth/email/login under concurrent load")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--email", default="loadtest@gmail.com")
+    parser.add_argument("--password", default="LoadTest#2024")
+    parser.add_argument("--label", default="current", help="Name printed with the results, e.g. before/after")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.base_url, args.clients, args.requests, args.email, args.password))
+    print(f"[{args.label}] " + ", ".join(f"{key}={value}" for key, value in results.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Classifier benchmark for CyberShield-AI.
+Compares fp32 and dynamic int8 inference latency and accuracy on a held-out labelled sample.
+
+The sample is JSON lines with "text" and "label" (1 = hate speech, 0 = not):
+
+    python benchmarks/model_bench.py --model-path /app/models/hate-speech --sample heldout.jsonl --batch-size 16
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_manager import ModelManager  # noqa: E402
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def load_sample(path):
+    with open(path, encoding="utf-8") as sample_file:
+        rows = [json.loads(line) for line in sample_file if line.strip()]
+    return [row["text"] for row in rows], [int(row["label"]) for row in rows]
+
+
+def evaluate(manager, texts, batch_size):
+    latencies = []
+    scores = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        started = time.perf_counter()
+        scores.extend(manager.predict(batch))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return scores, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fp32 vs int8 classifier inference")
+    parser.add_argument("--model-path", default=None)
+    parser.add_argument("--sample", required=True, help="JSON lines with text and label")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    args = parser.parse_args()
+
+    texts, labels = load_sample(args.sample)
+    results = {}
+    for mode in ("none", "int8"):
+        manager = ModelManager(model_path=args.model_path, quantize=mode)
+        if not manager.load():
+            raise SystemExit(f"Could not load model: {manager.error}")
+        scores, latencies = evaluate(manager, texts, args.batch_size)
+        predictions = [int(score >= args.threshold) for score in scores]
+        results[mode] = predictions
+        accuracy = sum(int(p == y) for p, y in zip(predictions, labels)) / len(labels)
+        print(f"{'fp32' if mode == 'none' else mode:>5}: load {manager.load_seconds}s, "
+              f"batch p50 {percentile(latencies, 50):.1f}ms p99 {percentile(latencies, 99):.1f}ms "
+              f"mean {statistics.mean(latencies):.1f}ms, "
+              f"{len(texts) / (sum(latencies) / 1000):.1f} texts/s, accuracy {accuracy:.4f}")
+
+    agreement = sum(int(a == b) for a, b in zip(results["none"], results["int8"])) / len(labels)
+    print(f"fp32/int8 prediction agreement: {agreement:.4f} on {len(labels)} texts")
+
+
+if __name__ == "__main__":
+    main()
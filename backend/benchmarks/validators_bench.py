@@ -0,0 +1,94 @@
+"""
+Validators benchmark for CyberShield-AI.
+Times password scoring, email and phone checks against the per-call regex versions they replaced.
+
+Runs in-process, no backend needed:
+
+    python benchmarks/validators_bench.py --count 50000
+"""
+
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validators import ALLOWED_EMAIL_DOMAINS, check_email, evaluate_password_strength, is_valid_indian_phone, validate_emails  # noqa: E402
+
+LEGACY_DOMAINS = ["gmail.com", "yahoo.com", "charusat.edu.in", "charusat.ac.in"]
+
+
+def legacy_strength(password):
+    # Four scans per password, as auth_email used to do
+    strength = 0
+    if len(password) >= 8:
+        strength += 1
+    if re.search(r"[a-z]", password) and re.search(r"[A-Z]", password):
+        strength += 1
+    if re.search(r"[0-9]", password):
+        strength += 1
+    if re.search(r"[^a-zA-Z0-9]", password):
+        strength += 1
+    return strength
+
+
+def legacy_email(email):
+    email = email.strip().lower()
+    if not re.match(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", email):
+        return "Invalid email format"
+    if email.split("@")[1] not in LEGACY_DOMAINS:
+        return "Invalid email domain"
+    return None
+
+
+def legacy_phone(phone):
+    return bool(re.fullmatch(r"^\+91[6-9]\d{9}$", phone))
+
+
+def synthetic_inputs(count, rng):
+    alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
+    passwords = ["".join(rng.choice(alphabet) for _ in range(rng.randint(6, 20))) for _ in range(count)]
+    domains = LEGACY_DOMAINS + ["example.com", "mail.ru"]
+    emails = [f"user{rng.randrange(10**6)}@{rng.choice(domains)}" for _ in range(count)]
+    phones = [f"+91{rng.choice('6789')}{rng.randrange(10**9):09d}" if rng.random() < 0.8 else f"+1{rng.randrange(10**10)}"
+              for _ in range(count)]
+    return passwords, emails, phones
+
+
+def time_per_item(fn, items, repeat):
+    best = min(timeit.repeat(lambda: [fn(item) for item in items], number=1, repeat=repeat))
+    return best / len(items) * 1_000_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CyberShield-AI validators")
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    passwords, emails, phones = synthetic_inputs(args.count, random.Random(args.seed))
+    assert [legacy_strength(p) for p in passwords] == [evaluate_password_strength(p) for p in passwords]
+
+    rows = [
+        ("password strength", time_per_item(legacy_strength, passwords, args.repeat),
+         time_per_item(evaluate_password_strength, passwords, args.repeat)),
+        ("email + domain", time_per_item(legacy_email, emails, args.repeat),
+         time_per_item(lambda email: check_email(email, ALLOWED_EMAIL_DOMAINS), emails, args.repeat)),
+        ("indian phone", time_per_item(legacy_phone, phones, args.repeat),
+         time_per_item(is_valid_indian_phone, phones, args.repeat)),
+    ]
+    print(f"{'check':<20} {'legacy_ns':>10} {'current_ns':>11} {'speedup':>8}")
+    for name, legacy, current in rows:
+        print(f"{name:<20} {legacy:>10.0f} {current:>11.0f} {legacy / current:>7.2f}x")
+
+    batch = min(timeit.repeat(lambda: validate_emails(emails), number=1, repeat=args.repeat))
+    print(f"validate_emails: {args.count} emails in {batch * 1000:.1f}ms ({args.count / batch:,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Chunking module for CyberShield-AI.
+Analyzes long documents as overlapping windows so no single pass exceeds the detector's input limit.
+"""
+
+from analysis_cache import analysis_cache
+import logging
+import os
+import re
+
+# Set up logging
+logger = logging.getLogger("chunking")
+
+_THROUGH_LAST_SPACE = re.compile(r".*\s", re.S)
+_SPACE = re.compile(r"\s")
+
+
+def iter_windows(text, size, overlap):
+    """Yield (start, end) offsets of overlapping windows, cut at whitespace where possible so words stay whole."""
+    length = len(text)
+    start = 0
+    while start < length:
+        end = min(start + size, length)
+        if end < length:
+            match = _THROUGH_LAST_SPACE.match(text, start + size // 2, end)
+            if match:
+                end = match.end()
+        yield start, end
+        if end >= length:
+            return
+        next_start = max(end - overlap, start + 1)
+        # Begin the overlap on a word boundary so the repeated part is whole words
+        space = _SPACE.search(text, next_start, end)
+        start = space.end() if space else next_start
+
+
+def merge_chunks(chunks):
+    """Combine per-chunk results into the document-level AnalysisResponse fields."""
+    model_scores = [chunk["modelScore"] for chunk in chunks if chunk["modelScore"] is not None]
+    return {
+        "isHateSpeech": any(chunk["isHateSpeech"] for chunk in chunks),
+        "matchedTerms": sorted({term for chunk in chunks for term in chunk["matchedTerms"]}),
+        "score": max((chunk["score"] for chunk in chunks), default=0.0),
+        "modelScore": max(model_scores) if model_scores else None,
+    }
+
+
+class ChunkedAnalyzer:
+    """Streams windows of a long text through the analysis cache a batch at a time."""
+
+    def __init__(self, cache=None):
+        self.cache = cache or analysis_cache
+        self.window_chars = int(os.environ.get("ANALYZE_CHUNK_CHARS", "1000"))
+        self.overlap_chars = int(os.environ.get("ANALYZE_CHUNK_OVERLAP", "200"))
+        self.batch_size = int(os.environ.get("ANALYZE_CHUNK_BATCH", "16"))
+        self.confident_score = float(os.environ.get("ANALYZE_EARLY_EXIT_SCORE", "0.9"))
+        self.documents = 0
+        self.chunks = 0
+        self.early_exits = 0
+
+    def needs_chunking(self, text):
+        return len(text) > self.window_chars
+
+    def is_confident(self, result):
+        return result["isHateSpeech"] and result["score"] >= self.confident_score
+
+    async def iter_chunks(self, text, early_exit=False):
+        """Async-yield one result per window, in order; with early_exit, stop after the first confident hit."""
+        self.documents += 1
+        windows = iter_windows(text, self.window_chars, self.overlap_chars)
+        while True:
+            batch = []
+            for window in windows:
+                batch.append(window)
+                if len(batch) >= self.batch_size:
+                    break
+            if not batch:
+                return
+            # Windows are not worth a cache entry or a stored row each; the document result is recorded once
+            results = await self.cache.analyze_many([text[start:end] for start, end in batch], record=False)
+            for (start, end), result in zip(batch, results):
+                self.chunks += 1
+                result.update(start=start, end=end)
+                yield result
+                if early_exit and self.is_confident(result):
+                    self.early_exits += 1
+                    return
+
+    def summarize(self, text, chunks):
+        """Merge the chunk results; a complete pass is cached and stored under the full text's content hash."""
+        result = merge_chunks(chunks)
+        result["stoppedEarly"] = bool(chunks) and chunks[-1]["end"] < len(text)
+        if not result["stoppedEarly"]:
+            self.cache.remember(text, {key: result[key] for key in ("isHateSpeech", "matchedTerms", "score", "modelScore")})
+        return result
+
+    async def analyze(self, text, early_exit=False, include_chunks=True):
+        """
+        Document-level result plus the per-chunk results with their character offsets.
+        Without include_chunks a document analyzed before is answered from the cache and no windows are returned.
+        """
+        if not include_chunks:
+            cached = await self.cache.lookup(text)
+            if cached is not None:
+                cached["stoppedEarly"] = False
+                return cached
+        chunks = [chunk async for chunk in self.iter_chunks(text, early_exit)]
+        result = self.summarize(text, chunks)
+        if include_chunks:
+            result["chunks"] = chunks
+        return result
+
+    def stats(self):
+        return {
+            "window_chars": self.window_chars,
+            "overlap_chars": self.overlap_chars,
+            "batch_size": self.batch_size,
+            "confident_score": self.confident_score,
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "early_exits": self.early_exits,
+        }
+
+
+# Create a single instance
+chunked_analyzer = ChunkedAnalyzer()
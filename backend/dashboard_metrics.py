@@ -0,0 +1,255 @@
+"""
+Dashboard metrics module for CyberShield-AI.
+Keeps the security dashboard counters in one precomputed document, updated as audit logs are written.
+
+Usage:
+    python dashboard_metrics.py rebuild
+    python dashboard_metrics.py verify
+"""
+
+from datetime import datetime, timedelta
+from database import mongo
+from query_planner import FacetPlan
+from repositories import run_db
+import argparse
+import json
+import logging
+import os
+
+# Set up logging
+logger = logging.getLogger("dashboard_metrics")
+
+SUMMARY_ID = "summary"
+
+
+def _day(timestamp):
+    return timestamp.strftime("%Y-%m-%d")
+
+
+def _key(value):
+    # Counter names become field paths, so keep them free of path separators
+    return str(value).replace(".", "_").replace("$", "_")
+
+
+def _serialize_event(event):
+    event = dict(event)
+    event["_id"] = str(event["_id"])
+    event["timestamp"] = str(event["timestamp"])
+    return event
+
+
+def batch_update(collection, documents, recent_events_limit=10):
+    """Build the $inc/$push update that folds one written batch into the summary document."""
+    increments = {}
+
+    def inc(path):
+        increments[path] = increments.get(path, 0) + 1
+
+    recent_events = []
+    if collection == "login_logs":
+        for doc in documents:
+            status = _key(doc.get("status"))
+            inc(f"logins.{status}")
+            inc(f"logins_by_day.{_day(doc['timestamp'])}.{status}")
+    elif collection == "security_events":
+        for doc in documents:
+            inc(f"events_by_severity.{_key(doc.get('severity'))}")
+        recent_events = [_serialize_event(doc) for doc in reversed(documents)]
+    else:
+        return None
+
+    update = {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}}
+    if recent_events:
+        update["$push"] = {"recent_events": {"$each": recent_events, "$position": 0, "$slice": recent_events_limit}}
+    return update
+
+
+def summary_response(doc, now=None):
+    """Render a metrics document in the shape returned by /security-dashboard/summary."""
+    now = now or datetime.utcnow()
+    today = _day(now)
+    week_start = _day(now - timedelta(days=7))
+    logins = doc.get("logins", {})
+    total_logins = logins.get("success", 0)
+    total_failed = logins.get("failed", 0)
+    today_counts = doc.get("logins_by_day", {}).get(today, {})
+    severity = doc.get("events_by_severity", {})
+    high, medium, low = severity.get("high", 0), severity.get("medium", 0), severity.get("low", 0)
+
+    trend_dates = sorted(day for day in doc.get("logins_by_day", {}) if day >= week_start)
+    trend_data = doc.get("logins_by_day", {})
+    return {
+        "login_metrics": {
+            "total_logins": total_logins,
+            "today_logins": today_counts.get("success", 0),
+            "total_failed": total_failed,
+            "today_failed": today_counts.get("failed", 0),
+            "failure_rate": round((total_failed / (total_logins + total_failed)) * 100, 2) if (total_logins + total_failed) > 0 else 0
+        },
+        "security_events": {
+            "high": high,
+            "medium": medium,
+            "low": low,
+            "total": high + medium + low
+        },
+        "user_metrics": {
+            "total_users": doc.get("users", {}).get("total", 0),
+            "new_users_today": doc.get("users_by_day", {}).get(today, 0)
+        },
+        "login_trends": {
+            "dates": trend_dates,
+            "success": [trend_data[day].get("success", 0) for day in trend_dates],
+            "failed": [trend_data[day].get("failed", 0) for day in trend_dates]
+        },
+        "recent_events": doc.get("recent_events", [])
+    }
+
+
+class DashboardMetrics:
+    """Materialized dashboard counters maintained from the log pipeline and rebuilt on demand."""
+
+    def __init__(self, collection="dashboard_metrics"):
+        self.collection_name = collection
+        self.trend_days = int(os.environ.get("DASHBOARD_TREND_DAYS", "8"))
+        self.recent_events_limit = int(os.environ.get("DASHBOARD_RECENT_EVENTS", "10"))
+        self._pruned_day = None
+        self.batches_applied = 0
+        self.errors = 0
+        self.last_rebuild = None
+
+    def _collection(self, db=None):
+        db = db if db is not None else mongo.get_database()
+        return db[self.collection_name]
+
+    def apply_batch(self, collection, documents):
+        """Log pipeline listener: fold a freshly written batch into the counters."""
+        update = batch_update(collection, documents, self.recent_events_limit)
+        if update is None:
+            return
+        try:
+            self._collection().update_one({"_id": SUMMARY_ID}, update, upsert=True)
+            self.batches_applied += 1
+            self._prune_old_days()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to update dashboard metrics from {collection}: {e}")
+
+    def _record_user(self, created_at):
+        self._collection().update_one(
+            {"_id": SUMMARY_ID},
+            {"$inc": {"users.total": 1, f"users_by_day.{_day(created_at)}": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def record_user_created(self, created_at):
+        try:
+            await run_db(self._record_user, created_at)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to update user metrics: {e}")
+
+    def _prune_old_days(self):
+        # Daily counters only feed the trend chart, so drop the ones that fell out of it once a day
+        today = _day(datetime.utcnow())
+        if self._pruned_day == today:
+            return
+        self._pruned_day = today
+        cutoff = _day(datetime.utcnow() - timedelta(days=self.trend_days))
+        doc = self._collection().find_one({"_id": SUMMARY_ID}, {"logins_by_day": 1, "users_by_day": 1}) or {}
+        stale = {}
+        for field in ("logins_by_day", "users_by_day"):
+            for day in doc.get(field, {}):
+                if day < cutoff:
+                    stale[f"{field}.{day}"] = ""
+        if stale:
+            self._collection().update_one({"_id": SUMMARY_ID}, {"$unset": stale})
+
+    def compute_plan(self, since):
+        """Every raw-collection query behind the summary, as one $facet round trip per collection."""
+        plan = FacetPlan()
+        plan.add("login_logs", "by_status", [{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        plan.add("login_logs", "by_day", [{"$group": {
+            "_id": {"date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}, "status": "$status"},
+            "count": {"$sum": 1}
+        }}], match={"timestamp": {"$gte": since}})
+        plan.add("security_events", "by_severity", [{"$group": {"_id": "$severity", "count": {"$sum": 1}}}])
+        plan.add("security_events", "recent", [{"$sort": {"timestamp": -1}}, {"$limit": self.recent_events_limit}])
+        plan.add("users", "total", [{"$count": "count"}])
+        plan.add("users", "by_day", [{"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+            "count": {"$sum": 1}
+        }}], match={"created_at": {"$gte": since}})
+        return plan
+
+    def compute(self, db=None):
+        """Recompute the metrics document from the raw collections."""
+        since = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=self.trend_days - 1)
+        results = self.compute_plan(since).execute(db)
+        logins, events, users = results["login_logs"], results["security_events"], results["users"]
+        doc = {"_id": SUMMARY_ID, "logins": {}, "logins_by_day": {}, "events_by_severity": {}, "users": {}, "users_by_day": {}}
+
+        for row in logins["by_status"]:
+            doc["logins"][_key(row["_id"])] = row["count"]
+        for row in logins["by_day"]:
+            doc["logins_by_day"].setdefault(row["_id"]["date"], {})[_key(row["_id"]["status"])] = row["count"]
+        for row in events["by_severity"]:
+            doc["events_by_severity"][_key(row["_id"])] = row["count"]
+        doc["users"]["total"] = users["total"][0]["count"] if users["total"] else 0
+        for row in users["by_day"]:
+            doc["users_by_day"][row["_id"]] = row["count"]
+        doc["recent_events"] = [_serialize_event(event) for event in events["recent"]]
+        return doc
+
+    def rebuild(self, db=None):
+        """Replace the stored document with one recomputed from the raw collections."""
+        doc = self.compute(db)
+        doc["updated_at"] = doc["rebuilt_at"] = datetime.utcnow()
+        self._collection(db).replace_one({"_id": SUMMARY_ID}, doc, upsert=True)
+        self.last_rebuild = doc["rebuilt_at"]
+        logger.info("Dashboard metrics rebuilt from raw collections")
+        return doc
+
+    def verify(self, db=None):
+        """Compare the stored counters against a fresh recomputation; returns the fields that drifted."""
+        expected = self.compute(db)
+        stored = self._collection(db).find_one({"_id": SUMMARY_ID}) or {}
+        drift = {}
+        for field in ("logins", "logins_by_day", "events_by_severity", "users", "users_by_day"):
+            if stored.get(field, {}) != expected[field]:
+                drift[field] = {"stored": stored.get(field, {}), "expected": expected[field]}
+        return drift
+
+    async def summary(self):
+        """Load the precomputed document, building it from raw data the first time."""
+        doc = await run_db(self._collection().find_one, {"_id": SUMMARY_ID})
+        if doc is None:
+            doc = await run_db(self.rebuild)
+        return summary_response(doc)
+
+    def stats(self):
+        return {
+            "batches_applied": self.batches_applied,
+            "errors": self.errors,
+            "last_rebuild": str(self.last_rebuild) if self.last_rebuild else None,
+        }
+
+
+# Create a single instance
+dashboard_metrics = DashboardMetrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or check the CyberShield-AI dashboard metrics")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "rebuild":
+        result = dashboard_metrics.rebuild()
+    else:
+        result = dashboard_metrics.verify()
+        print("Counters match raw collections" if not result else f"{len(result)} counter groups drifted")
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Database connection module for CyberShield-AI.
+Provides the process-wide pooled MongoDB client shared by every router.
+"""
+
+from fastapi import HTTPException
+from pymongo import MongoClient, monitoring
+import logging
+import os
+import threading
+import traceback
+
+# Set up logging
+logger = logging.getLogger("database")
+
+DEFAULT_MONGO_URI = "mongodb://cybershield-mongodb:27017/cybershield_db"
+DEFAULT_DB_NAME = "cybershield_db"
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Collects connection pool statistics from pymongo CMAP events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pools_created = 0
+        self.pools_cleared = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checked_out = 0
+        self.checkouts_total = 0
+        self.checkouts_failed = 0
+        self.wait_time_total_ms = 0.0
+        self.wait_time_max_ms = 0.0
+
+    def pool_created(self, event):
+        with self._lock:
+            self.pools_created += 1
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkouts_failed += 1
+            self._record_wait(event)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts_total += 1
+            self._record_wait(event)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def _record_wait(self, event):
+        duration_ms = (getattr(event, "duration", None) or 0.0) * 1000
+        self.wait_time_total_ms += duration_ms
+        self.wait_time_max_ms = max(self.wait_time_max_ms, duration_ms)
+
+    def snapshot(self):
+        with self._lock:
+            waits = self.checkouts_total + self.checkouts_failed
+            return {
+                "pools_created": self.pools_created,
+                "pools_cleared": self.pools_cleared,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "connections_open": self.connections_created - self.connections_closed,
+                "checked_out": self.checked_out,
+                "checkouts_total": self.checkouts_total,
+                "checkouts_failed": self.checkouts_failed,
+                "wait_time_avg_ms": round(self.wait_time_total_ms / waits, 3) if waits else 0,
+                "wait_time_max_ms": round(self.wait_time_max_ms, 3),
+            }
+
+
+class MongoConnectionManager:
+    """Owns the single MongoClient (and its connection pool) for this process."""
+
+    def __init__(self):
+        self.uri = os.environ.get("MONGO_URI", DEFAULT_MONGO_URI)
+        self.max_pool_size = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+        self.min_pool_size = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+        self.max_idle_time_ms = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000"))
+        self.wait_queue_timeout_ms = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+        self.server_selection_timeout_ms = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+        self.connect_timeout_ms = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+        self.socket_timeout_ms = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+        self.pool_stats = PoolStatsListener()
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client_options(self):
+        """Keyword arguments used to build every client for this process."""
+        return {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+            "event_listeners": [self.pool_stats],
+        }
+
+    @property
+    def client(self):
+        """Return the shared client, creating it on first use."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    logger.info(f"Creating pooled MongoDB client for: {self.uri}")
+                    self._client = MongoClient(self.uri, **self.client_options())
+        return self._client
+
+    def get_database(self):
+        return self.client.get_default_database(default=DEFAULT_DB_NAME)
+
+    def connect(self):
+        """Create the client at startup and verify the server is reachable."""
+        try:
+            self.client.admin.command("ping")
+            logger.info("MongoDB connection pool ready")
+        except Exception as e:
+            # The pool reconnects on its own; requests will surface errors if it stays down
+            logger.error(f"MongoDB ping failed at startup: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+                logger.info("MongoDB connection pool closed")
+
+    def stats(self):
+        return {
+            "client_created": self._client is not None,
+            "max_pool_size": self.max_pool_size,
+            "min_pool_size": self.min_pool_size,
+            "wait_queue_timeout_ms": self.wait_queue_timeout_ms,
+            **self.pool_stats.snapshot(),
+        }
+
+
+# Create a single instance
+mongo = MongoConnectionManager()
+
+
+def get_db():
+    """FastAPI dependency returning the shared database handle."""
+    try:
+        return mongo.get_database()
+    except Exception as e:
+        logger.error(f"MongoDB connection error: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Database connection error: {str(e)}")
@@ -1,64 +1,55 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pymongo import MongoClient
+from database import mongo, get_db
+from repositories import repos, run_db
+from indexes import ensure_indexes, explain_report
+from pagination import EXPORT_MAX_ROWS, date_range_filter, iter_batches, stream_json_object
 from datetime import datetime
 import os
 import traceback
+from typing import Optional
 
 router = APIRouter()
 
-def get_direct_db():
-    """Get a direct database connection bypassing any middlewares."""
+@router.get("/pool-stats")
+async def pool_stats():
+    """Report statistics for the shared MongoDB connection pool."""
+    return {
+        "message": "Connection pool statistics",
+        "pool": mongo.stats()
+    }
+
+@router.get("/index-report")
+def index_report():
+    """Apply the index registry and explain known query shapes, flagging COLLSCANs."""
     try:
-        # Use the environment variable first, fallback to direct container name
-        mongo_uri = os.environ.get("MONGO_URI", "mongodb://cybershield-mongodb:27017/cybershield_db")
-        print(f"Connecting directly to MongoDB at: {mongo_uri}")
-        
-        client = MongoClient(mongo_uri)
-        db = client.get_database()
-        
-        # Test connection
-        client.admin.command('ping')
-        print("Direct MongoDB connection successful")
-        
-        return db
+        indexes = ensure_indexes()
+        plans = explain_report()
+        return {
+            "message": "Index report generated",
+            "indexes": indexes,
+            "collscan_count": sum(1 for plan in plans if plan.get("collscan")),
+            "query_plans": plans
+        }
     except Exception as e:
-        print(f"Direct MongoDB connection error: {str(e)}")
-        print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Database connection error: {str(e)}")
+        return {
+            "error": str(e),
+            "error_type": type(e).__name__,
+            "traceback": traceback.format_exc()
+        }
 
 @router.get("/view-all-logs")
-async def view_all_logs():
-    """View all logs in the database."""
+async def view_all_logs(
+    db = Depends(get_db),
+    limit: int = Query(1000, ge=1, le=EXPORT_MAX_ROWS, description="Maximum users and login logs to return"),
+    from_date: Optional[str] = Query(None, description="Login logs from date (YYYY-MM-DD)"),
+    to_date: Optional[str] = Query(None, description="Login logs to date (YYYY-MM-DD)")
+):
+    """View users and login logs in the database, streamed in bounded batches."""
     try:
-        db = get_direct_db()
-        
-        # Check if collections exist
-        collections = db.list_collection_names()
-        
-        # Get user data
-        users = []
-        if "users" in collections:
-            user_docs = db.users.find({}, {"email": 1, "created_at": 1})
-            for user in user_docs:
-                users.append({
-                    "id": str(user.get("_id")),
-                    "email": user.get("email"),
-                    "created_at": str(user.get("created_at", ""))
-                })
-        
-        # Get login logs
-        login_logs = []
-        if "login_logs" in collections:
-            log_docs = db.login_logs.find().sort("timestamp", -1)
-            for log in log_docs:
-                login_logs.append({
-                    "id": str(log.get("_id")),
-                    "email": log.get("email", ""),
-                    "timestamp": str(log.get("timestamp", "")),
-                    "status": log.get("status", ""),
-                    "reason": log.get("reason", ""),
-                    "source": log.get("source", "")
-                })
+        log_filter = date_range_filter(from_date, to_date)
+        collections = await run_db(db.list_collection_names)
         
         # Insert a test log to verify write access
         test_log = {
@@ -68,23 +59,9 @@ async def view_all_logs():
             "source": "db_admin_endpoint"
         }
         
-        test_result = None
-        if "login_logs" in collections:
-            test_result = db.login_logs.insert_one(test_log)
-        else:
-            db.create_collection("login_logs")
-            test_result = db.login_logs.insert_one(test_log)
-        
-        return {
-            "message": "Database report generated",
-            "test_log_id": str(test_result.inserted_id) if test_result else None,
-            "database_name": db.name,
-            "collections": collections,
-            "user_count": len(users),
-            "users": users,
-            "login_logs_count": len(login_logs),
-            "login_logs": login_logs
-        }
+        test_result = await repos.login_logs.insert_one(test_log)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in view_all_logs: {str(e)}")
         print(traceback.format_exc())
@@ -93,9 +70,43 @@ async def view_all_logs():
             "error_type": type(e).__name__,
             "traceback": traceback.format_exc()
         }
+    
+    def format_user(user):
+        return {
+            "id": str(user.get("_id")),
+            "email": user.get("email"),
+            "created_at": str(user.get("created_at", ""))
+        }
+    
+    def format_log(log):
+        return {
+            "id": str(log.get("_id")),
+            "email": log.get("email", ""),
+            "timestamp": str(log.get("timestamp", "")),
+            "status": log.get("status", ""),
+            "reason": log.get("reason", ""),
+            "source": log.get("source", "")
+        }
+    
+    users = iter_batches(repos.users, {}, format_user, limit=limit, projection={"email": 1, "created_at": 1}, field=None)
+    login_logs = iter_batches(
+        repos.login_logs, log_filter, format_log, limit=limit,
+        projection={"email": 1, "timestamp": 1, "status": 1, "reason": 1, "source": 1}
+    )
+    return StreamingResponse(
+        stream_json_object([
+            ("message", "Database report generated", None),
+            ("test_log_id", str(test_result.inserted_id) if test_result else None, None),
+            ("database_name", db.name, None),
+            ("collections", collections, None),
+            ("users", users, "user_count"),
+            ("login_logs", login_logs, "login_logs_count"),
+        ]),
+        media_type="application/json"
+    )
 
 @router.get("/test-db-connection")
-async def test_db_connection():
+def test_db_connection():
     """Test database connection and operations."""
     try:
         # Try direct MongoDB connection (container networking)
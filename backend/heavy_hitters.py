@@ -0,0 +1,275 @@
+"""
+Heavy hitters module for CyberShield-AI.
+Tracks the most-failed IPs and most-guessed emails per day with Count-Min sketches, merged across workers through MongoDB.
+
+Usage:
+    python heavy_hitters.py show
+"""
+
+from datetime import datetime, timezone
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+from database import mongo
+from repositories import run_db
+from sketches import HeavyHitters
+from threat_detector import THREAT_RULES
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger("heavy_hitters")
+
+DAY_SECONDS = 86400
+
+
+def _day(timestamp):
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp() // DAY_SECONDS)
+
+
+class HeavyHitterTracker:
+    """
+    One HeavyHitters per (rule, day) for this worker, plus the other workers' checkpointed days.
+
+    Reads come from a per-rule window sketch that already merges every day in range, so the
+    dashboard's top-N lists cost a sort of k entries instead of a $group over a week of logins.
+    """
+
+    def __init__(self, collection="heavy_hitters", rules=THREAT_RULES):
+        self.collection_name = collection
+        self.rules = {rule.name: rule for rule in rules}
+        # Eight calendar days covers the threats analysis range, which starts seven days before today
+        self.days = int(os.environ.get("HEAVY_HITTERS_DAYS", "8"))
+        self.checkpoint_interval = float(os.environ.get("HEAVY_HITTERS_CHECKPOINT_SECONDS", "30"))
+        self.worker_id = os.environ.get("HEAVY_HITTERS_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+        self._local = {}
+        self._peers = {}
+        self._window = {name: HeavyHitters() for name in self.rules}
+        self._window_day = None
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._task = None
+        self._seed_until = None
+        self.ready = False
+        self.events = 0
+        self.seeded = 0
+        self.checkpoints = 0
+        self.peer_workers = 0
+        self.errors = 0
+
+    def _collection(self, db=None):
+        db = db if db is not None else mongo.get_database()
+        return db[self.collection_name]
+
+    def _oldest_day(self, today):
+        return today - self.days + 1
+
+    def _rebuild_window(self, today):
+        # Runs on day rollover and after peers are refreshed, never per event
+        oldest = self._oldest_day(today)
+        for store in (self._local, self._peers):
+            for key in [key for key in store if key[1] < oldest]:
+                del store[key]
+        for name in self.rules:
+            parts = [hitters for store in (self._local, self._peers) for (rule, _), hitters in store.items() if rule == name]
+            self._window[name] = HeavyHitters.union(parts)
+        self._window_day = today
+
+    def _roll(self, today):
+        if self._window_day != today:
+            self._rebuild_window(today)
+
+    def observe(self, documents, today=None):
+        """Count failed logins into today's sketches and the window sketch."""
+        today = today if today is not None else int(time.time() // DAY_SECONDS)
+        with self._lock:
+            self._roll(today)
+            oldest = self._oldest_day(today)
+            for document in documents:
+                day = _day(document["timestamp"])
+                if day < oldest:
+                    continue
+                for rule in self.rules.values():
+                    key = rule.key(document)
+                    if key is None:
+                        continue
+                    hitters = self._local.get((rule.name, day))
+                    if hitters is None:
+                        hitters = self._local[(rule.name, day)] = HeavyHitters()
+                    hitters.add(key)
+                    self._window[rule.name].add(key)
+                    self._dirty.add((rule.name, day))
+            self.events += len(documents)
+
+    def on_batch(self, collection, documents):
+        """Log pipeline listener for login_logs; rows up to the seed point are left to the seeding scan."""
+        if collection != "login_logs":
+            return
+        if self._seed_until is not None:
+            documents = [document for document in documents if document["timestamp"] > self._seed_until]
+        if documents:
+            self.observe(documents)
+
+    def top(self, rule_name, n=3, min_count=0, today=None):
+        """[(key, estimated failures)] over the window, highest first; min_count drops keys under a threshold."""
+        today = today if today is not None else int(time.time() // DAY_SECONDS)
+        with self._lock:
+            self._roll(today)
+            ranked = self._window[rule_name].most_common()
+        return [(key, count) for key, count in ranked if count >= min_count][:n]
+
+    def checkpoint(self, db=None, today=None):
+        """Write this worker's changed days, drop expired ones and pull in the other workers' days."""
+        collection = self._collection(db)
+        today = today if today is not None else int(time.time() // DAY_SECONDS)
+        with self._lock:
+            docs = [
+                dict(self._local[key].to_document(), _id=f"{self.worker_id}:{key[0]}:{key[1]}",
+                     worker=self.worker_id, rule=key[0], day=key[1], updated_at=datetime.utcnow())
+                for key in self._dirty if key in self._local
+            ]
+            self._dirty = set()
+        if docs:
+            collection.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs], ordered=False)
+        oldest = self._oldest_day(today)
+        collection.delete_many({"day": {"$lt": oldest}})
+
+        peers, workers = {}, set()
+        for doc in collection.find({"worker": {"$ne": self.worker_id}, "day": {"$gte": oldest}}):
+            if doc["rule"] not in self.rules:
+                continue
+            workers.add(doc["worker"])
+            hitters = HeavyHitters.from_document(doc)
+            key = (doc["rule"], doc["day"])
+            peers[key] = peers[key].merge(hitters) if key in peers else hitters
+        with self._lock:
+            self._peers = peers
+            self._rebuild_window(today)
+        self.peer_workers = len(workers)
+        self.checkpoints += 1
+        return len(docs)
+
+    def seed(self, until, db=None, today=None):
+        """Count the window's failed logins from login_logs; only used when no worker has checkpointed yet."""
+        db = db if db is not None else mongo.get_database()
+        today = today if today is not None else int(time.time() // DAY_SECONDS)
+        since = datetime.utcfromtimestamp(self._oldest_day(today) * DAY_SECONDS)
+        cursor = db.login_logs.find(
+            {"status": "failed", "timestamp": {"$gte": since, "$lte": until}},
+            {"email": 1, "ip_address": 1, "status": 1, "reason": 1, "timestamp": 1}
+        ).batch_size(5000)
+        batch = []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) >= 5000:
+                self.observe(batch, today)
+                self.seeded += len(batch)
+                batch = []
+        if batch:
+            self.observe(batch, today)
+            self.seeded += len(batch)
+
+    def _claim_seed(self, db, oldest):
+        # Workers starting together on an empty collection must not each count the same history
+        collection = self._collection(db)
+        if collection.find_one({"day": {"$gte": oldest}}) is not None:
+            return False
+        try:
+            collection.insert_one({"_id": f"seed:{oldest}", "worker": self.worker_id, "rule": "_seed", "day": oldest})
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def load(self, db=None, today=None, until=None):
+        """
+        Restore this worker's own days after a restart with the same HEAVY_HITTERS_WORKER_ID, then merge peers.
+        With no checkpoint from any worker, seed the window from login_logs up to until.
+        """
+        today = today if today is not None else int(time.time() // DAY_SECONDS)
+        oldest = self._oldest_day(today)
+        if until is not None and self._claim_seed(db, oldest):
+            self.seed(until, db, today)
+        with self._lock:
+            for doc in self._collection(db).find({"worker": self.worker_id, "day": {"$gte": oldest}}):
+                if doc["rule"] in self.rules:
+                    restored = HeavyHitters.from_document(doc)
+                    key = (doc["rule"], doc["day"])
+                    self._local[key] = restored.merge(self._local[key]) if key in self._local else restored
+        self.checkpoint(db, today)
+        self.ready = True
+
+    async def _run(self):
+        try:
+            await run_db(self.load, None, None, self._seed_until)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Heavy hitters restore failed, top lists come from the threats aggregation: {e}")
+            return
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                await run_db(self.checkpoint)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Heavy hitters checkpoint failed: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._seed_until = datetime.utcnow()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.ready:
+            try:
+                await run_db(self.checkpoint)
+            except Exception as e:
+                logger.error(f"Final heavy hitters checkpoint failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            local_days, peer_days = len(self._local), len(self._peers)
+        return {
+            "ready": self.ready,
+            "worker_id": self.worker_id,
+            "local_days": local_days,
+            "peer_days": peer_days,
+            "peer_workers": self.peer_workers,
+            "events": self.events,
+            "seeded": self.seeded,
+            "checkpoints": self.checkpoints,
+            "errors": self.errors,
+        }
+
+
+# Create a single instance
+heavy_hitters = HeavyHitterTracker()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the CyberShield-AI heavy hitters merged across workers")
+    parser.add_argument("command", choices=["show"])
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    heavy_hitters.worker_id = "cli"
+    heavy_hitters.checkpoint()
+    result = {name: heavy_hitters.top(name, args.top) for name in heavy_hitters.rules}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Index management module for CyberShield-AI.
+Declares the indexes every collection needs, applies them idempotently and reports query plans.
+
+Usage:
+    python indexes.py apply [--rebuild-conflicts]
+    python indexes.py report
+"""
+
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from database import mongo
+from retention import RETENTION_POLICIES, ttl_seconds
+import argparse
+import json
+import logging
+
+# Set up logging
+logger = logging.getLogger("indexes")
+
+
+class IndexSpec:
+    """One index: key pattern plus create_index options."""
+
+    def __init__(self, keys, **options):
+        self.keys = keys
+        self.options = options
+        self.name = options.get("name") or "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+# Key order follows equality -> sort -> range so the dashboard and monitor
+# query shapes below can be answered from the index without a COLLSCAN
+INDEX_REGISTRY = {
+    "users": [
+        IndexSpec([("email", ASCENDING)], unique=True),
+        IndexSpec([("created_at", DESCENDING)]),
+    ],
+    "login_logs": [
+        IndexSpec([("timestamp", DESCENDING)], expireAfterSeconds=ttl_seconds("login_logs")),
+        IndexSpec([("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("email", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("status", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("status", ASCENDING), ("reason", ASCENDING), ("timestamp", DESCENDING)]),
+        IndexSpec([("ip_address", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "security_events": [
+        IndexSpec([("timestamp", DESCENDING)], expireAfterSeconds=ttl_seconds("security_events")),
+        IndexSpec([("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("severity", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("event_type", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("details.email", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "access_logs": [
+        IndexSpec([("timestamp", DESCENDING)], expireAfterSeconds=ttl_seconds("access_logs")),
+        IndexSpec([("user_id", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "phone_verifications": [
+        # Unique so concurrent first verifications of a number upsert one document
+        IndexSpec([("phone_number", ASCENDING)], unique=True),
+    ],
+    "phone_logs": [
+        IndexSpec([("timestamp", DESCENDING)]),
+        IndexSpec([("phone_number", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "analysis_results": [
+        IndexSpec([("timestamp", DESCENDING)]),
+        # Older rows predate content hashing, so only hashed rows take part in the unique constraint
+        IndexSpec([("content_hash", ASCENDING)], unique=True, partialFilterExpression={"content_hash": {"$exists": True}}),
+    ],
+    "rate_counters": [
+        IndexSpec([("key", ASCENDING), ("bucket", ASCENDING)], unique=True),
+        IndexSpec([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "response_cache": [
+        IndexSpec([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+# Rollup collections written by the retention engine are read by time bucket
+for _policy in RETENTION_POLICIES.values():
+    INDEX_REGISTRY[_policy.hourly_collection] = [IndexSpec([("_id.hour", DESCENDING)])]
+    INDEX_REGISTRY[_policy.daily_collection] = [IndexSpec([("_id.day", DESCENDING)])]
+
+
+def known_query_shapes():
+    """Representative filters/sorts issued by the routers, used for the explain report."""
+    now = datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today_start - timedelta(days=7)
+    month_start = today_start - timedelta(days=30)
+    return [
+        ("users", "login/register user lookup", {"email": "user@gmail.com"}, None),
+        ("users", "summary new users today", {"created_at": {"$gte": today_start}}, None),
+        ("login_logs", "summary successful logins", {"status": "success"}, None),
+        ("login_logs", "summary failed logins today", {"status": "failed", "timestamp": {"$gte": today_start}}, None),
+        ("login_logs", "summary login trends", {"timestamp": {"$gte": week_start}}, None),
+        ("login_logs", "threats suspicious IPs", {"status": "failed", "timestamp": {"$gte": week_start}, "ip_address": {"$exists": True, "$ne": None}}, None),
+        ("login_logs", "threats password guessing", {"status": "failed", "reason": "incorrect_password", "timestamp": {"$gte": week_start}}, None),
+        ("login_logs", "monitor login attempts by email", {"email": "user@gmail.com"}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        ("login_logs", "monitor login attempts by status", {"status": "failed"}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        ("login_logs", "monitor login attempts page", {}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        ("login_logs", "recent login logs", {}, [("timestamp", DESCENDING)]),
+        ("security_events", "summary events by severity", {"severity": "high"}, None),
+        ("security_events", "threats high severity by type", {"severity": {"$in": ["high", "critical"]}, "timestamp": {"$gte": month_start}}, None),
+        ("security_events", "monitor events by type", {"event_type": "password_guessing"}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        ("security_events", "monitor events page", {}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        ("security_events", "user activity events", {"details.email": "user@gmail.com"}, [("timestamp", DESCENDING)]),
+        ("security_events", "recent security events", {}, [("timestamp", DESCENDING)]),
+        ("access_logs", "user activity access logs", {"user_id": "000000000000000000000000"}, [("timestamp", DESCENDING)]),
+        ("phone_verifications", "verification lookup", {"phone_number": "+919876543210"}, None),
+        ("phone_logs", "recent phone logs", {}, [("timestamp", DESCENDING)]),
+        ("analysis_results", "analysis cache lookup", {"content_hash": {"$in": ["0" * 64]}}, None),
+    ]
+
+
+def _key_pattern(keys):
+    return tuple((field, direction if isinstance(direction, str) else int(direction)) for field, direction in keys)
+
+
+def _same_options(existing, spec):
+    return (
+        bool(existing.get("unique")) == bool(spec.options.get("unique"))
+        and existing.get("expireAfterSeconds") == spec.options.get("expireAfterSeconds")
+    )
+
+
+def _only_ttl_differs(existing, spec):
+    return (
+        bool(existing.get("unique")) == bool(spec.options.get("unique"))
+        and existing.get("expireAfterSeconds") is not None
+        and spec.options.get("expireAfterSeconds") is not None
+    )
+
+
+def ensure_indexes(db=None, rebuild_conflicts=False):
+    """Create every registered index that is missing; returns a per-index status report."""
+    db = db if db is not None else mongo.get_database()
+    report = []
+    for collection_name, specs in INDEX_REGISTRY.items():
+        collection = db[collection_name]
+        existing = {index["name"]: index for index in collection.list_indexes()}
+        by_keys = {_key_pattern(index["key"].items()): index for index in existing.values()}
+        for spec in specs:
+            current = by_keys.get(_key_pattern(spec.keys))
+            status = "exists"
+            try:
+                if current is None:
+                    collection.create_index(spec.keys, name=spec.name, **{k: v for k, v in spec.options.items() if k != "name"})
+                    status = "created"
+                elif not _same_options(current, spec):
+                    if _only_ttl_differs(current, spec):
+                        # Retention period changed; collMod updates a TTL in place without a rebuild
+                        db.command("collMod", collection_name, index={"name": current["name"], "expireAfterSeconds": spec.options["expireAfterSeconds"]})
+                        status = "ttl_updated"
+                    elif not rebuild_conflicts:
+                        status = "conflict"
+                        logger.warning(f"Index {collection_name}.{current['name']} differs from registry; run 'python indexes.py apply --rebuild-conflicts'")
+                    else:
+                        collection.drop_index(current["name"])
+                        collection.create_index(spec.keys, name=spec.name, **{k: v for k, v in spec.options.items() if k != "name"})
+                        status = "rebuilt"
+            except OperationFailure as e:
+                status = "error"
+                logger.error(f"Failed to create index {collection_name}.{spec.name}: {e}")
+            report.append({"collection": collection_name, "index": spec.name, "status": status})
+    created = sum(1 for item in report if item["status"] in ("created", "rebuilt", "ttl_updated"))
+    logger.info(f"Index registry applied: {created} created, {len(report) - created} unchanged or skipped")
+    return report
+
+
+def _plan_stages(plan):
+    stages = [plan.get("stage")]
+    for child_key in ("inputStage", "outerStage", "innerStage"):
+        if child_key in plan:
+            stages.extend(_plan_stages(plan[child_key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return [stage for stage in stages if stage]
+
+
+def explain_report(db=None):
+    """Explain every known query shape and flag the ones that fall back to a collection scan."""
+    db = db if db is not None else mongo.get_database()
+    report = []
+    for collection_name, description, query_filter, sort in known_query_shapes():
+        command = {"find": collection_name, "filter": query_filter}
+        if sort:
+            command["sort"] = dict(sort)
+        try:
+            explanation = db.command("explain", command, verbosity="queryPlanner")
+            winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+            # Newer servers nest the classic plan under queryPlan
+            stages = _plan_stages(winning_plan.get("queryPlan", winning_plan))
+            report.append({
+                "collection": collection_name,
+                "query": description,
+                "stages": stages,
+                "collscan": "COLLSCAN" in stages,
+            })
+        except Exception as e:
+            report.append({"collection": collection_name, "query": description, "error": str(e)})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage CyberShield-AI MongoDB indexes")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    apply_parser = subcommands.add_parser("apply", help="Create missing indexes from the registry")
+    apply_parser.add_argument("--rebuild-conflicts", action="store_true", help="Drop and recreate indexes whose options differ")
+    subcommands.add_parser("report", help="Explain known query shapes and flag COLLSCANs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "apply":
+        result = ensure_indexes(rebuild_conflicts=args.rebuild_conflicts)
+    else:
+        result = explain_report()
+        collscans = [item for item in result if item.get("collscan")]
+        print(f"{len(collscans)} of {len(result)} query shapes use a COLLSCAN")
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
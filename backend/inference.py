@@ -0,0 +1,189 @@
+"""
+Inference module for CyberShield-AI.
+Scores text with the lexicon and the transformer classifier, micro-batching concurrent requests into one forward pass.
+"""
+
+from concurrent.futures import Future
+from collections import deque
+from fastapi import HTTPException
+from lexicon import lexicon_engine
+from model_manager import model_manager
+import asyncio
+import logging
+import os
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger("inference")
+
+
+class MicroBatcher:
+    """Collects items for up to max_wait_ms and hands them to predict_fn as one batch on a worker thread."""
+
+    def __init__(self, predict_fn):
+        self.predict_fn = predict_fn
+        self.max_batch_size = int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", "32"))
+        self.max_wait = float(os.environ.get("INFERENCE_MAX_WAIT_MS", "5")) / 1000
+        self.max_queue = int(os.environ.get("INFERENCE_MAX_QUEUE", "1024"))
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.items = 0
+        self.batches = 0
+        self.rejected = 0
+        self.largest_batch = 0
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        with self._cond:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+    def submit(self, item):
+        """Queue one item and return a concurrent Future for its prediction."""
+        future = Future()
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Inference queue is full. Please retry shortly.",
+                    headers={"Retry-After": "1"}
+                )
+            self._queue.append((item, future))
+            self._cond.notify()
+        return future
+
+    async def predict(self, items):
+        """Await predictions for items; they share batches with every other concurrent caller."""
+        futures = []
+        try:
+            for item in items:
+                futures.append(self.submit(item))
+        except HTTPException:
+            # Items already queued for this call are dropped before their batch runs
+            for future in futures:
+                future.cancel()
+            raise
+        return await asyncio.gather(*[asyncio.wrap_future(future) for future in futures])
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._queue and not self._stopping:
+                self._cond.wait()
+            if not self._queue:
+                return None
+            # Give concurrent requests a few milliseconds to join the batch
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = []
+            while self._queue and len(batch) < self.max_batch_size:
+                batch.append(self._queue.popleft())
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            # Callers cancelled while queued are skipped; the rest can no longer be cancelled mid-batch
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = list(self.predict_fn(items))
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+                if len(results) < len(batch):
+                    raise RuntimeError(f"Classifier returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                logger.error(f"Inference batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self.items += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self):
+        return {
+            "queued": len(self._queue),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "items": self.items,
+            "batches": self.batches,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest_batch,
+            "rejected": self.rejected,
+        }
+
+
+class HateSpeechAnalyzer:
+    """Combines lexicon matches with the classifier score when a model is installed."""
+
+    def __init__(self, classifier=None, lexicon=None):
+        self.classifier = classifier or model_manager
+        self.lexicon = lexicon or lexicon_engine
+        self.threshold = float(os.environ.get("HATE_MODEL_THRESHOLD", "0.5"))
+        self.batcher = MicroBatcher(self.classifier.predict)
+
+    @property
+    def version(self):
+        """Changes whenever the lexicon reloads or the classifier comes up, so stale cached results are never served."""
+        return f"{self.lexicon.version}/{self.classifier.version}"
+
+    def start(self):
+        # The batcher thread starts on first use; until the model is ready results are lexicon-only
+        self.classifier.start()
+
+    def stop(self):
+        self.batcher.stop()
+
+    async def analyze_many(self, texts):
+        """Return one result dict per text, in order."""
+        results = []
+        for text in texts:
+            is_hate_speech, matched_terms, score = self.lexicon.analyze(text)
+            results.append({"isHateSpeech": is_hate_speech, "matchedTerms": matched_terms, "score": score, "modelScore": None})
+        if self.classifier.available:
+            for result, probability in zip(results, await self.batcher.predict(texts)):
+                result["modelScore"] = round(probability, 4)
+                result["score"] = max(result["score"], result["modelScore"])
+                result["isHateSpeech"] = result["isHateSpeech"] or probability >= self.threshold
+        return results
+
+    async def analyze(self, text):
+        return (await self.analyze_many([text]))[0]
+
+    def stats(self):
+        return {
+            "model": self.classifier.stats(),
+            "threshold": self.threshold,
+            "batcher": self.batcher.stats(),
+        }
+
+
+# Create a single instance
+hate_speech_analyzer = HateSpeechAnalyzer()
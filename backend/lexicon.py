@@ -0,0 +1,244 @@
+"""
+Lexicon module for CyberShield-AI.
+Compiles the hate-speech lexicon into a single trie-shaped regex and matches normalized text against it.
+
+Lexicon file format (one entry per line, '#' starts a comment):
+    term                 exact word or phrase, weight 1.0
+    term<TAB>0.4         exact word or phrase with a weight
+    term*                the term followed by any word suffix (hate* matches hateful)
+"""
+
+from datetime import datetime
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+
+# Set up logging
+logger = logging.getLogger("lexicon")
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicon.txt")
+
+# Common character substitutions used to dodge keyword filters
+LEET_MAP = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s", "!": "i", "|": "i"})
+_LEET_TOKEN = re.compile(r"[\w@$!|]+")
+_SPACED_LETTERS = re.compile(r"(?<!\w)(?:\w[.\-_*]){2,}\w(?!\w)")
+_SEPARATORS = re.compile(r"[.\-_*]")
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _deleet(match):
+    token = match.group()
+    # Plain numbers stay numbers; only tokens that already contain letters are decoded
+    if not any(ch.isalpha() for ch in token):
+        return token
+    # Trailing "!!!" is punctuation, not a disguised "i"
+    stripped = token.rstrip("!|")
+    return stripped.translate(LEET_MAP) + token[len(stripped):]
+
+
+def normalize(text):
+    """Casefold, strip accents, undo leetspeak and letter spacing, and collapse whitespace."""
+    if text.isascii():
+        text = text.lower()
+    else:
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = _SPACED_LETTERS.sub(lambda match: _SEPARATORS.sub("", match.group()), text)
+    text = _LEET_TOKEN.sub(_deleet, text)
+    text = _NON_WORD.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _trie_pattern(terms):
+    """Regex source for a set of terms, factored by common prefix so matching cost tracks text length, not lexicon size."""
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        branches = []
+        for ch in sorted(key for key in node if key):
+            # Every character may be repeated ("haaate"), which also covers doubled letters in the lexicon
+            atom = re.escape(ch) + "+" if ch != " " else " "
+            tail = build(node[ch])
+            branches.append(atom + tail)
+        if not branches:
+            return ""
+        group = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return "(?:" + group + ")?"
+        return group
+
+    return build(trie)
+
+
+class CompiledLexicon:
+    """Immutable compiled form of one lexicon version; swapped atomically on reload."""
+
+    def __init__(self, entries, version):
+        self.version = version
+        self.exact = {}
+        self.prefixes = {}
+        for term, weight in entries:
+            is_prefix = term.endswith("*")
+            normalized = normalize(term.rstrip("*"))
+            if not normalized:
+                continue
+            target = self.prefixes if is_prefix else self.exact
+            if weight > target.get(normalized, (None, 0.0))[1]:
+                target[normalized] = (term, weight)
+        alternatives = []
+        if self.exact:
+            alternatives.append(r"(?:" + _trie_pattern(self.exact) + r")\b")
+        if self.prefixes:
+            alternatives.append(r"(?:" + _trie_pattern(self.prefixes) + r")\w*")
+        self.regex = re.compile(r"\b(?:" + "|".join(alternatives) + ")") if alternatives else None
+        self.term_count = len(self.exact) + len(self.prefixes)
+        self._squeeze = re.compile(r"(.)\1+")
+        self._exact_squeezed = {self._squeeze.sub(r"\1", key): key for key in self.exact}
+        self._prefix_squeezed = {self._squeeze.sub(r"\1", key): key for key in self.prefixes}
+
+    def _lookup(self, matched):
+        # Matches may repeat letters, so map them back through their squeezed form
+        squeezed = self._squeeze.sub(r"\1", matched)
+        if squeezed in self._exact_squeezed:
+            return self.exact[self._exact_squeezed[squeezed]]
+        for end in range(len(squeezed), 0, -1):
+            key = self._prefix_squeezed.get(squeezed[:end])
+            if key is not None:
+                return self.prefixes[key]
+        return None
+
+    def match(self, normalized_text):
+        """Return {lexicon term: weight} for every entry found in already-normalized text."""
+        if self.regex is None:
+            return {}
+        found = {}
+        for matched in self.regex.findall(normalized_text):
+            entry = self._lookup(matched)
+            if entry is not None:
+                found[entry[0]] = entry[1]
+        return found
+
+
+def parse_lexicon(lines):
+    entries = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        term, _, weight = line.partition("\t")
+        try:
+            entries.append((term.strip(), float(weight) if weight.strip() else 1.0))
+        except ValueError:
+            logger.warning(f"Skipping lexicon entry with invalid weight: {line}")
+    return entries
+
+
+class LexiconEngine:
+    """Loads the lexicon file once, reloads it when it changes, and scores text against it."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("HATE_LEXICON_PATH", DEFAULT_LEXICON_PATH)
+        self.threshold = float(os.environ.get("HATE_SCORE_THRESHOLD", "0.5"))
+        self.reload_interval = float(os.environ.get("LEXICON_RELOAD_INTERVAL_SECONDS", "30"))
+        self._compiled = None
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._task = None
+        self.loaded_at = None
+        self.compile_seconds = None
+        self.loads = 0
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            self.load()
+        return self._compiled
+
+    @property
+    def version(self):
+        return self.compiled.version
+
+    def load(self, entries=None):
+        """Compile the lexicon file (or the given entries) and swap it in; the old version serves until then."""
+        with self._lock:
+            started = time.perf_counter()
+            mtime = None
+            if entries is None:
+                mtime = os.path.getmtime(self.path)
+                with open(self.path, encoding="utf-8") as lexicon_file:
+                    raw = lexicon_file.read()
+                entries = parse_lexicon(raw.splitlines())
+            else:
+                raw = "\n".join(f"{term}\t{weight}" for term, weight in entries)
+            version = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+            compiled = CompiledLexicon(entries, version)
+            self._compiled = compiled
+            self._mtime = mtime
+            self.compile_seconds = round(time.perf_counter() - started, 4)
+            self.loaded_at = datetime.utcnow()
+            self.loads += 1
+        logger.info(f"Loaded lexicon {version} with {compiled.term_count} terms in {self.compile_seconds}s")
+        return compiled
+
+    def reload_if_changed(self):
+        try:
+            if self._mtime is not None and os.path.getmtime(self.path) != self._mtime:
+                self.load()
+                return True
+        except Exception as e:
+            logger.error(f"Lexicon reload failed, keeping version {self._compiled.version if self._compiled else None}: {e}")
+        return False
+
+    def analyze(self, text):
+        """Return (is_hate_speech, matched_terms, score) for one text."""
+        matches = self.compiled.match(normalize(text))
+        score = round(min(1.0, sum(matches.values())), 4)
+        return score >= self.threshold, sorted(matches), score
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            # Compiling a large lexicon takes a while; keep it off the event loop
+            await loop.run_in_executor(None, self.reload_if_changed)
+
+    def start(self):
+        self.compiled
+        if self.reload_interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        compiled = self._compiled
+        return {
+            "path": self.path,
+            "version": compiled.version if compiled else None,
+            "terms": compiled.term_count if compiled else 0,
+            "threshold": self.threshold,
+            "compile_seconds": self.compile_seconds,
+            "loaded_at": str(self.loaded_at) if self.loaded_at else None,
+            "loads": self.loads,
+        }
+
+
+# Create a single instance
+lexicon_engine = LexiconEngine()
@@ -0,0 +1,191 @@
+"""
+Live feed module for CyberShield-AI.
+Fans out freshly written security events and login attempts to every connected dashboard from one in-process source.
+"""
+
+from collections import deque
+from itertools import islice
+import asyncio
+import logging
+import os
+import uuid
+
+# Set up logging
+logger = logging.getLogger("live_feed")
+
+
+class LiveFeedFull(RuntimeError):
+    """Raised by subscribe when every client slot is taken."""
+
+
+class LiveFeed:
+    """Shared ring buffer of feed entries fed by the log pipeline; each client reads it at its own pace."""
+
+    def __init__(self):
+        self.buffer_size = int(os.environ.get("LIVE_FEED_BUFFER", "2000"))
+        self.heartbeat_seconds = float(os.environ.get("LIVE_FEED_HEARTBEAT_SECONDS", "15"))
+        self.metrics_interval = float(os.environ.get("LIVE_FEED_METRICS_INTERVAL_SECONDS", "10"))
+        self.max_clients = int(os.environ.get("LIVE_FEED_MAX_CLIENTS", "200"))
+        # Resume tokens are only meaningful within one process lifetime
+        self.epoch = uuid.uuid4().hex[:8]
+        self.formatters = {}
+        self._buffer = deque(maxlen=self.buffer_size)
+        self._next_seq = 1
+        self._changed = None
+        self._loop = None
+        self._task = None
+        self._deltas = {}
+        self.clients = 0
+        self.published = 0
+        self.gaps = 0
+        self.rejected = 0
+
+    def set_formatter(self, collection, formatter):
+        """Publish documents written to collection, shaped by formatter(document)."""
+        self.formatters[collection] = formatter
+
+    @property
+    def full(self):
+        return self.clients >= self.max_clients
+
+    def token(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def _parse_token(self, token):
+        epoch, _, seq = (token or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def on_batch(self, collection, documents):
+        """Log pipeline listener; runs on the pipeline thread after the batch is stored."""
+        formatter = self.formatters.get(collection)
+        if formatter is None or self._loop is None:
+            return
+        entries = []
+        for document in documents:
+            try:
+                entries.append({"type": collection, "data": formatter(document)})
+            except Exception as e:
+                logger.error(f"Failed to format {collection} document for the live feed: {e}")
+        if entries:
+            self._loop.call_soon_threadsafe(self._publish, entries)
+
+    def _count_delta(self, entry):
+        data = entry["data"]
+        if entry["type"] == "login_logs":
+            key = f"logins.{data.get('status') or 'unknown'}"
+        elif entry["type"] == "security_events":
+            key = f"events.{data.get('severity') or 'unknown'}"
+        else:
+            return
+        self._deltas[key] = self._deltas.get(key, 0) + 1
+
+    def _publish(self, entries):
+        # Event loop thread only
+        for entry in entries:
+            self._buffer.append((self._next_seq, entry))
+            self._next_seq += 1
+            self.published += 1
+            self._count_delta(entry)
+        self._wake()
+
+    def _wake(self):
+        if self._changed is not None:
+            self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _emit_metrics(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            if self._deltas:
+                deltas, self._deltas = self._deltas, {}
+                self._buffer.append((self._next_seq, {"type": "metrics", "data": {"interval_seconds": self.metrics_interval, "deltas": deltas}}))
+                self._next_seq += 1
+                self._wake()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        if self._task is None and self.metrics_interval > 0:
+            self._task = self._loop.create_task(self._emit_metrics())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Wake every client so its stream ends instead of waiting for a heartbeat
+        self._loop = None
+        if self._changed is not None:
+            self._changed.set()
+
+    def _entries_after(self, seq):
+        if not self._buffer or self._buffer[-1][0] <= seq:
+            return []
+        first = self._buffer[0][0]
+        # Copy just the tail; the buffer keeps changing while this client is sending
+        return list(islice(self._buffer, max(0, seq + 1 - first), None))
+
+    async def subscribe(self, resume_token=None, types=None):
+        """
+        Async-iterate (token, entry) for new entries, or (None, None) as a heartbeat.
+
+        With a resume token from this process the client first receives everything it missed that is
+        still buffered; if the gap is older than the buffer it gets a "reset" entry and should reload.
+        """
+        if self.full:
+            self.rejected += 1
+            raise LiveFeedFull("Live feed is at its client limit")
+        self.clients += 1
+        try:
+            seq = self._parse_token(resume_token) if resume_token else None
+            if seq is None:
+                if resume_token:
+                    self.gaps += 1
+                    yield self.token(self._next_seq - 1), {"type": "reset", "data": {"reason": "unknown resume token"}}
+                seq = self._next_seq - 1
+            elif self._buffer and seq + 1 < self._buffer[0][0]:
+                self.gaps += 1
+                yield self.token(self._next_seq - 1), {"type": "reset", "data": {"reason": "resume point no longer buffered"}}
+                seq = self._next_seq - 1
+
+            while self._loop is not None:
+                changed = self._changed
+                entries = self._entries_after(seq)
+                if not entries:
+                    try:
+                        await asyncio.wait_for(changed.wait(), self.heartbeat_seconds)
+                    except asyncio.TimeoutError:
+                        yield None, None
+                    continue
+                if seq + 1 < entries[0][0]:
+                    # This client fell further behind than the buffer holds
+                    self.gaps += 1
+                    yield self.token(entries[0][0] - 1), {"type": "reset", "data": {"reason": "client fell behind"}}
+                for entry_seq, entry in entries:
+                    seq = entry_seq
+                    if types is None or entry["type"] in types or entry["type"] == "metrics":
+                        # Each yield waits for this client's send, so a slow client only slows itself
+                        yield self.token(entry_seq), entry
+        finally:
+            self.clients -= 1
+
+    def stats(self):
+        return {
+            "clients": self.clients,
+            "max_clients": self.max_clients,
+            "buffered": len(self._buffer),
+            "buffer_size": self.buffer_size,
+            "published": self.published,
+            "last_token": self.token(self._next_seq - 1),
+            "gaps": self.gaps,
+            "rejected": self.rejected,
+        }
+
+
+# Create a single instance
+live_feed = LiveFeed()
@@ -0,0 +1,210 @@
+"""
+Log shipping pipeline for CyberShield-AI.
+Buffers audit documents in a bounded queue and writes them to MongoDB in batches from a background thread.
+"""
+
+from bson import ObjectId, json_util
+from collections import deque
+from database import mongo
+from pymongo.errors import BulkWriteError
+import logging
+import os
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger("log_pipeline")
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_SPILL = "spill"
+
+
+def _mongo_writer(collection, documents):
+    """Default sink: unordered bulk insert into the shared database."""
+    try:
+        mongo.get_database()[collection].insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        # Unordered inserts keep going past bad documents (e.g. duplicate ids from a replayed spill)
+        logger.warning(f"Bulk insert into {collection} skipped {len(e.details.get('writeErrors', []))} documents")
+
+
+class LogPipeline:
+    """Bounded queue of (collection, document) pairs flushed by a single worker thread."""
+
+    def __init__(self, writer=None, name="log-pipeline", env_prefix="LOG_PIPELINE", spill_path="log_spill.jsonl"):
+        # Separate instances (e.g. analysis results) get their own thread, bound and LOG_PIPELINE-style settings
+        self.name = name
+        self.max_queue = int(os.environ.get(f"{env_prefix}_MAX_QUEUE", "10000"))
+        self.batch_size = int(os.environ.get(f"{env_prefix}_BATCH_SIZE", "500"))
+        self.flush_interval = float(os.environ.get(f"{env_prefix}_FLUSH_INTERVAL_SECONDS", "0.5"))
+        self.overflow_policy = os.environ.get(f"{env_prefix}_OVERFLOW", OVERFLOW_DROP_OLDEST)
+        self.spill_path = os.environ.get(f"{env_prefix}_SPILL_PATH", spill_path)
+        self.writer = writer or _mongo_writer
+        self._writers = {}
+        self._listeners = []
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed_batches = 0
+        self.batches = 0
+
+    def start(self):
+        """Start the flush worker; safe to call more than once."""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        self._replay_spill()
+
+    def stop(self, timeout=10.0):
+        """Drain everything still queued, then stop the worker."""
+        with self._cond:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        thread.join(timeout)
+        with self._cond:
+            self._thread = None
+        if self._queue:
+            logger.warning(f"Log pipeline stopped with {len(self._queue)} documents still queued")
+
+    def set_writer(self, collection, writer):
+        """Write batches for one collection with writer(collection, documents) instead of the default insert."""
+        self._writers[collection] = writer
+
+    def add_listener(self, listener):
+        """Call listener(collection, documents) after each batch is written; used for derived counters."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def enqueue(self, collection, document):
+        """Queue a document for writing and return its pre-assigned id without waiting on the database."""
+        document.setdefault("_id", ObjectId())
+        if self._thread is None:
+            self.start()
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._overflow()
+            self._queue.append((collection, document))
+            self.enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return str(document["_id"])
+
+    def flush(self):
+        """Write everything queued right now from the calling thread."""
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            self._write(batch)
+
+    def _overflow(self):
+        # Called with the lock held; makes room for one new document
+        oldest = self._queue.popleft()
+        if self.overflow_policy == OVERFLOW_SPILL:
+            self._spill([oldest])
+        else:
+            self.dropped += 1
+
+    def _take_batch(self):
+        with self._cond:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+            elif stopping:
+                return
+
+    def _write(self, batch):
+        grouped = {}
+        for collection, document in batch:
+            grouped.setdefault(collection, []).append(document)
+        for collection, documents in grouped.items():
+            try:
+                self._writers.get(collection, self.writer)(collection, documents)
+                with self._cond:
+                    self.flushed += len(documents)
+                    self.batches += 1
+            except Exception as e:
+                logger.error(f"Failed to flush {len(documents)} documents to {collection}: {e}")
+                with self._cond:
+                    self.failed_batches += 1
+                    if self.overflow_policy == OVERFLOW_SPILL:
+                        self._spill([(collection, document) for document in documents])
+                    else:
+                        self.dropped += len(documents)
+                # Back off so a database outage does not spin the worker
+                if not self._stopping:
+                    time.sleep(self.flush_interval)
+                continue
+            for listener in self._listeners:
+                try:
+                    listener(collection, documents)
+                except Exception as e:
+                    logger.error(f"Log pipeline listener failed for {collection}: {e}")
+
+    def _spill(self, entries):
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as spill_file:
+                for collection, document in entries:
+                    spill_file.write(json_util.dumps({"collection": collection, "document": document}) + "\n")
+            self.spilled += len(entries)
+        except OSError as e:
+            logger.error(f"Failed to spill {len(entries)} documents to {self.spill_path}: {e}")
+            self.dropped += len(entries)
+
+    def _replay_spill(self):
+        """Re-queue documents spilled to disk by an earlier run."""
+        if not os.path.exists(self.spill_path):
+            return
+        replay_path = f"{self.spill_path}.replay"
+        try:
+            os.replace(self.spill_path, replay_path)
+            with open(replay_path, encoding="utf-8") as spill_file:
+                for line in spill_file:
+                    if line.strip():
+                        entry = json_util.loads(line)
+                        self.enqueue(entry["collection"], entry["document"])
+            os.remove(replay_path)
+        except Exception as e:
+            logger.error(f"Failed to replay spilled logs from {self.spill_path}: {e}")
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "max_queue": self.max_queue,
+                "batch_size": self.batch_size,
+                "overflow_policy": self.overflow_policy,
+                "enqueued": self.enqueued,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "running": self._thread is not None and self._thread.is_alive(),
+            }
+
+
+# Create a single instance
+log_pipeline = LogPipeline()
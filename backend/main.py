@@ -3,34 +3,77 @@ print(sys.path)
 
 from auth_email import router as auth_email_router  # Changed import
 from auth_phone import router as auth_phone_router # Changed import
-from pymongo import MongoClient
-from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException, Depends
+from security_dashboard import router as security_dashboard_router
+from security_monitor_api import router as security_monitor_router
+from db_admin import router as db_admin_router
+from database import mongo, get_db
+from repositories import repos, run_db
+from password_hasher import password_hasher
+from log_pipeline import log_pipeline
+from rate_limiter import login_rate_limiter
+from indexes import ensure_indexes
+from retention import retention_engine
+from dashboard_metrics import dashboard_metrics
+from response_cache import response_cache
+from lexicon import lexicon_engine
+from inference import hate_speech_analyzer
+from analysis_cache import analysis_cache
+from analysis_store import analysis_store
+from chunking import chunked_analyzer
+from request_limits import BodySizeLimitMiddleware
+from model_manager import model_manager
+from token_verifier import token_verifier
+from live_feed import live_feed
+from threat_detector import threat_detector
+from heavy_hitters import heavy_hitters
+from pagination import EXPORT_MAX_ROWS, date_range_filter, iter_batches, stream_json_object, stream_ndjson
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Depends, Query
 from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware  # Import CORSMiddleware
-from fastapi.responses import JSONResponse # Import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse # Import JSONResponse
+from typing import List, Optional
 import traceback
+import json
+import os
 
-# MongoDB connection function
-def get_db():
-    # Use the container name for Docker networking
-    MONGO_URI = "mongodb://cybershield-mongodb:27017"
-    print(f"Connecting to MongoDB at: {MONGO_URI}")
-    
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the shared MongoDB connection pool once per worker process
+    mongo.connect()
     try:
-        client = MongoClient(MONGO_URI)
-        db = client['cybershield_db']
-        
-        # Test the connection
-        client.admin.command('ping')
-        print("MongoDB connection successful in main.py")
-        
-        return db
+        ensure_indexes()
     except Exception as e:
-        print(f"MongoDB connection error in main.py: {e}")
-        raise HTTPException(status_code=500, detail=f"Database connection error: {str(e)}")
+        print(f"Index creation skipped at startup: {e}")
+    log_pipeline.add_listener(dashboard_metrics.apply_batch)
+    log_pipeline.add_listener(live_feed.on_batch)
+    log_pipeline.add_listener(threat_detector.on_batch)
+    log_pipeline.add_listener(heavy_hitters.on_batch)
+    analysis_store.start()
+    log_pipeline.start()
+    retention_engine.start()
+    lexicon_engine.start()
+    hate_speech_analyzer.start()
+    token_verifier.start()
+    live_feed.start()
+    threat_detector.start()
+    heavy_hitters.start()
+    yield
+    await heavy_hitters.stop()
+    await threat_detector.stop()
+    await live_feed.stop()
+    await token_verifier.stop()
+    hate_speech_analyzer.stop()
+    await lexicon_engine.stop()
+    await retention_engine.stop()
+    password_hasher.shutdown()
+    # Drain queued audit logs and analysis results before the pool goes away
+    analysis_store.stop()
+    log_pipeline.stop()
+    mongo.close()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 origins = [
@@ -55,44 +98,96 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Refuse oversized documents before they are read into memory and parsed
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=int(os.environ.get("ANALYZE_MAX_BODY_BYTES", str(8 * 1024 * 1024))),
+    path_prefixes=("/analyze",),
+)
+
 # Include authentication routers
 app.include_router(auth_email_router, prefix="/auth/email", tags=["email_auth"])
 app.include_router(auth_phone_router, prefix="/auth/phone", tags=["phone_auth"])
 
+# Include security monitoring and admin routers
+app.include_router(security_dashboard_router)
+app.include_router(security_monitor_router)
+app.include_router(db_admin_router, prefix="/db-admin", tags=["db_admin"])
+
 # Define a model for the incoming text
 class AnalysisRequest(BaseModel):
     text: str
+    # None analyzes in overlapping windows only when the text is longer than one window
+    chunked: Optional[bool] = None
+    early_exit: bool = False
+    # Per-window results cannot come from the cache; leave them out to serve repeated long texts from it
+    include_chunks: bool = True
+
+# Define a model for a batch of texts
+class BatchAnalysisRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=int(os.environ.get("ANALYZE_BATCH_MAX_ITEMS", "256")))
+
+# Define a model for one window of a chunked analysis
+class ChunkResult(BaseModel):
+    start: int
+    end: int
+    isHateSpeech: bool
+    matchedTerms: List[str] = []
+    score: float = 0.0
+    modelScore: Optional[float] = None
 
 # Define a model for the analysis response
 class AnalysisResponse(BaseModel):
     isHateSpeech: bool
+    matchedTerms: List[str] = []
+    score: float = 0.0
+    modelScore: Optional[float] = None
+    chunks: Optional[List[ChunkResult]] = None
+    stoppedEarly: Optional[bool] = None
 
-# Mock implementation of hate speech detection (replace with your actual logic)
+class BatchAnalysisResponse(BaseModel):
+    results: List[AnalysisResponse]
+
+# Lexicon-based hate speech detection; the lexicon is compiled once and hot-reloaded
 def detect_hate_speech(text: str) -> bool:
-    # This is a placeholder - replace with your actual hate speech detection logic
-    # For example, you could use a machine learning model or a rule-based system
-    hate_keywords = ["hate", "kill", "stupid"]  # Example keywords
-    text = text.lower()
-    for keyword in hate_keywords:
-        if keyword in text:
-            return True
-    return False
+    is_hate_speech, _, _ = lexicon_engine.analyze(text)
+    return is_hate_speech
 
 # New endpoint for text analysis
 @app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_text(request: AnalysisRequest, db = Depends(get_db)):
+async def analyze_text(request: AnalysisRequest):
     try:
-        is_hate_speech = detect_hate_speech(request.text)
+        chunked = request.chunked if request.chunked is not None else chunked_analyzer.needs_chunking(request.text)
+        if chunked:
+            result = await chunked_analyzer.analyze(request.text, early_exit=request.early_exit, include_chunks=request.include_chunks)
+        else:
+            # Repeated content is answered from the analysis cache; new text shares classifier batches
+            result = await analysis_cache.analyze(request.text)
+        return AnalysisResponse(**result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Store the analysis result in MongoDB (optional)
-        analysis_collection = db["analysis_results"]
-        analysis_collection.insert_one({
-            "text": request.text,
-            "is_hate_speech": is_hate_speech,
-            "timestamp": datetime.utcnow()
-        })
+@app.post("/analyze/stream")
+async def analyze_stream(request: AnalysisRequest):
+    """Chunked analysis as NDJSON: one line per window as it is scored, then a summary line."""
+    async def lines():
+        chunks = []
+        async for chunk in chunked_analyzer.iter_chunks(request.text, early_exit=request.early_exit):
+            chunks.append(chunk)
+            yield json.dumps({"chunk": ChunkResult(**chunk).model_dump()}) + "\n"
+        summary = chunked_analyzer.summarize(request.text, chunks)
+        yield json.dumps({"summary": summary}) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
-        return AnalysisResponse(isHateSpeech=is_hate_speech)
+@app.post("/analyze/batch", response_model=BatchAnalysisResponse)
+async def analyze_batch(request: BatchAnalysisRequest):
+    try:
+        results = await analysis_cache.analyze_many(request.texts)
+        return BatchAnalysisResponse(results=[AnalysisResponse(**result) for result in results])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -102,21 +197,10 @@ def home():
 
 # Add a direct logs checking endpoint
 @app.get("/direct-check-logs")
-async def direct_check_logs():
+async def direct_check_logs(db = Depends(get_db)):
     try:
-        # Connect directly to MongoDB in the container
-        client = MongoClient("mongodb://cybershield-mongodb:27017")
-        db = client['cybershield_db']
-        
         # List all collections
-        collections = db.list_collection_names()
-        
-        # Check if login_logs exists
-        if "login_logs" not in collections:
-            db.create_collection("login_logs")
-            print("Created login_logs collection")
-        
-        login_logs_collection = db["login_logs"]
+        collections = await run_db(db.list_collection_names)
         
         # Insert a test document
         test_doc = {
@@ -126,13 +210,13 @@ async def direct_check_logs():
             "source": "direct_endpoint"
         }
         
-        result = login_logs_collection.insert_one(test_doc)
+        result = await repos.login_logs.insert_one(test_doc)
         
         # Count documents
-        log_count = login_logs_collection.count_documents({})
+        log_count = await repos.login_logs.count_documents({})
         
         # Find logs
-        logs = list(login_logs_collection.find().sort("timestamp", -1).limit(10))
+        logs = await repos.login_logs.recent(limit=10)
         
         # Format for response
         formatted_logs = []
@@ -149,8 +233,8 @@ async def direct_check_logs():
         
         return {
             "message": "Direct logs check completed",
-            "mongodb_uri": "mongodb://cybershield-mongodb:27017",
-            "database": "cybershield_db",
+            "mongodb_uri": mongo.uri,
+            "database": db.name,
             "collections": collections,
             "login_logs_count": log_count,
             "test_document_id": str(result.inserted_id),
@@ -164,47 +248,64 @@ async def direct_check_logs():
         }
 
 @app.get("/logs", tags=["logs"])
-async def view_logs():
-    """Simple endpoint to view all logs."""
-    try:
-        # Connect directly to MongoDB
-        client = MongoClient("mongodb://cybershield-mongodb:27017")
-        db = client['cybershield_db']
-        
-        # Check if login_logs exists
-        collections = db.list_collection_names()
-        if "login_logs" not in collections:
-            return {"message": "No login_logs collection found", "collections": collections}
-        
-        # Get all logs
-        logs = list(db.login_logs.find().sort("timestamp", -1))
-        
-        # Format logs for response
-        formatted_logs = []
-        for log in logs:
-            formatted_logs.append({
-                "id": str(log.get("_id")),
-                "email": log.get("email", ""),
-                "timestamp": str(log.get("timestamp", "")),
-                "status": log.get("status", ""),
-                "reason": log.get("reason", ""),
-                "source": log.get("source", "")
-            })
-        
+async def view_logs(
+    limit: int = Query(1000, ge=1, le=EXPORT_MAX_ROWS, description="Maximum number of logs"),
+    from_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    to_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """View recent login logs, streamed newest first."""
+    filter_criteria = date_range_filter(from_date, to_date)
+    projection = {"email": 1, "timestamp": 1, "status": 1, "reason": 1, "source": 1}
+    
+    def format_log(log):
         return {
-            "message": "Logs retrieved",
-            "count": len(formatted_logs),
-            "logs": formatted_logs
-        }
-    except Exception as e:
-        return {
-            "error": str(e),
-            "traceback": traceback.format_exc()
+            "id": str(log.get("_id")),
+            "email": log.get("email", ""),
+            "timestamp": str(log.get("timestamp", "")),
+            "status": log.get("status", ""),
+            "reason": log.get("reason", ""),
+            "source": log.get("source", "")
         }
+    
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_ndjson(repos.login_logs, filter_criteria, format_log, limit=limit, projection=projection),
+            media_type="application/x-ndjson"
+        )
+    logs = iter_batches(repos.login_logs, filter_criteria, format_log, limit=limit, projection=projection)
+    return StreamingResponse(
+        stream_json_object([("message", "Logs retrieved", None), ("logs", logs, "count")]),
+        media_type="application/json"
+    )
+
+@app.get("/metrics")
+def metrics():
+    """Runtime statistics for the backend's shared subsystems."""
+    return {
+        "mongo_pool": mongo.stats(),
+        "password_hasher": password_hasher.stats(),
+        "log_pipeline": log_pipeline.stats(),
+        "login_rate_limiter": login_rate_limiter.stats(),
+        "retention": retention_engine.stats(),
+        "dashboard_metrics": dashboard_metrics.stats(),
+        "response_cache": response_cache.stats(),
+        "lexicon": lexicon_engine.stats(),
+        "inference": hate_speech_analyzer.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "analysis_store": analysis_store.stats(),
+        "chunking": chunked_analyzer.stats(),
+        "token_verifier": token_verifier.stats(),
+        "live_feed": live_feed.stats(),
+        "threat_detector": threat_detector.stats(),
+        "heavy_hitters": heavy_hitters.stats()
+    }
 
 @app.get("/health")
 def health_check():
-    """Health check endpoint for Docker."""
+    """Health check endpoint for Docker; reports starting until the classifier has warmed up."""
+    if not model_manager.ready:
+        return JSONResponse(status_code=503, content={"status": "starting", "model": model_manager.state})
     return {"status": "healthy"}
 
 if __name__ == "__main__":
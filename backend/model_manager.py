@@ -0,0 +1,227 @@
+"""
+Model manager module for CyberShield-AI.
+Loads the hate-speech classifier from the models volume once per worker, warms it up and exports it.
+
+Usage:
+    python model_manager.py export --format onnx --output /app/models/hate-speech.onnx
+    python model_manager.py export --format torchscript --output /app/models/hate-speech.pt
+"""
+
+from datetime import datetime
+import argparse
+import logging
+import os
+import threading
+import time
+
+try:
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+except ImportError:  # CPU image without the ML stack; /analyze falls back to the lexicon
+    torch = None
+
+# Set up logging
+logger = logging.getLogger("model_manager")
+
+STATE_DISABLED = "disabled"
+STATE_LOADING = "loading"
+STATE_WARMING = "warming"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+# Label names (lower-cased) that mark the hate-speech class in a model's id2label
+POSITIVE_LABELS = frozenset({"hate", "hateful", "hate_speech", "toxic", "offensive", "abusive", "label_1"})
+
+WARMUP_TEXTS = [
+    "hello",
+    "This is a normal friendly message about the weekend.",
+    "I can't believe what you said yesterday, it was completely unacceptable and I am tired of it. " * 4,
+]
+
+
+class ModelManager:
+    """Owns the classifier for this worker: load, optional int8 quantization, warm-up, predict and export."""
+
+    def __init__(self, model_path=None, quantize=None):
+        self.model_path = model_path or os.environ.get("HATE_MODEL_PATH", "/app/models/hate-speech")
+        self.quantize = quantize or os.environ.get("INFERENCE_QUANTIZE", "none")
+        self.num_threads = int(os.environ.get("INFERENCE_THREADS", str(os.cpu_count() or 1)))
+        self.max_length = int(os.environ.get("INFERENCE_MAX_LENGTH", "256"))
+        self.warmup_rounds = int(os.environ.get("MODEL_WARMUP_ROUNDS", "3"))
+        self.model = None
+        self.tokenizer = None
+        self.positive_index = 1
+        self.state = STATE_DISABLED
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.loaded_at = None
+        self._thread = None
+
+    @property
+    def available(self):
+        return self.state == STATE_READY
+
+    @property
+    def version(self):
+        """Identifies which classifier produced a score; part of the analysis cache key."""
+        if not self.available:
+            return "lexicon-only"
+        return f"{os.path.basename(os.path.normpath(self.model_path))}:{self.quantize}"
+
+    @property
+    def ready(self):
+        """False only while a model is still loading or warming up; a missing model means lexicon-only mode."""
+        return self.state not in (STATE_LOADING, STATE_WARMING)
+
+    def start(self):
+        """Load in the background so the server can answer health checks while the model warms up."""
+        if torch is None:
+            self.error = "torch/transformers not installed"
+        elif not os.path.isdir(self.model_path):
+            self.error = f"no model at {self.model_path}"
+        elif self._thread is None:
+            self.state = STATE_LOADING
+            self._thread = threading.Thread(target=self.load, name="model-loader", daemon=True)
+            self._thread.start()
+            return
+        else:
+            return
+        logger.info(f"Transformer classifier disabled: {self.error}")
+
+    def load(self):
+        try:
+            self.state = STATE_LOADING
+            started = time.perf_counter()
+            torch.set_num_threads(self.num_threads)
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+            # safetensors weights are memory-mapped, so workers on one host share the read-only pages
+            model = AutoModelForSequenceClassification.from_pretrained(
+                self.model_path,
+                use_safetensors=os.path.exists(os.path.join(self.model_path, "model.safetensors")),
+                low_cpu_mem_usage=True,
+            ).eval()
+            if self.quantize == "int8":
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.model = model
+            self.positive_index = self._positive_index(model.config.id2label)
+            self.load_seconds = round(time.perf_counter() - started, 3)
+
+            self.state = STATE_WARMING
+            started = time.perf_counter()
+            self.warmup()
+            self.warmup_seconds = round(time.perf_counter() - started, 3)
+            self.loaded_at = datetime.utcnow()
+            self.state = STATE_READY
+            logger.info(f"Classifier ready ({self.quantize}) in {self.load_seconds}s + {self.warmup_seconds}s warm-up")
+        except Exception as e:
+            self.error = str(e)
+            self.state = STATE_FAILED
+            logger.error(f"Failed to load classifier from {self.model_path}: {e}")
+        return self.state == STATE_READY
+
+    def warmup(self):
+        # First passes allocate buffers and pick kernels; pay that before real traffic arrives
+        for _ in range(self.warmup_rounds):
+            self._forward(WARMUP_TEXTS)
+            for text in WARMUP_TEXTS:
+                self._forward([text])
+
+    @staticmethod
+    def _positive_index(id2label):
+        # Exact names only: a substring check would pick "NOT_HATE" and invert every score
+        for index, label in (id2label or {}).items():
+            name = str(label).strip().lower().replace("-", "_").replace(" ", "_")
+            if name.startswith(("not_", "non_")):
+                continue
+            if name in POSITIVE_LABELS:
+                return int(index)
+        return 1
+
+    def _encode(self, texts):
+        return self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="pt")
+
+    def _forward(self, texts):
+        with torch.inference_mode():
+            probabilities = torch.softmax(self.model(**self._encode(texts)).logits, dim=-1)
+            return probabilities[:, self.positive_index].tolist()
+
+    def predict(self, texts):
+        """One padded forward pass over the whole batch; returns the hate-speech probability per text."""
+        if self.model is None:
+            raise RuntimeError(f"Classifier is not loaded ({self.state})")
+        return self._forward(list(texts))
+
+    def export(self, export_format, output_path):
+        """Write the loaded fp32 model as ONNX or TorchScript for serving outside PyTorch eager mode."""
+        if self.model is None:
+            raise RuntimeError("Load the model before exporting it")
+        if self.quantize != "none":
+            raise RuntimeError("Export the fp32 model; quantize in the target runtime")
+        example = self._encode(WARMUP_TEXTS[:2])
+        inputs = (example["input_ids"], example["attention_mask"])
+        wrapper = _LogitsOnly(self.model).eval()
+        if export_format == "torchscript":
+            with torch.no_grad():
+                traced = torch.jit.trace(wrapper, inputs, strict=False)
+            traced.save(output_path)
+        elif export_format == "onnx":
+            torch.onnx.export(
+                wrapper, inputs, output_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={"input_ids": {0: "batch", 1: "sequence"}, "attention_mask": {0: "batch", 1: "sequence"}, "logits": {0: "batch"}},
+                opset_version=17,
+            )
+        else:
+            raise ValueError(f"Unknown export format: {export_format}")
+        logger.info(f"Exported {export_format} model to {output_path}")
+        return output_path
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "model_path": self.model_path,
+            "quantize": self.quantize,
+            "threads": self.num_threads,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "loaded_at": str(self.loaded_at) if self.loaded_at else None,
+        }
+
+
+if torch is not None:
+    class _LogitsOnly(torch.nn.Module):
+        """Tracing needs tensor outputs, not the transformers output object."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+# Create a single instance
+model_manager = ModelManager()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the CyberShield-AI hate-speech classifier")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    export_parser = subcommands.add_parser("export", help="Export the fp32 model to ONNX or TorchScript")
+    export_parser.add_argument("--format", choices=["onnx", "torchscript"], required=True)
+    export_parser.add_argument("--output", required=True)
+    export_parser.add_argument("--model-path", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    manager = ModelManager(model_path=args.model_path, quantize="none")
+    if torch is None or not manager.load():
+        raise SystemExit(f"Could not load model: {manager.error or 'torch/transformers not installed'}")
+    print(manager.export(args.format, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Pagination module for CyberShield-AI.
+Keyset pagination on (timestamp, _id) with opaque cursors, plus bounded JSON/NDJSON streaming over the same key order.
+"""
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+import base64
+import json
+import logging
+import os
+
+# Set up logging
+logger = logging.getLogger("pagination")
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_MAX_ROWS = int(os.environ.get("EXPORT_MAX_ROWS", "50000"))
+
+
+def keyset_sort(field="timestamp"):
+    """Newest first by field, with _id as the tie-break; field=None pages on _id alone."""
+    return [(field, -1), ("_id", -1)] if field else [("_id", -1)]
+
+
+def encode_cursor(document, field="timestamp"):
+    """Opaque token pointing just past the given document in keyset order."""
+    payload = json.dumps({"t": document[field].isoformat() if field else None, "i": str(document["_id"])})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        timestamp = datetime.fromisoformat(payload["t"]) if payload["t"] else None
+        return timestamp, ObjectId(payload["i"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(filter_criteria, cursor=None, field="timestamp"):
+    """Restrict a filter to documents that sort after the cursor."""
+    if not cursor:
+        return filter_criteria
+    timestamp, last_id = decode_cursor(cursor)
+    if field and timestamp is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if field:
+        after_cursor = {"$or": [
+            {field: {"$lt": timestamp}},
+            {field: timestamp, "_id": {"$lt": last_id}},
+        ]}
+    else:
+        after_cursor = {"_id": {"$lt": last_id}}
+    return {"$and": [filter_criteria, after_cursor]} if filter_criteria else after_cursor
+
+
+def date_range_filter(from_date=None, to_date=None, field="timestamp"):
+    """Filter on an inclusive YYYY-MM-DD date range; raises 400 on malformed dates."""
+    criteria = {}
+    try:
+        if from_date:
+            criteria["$gte"] = datetime.strptime(from_date, "%Y-%m-%d")
+        if to_date:
+            criteria["$lt"] = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    return {field: criteria} if criteria else {}
+
+
+async def fetch_page(repository, filter_criteria, limit, cursor=None, projection=None, field="timestamp"):
+    """Return (documents, next_cursor); next_cursor is None on the last page."""
+    documents = await repository.find(
+        keyset_filter(filter_criteria, cursor, field), projection,
+        sort=keyset_sort(field), limit=limit + 1, batch_size=limit + 1
+    )
+    if len(documents) > limit:
+        documents = documents[:limit]
+        return documents, encode_cursor(documents[-1], field)
+    return documents, None
+
+
+async def count_total(repository, filter_criteria, include_total=True):
+    """Exact count for filtered queries, metadata estimate for unfiltered ones, or None when not requested."""
+    if not include_total:
+        return None
+    if not filter_criteria:
+        return await repository.estimated_document_count()
+    return await repository.count_documents(filter_criteria)
+
+
+async def iter_batches(repository, filter_criteria, formatter, cursor=None, limit=None,
+                       projection=None, field="timestamp", batch_size=None):
+    """Yield formatted documents one keyset page at a time, stopping after limit rows; no server cursor stays open."""
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    remaining = limit if limit is not None else float("inf")
+    exported = 0
+    while remaining > 0:
+        page_size = int(min(batch_size, remaining))
+        documents, cursor = await fetch_page(repository, filter_criteria, page_size, cursor, projection, field)
+        if documents:
+            exported += len(documents)
+            remaining -= len(documents)
+            yield [formatter(document) for document in documents]
+        if cursor is None:
+            break
+    logger.info(f"Exported {exported} documents from {repository.name}")
+
+
+def stream_ndjson(repository, filter_criteria, formatter, cursor=None, batch_size=None, limit=None, projection=None):
+    """
+    Async iterator of every matching document, up to limit, as one JSON line.
+    The cursor is decoded here rather than in the iterator, so a bad one is a 400 before the response starts.
+    """
+    filter_criteria = keyset_filter(filter_criteria, cursor)
+    return _ndjson_lines(repository, filter_criteria, formatter, batch_size, limit, projection)
+
+
+async def _ndjson_lines(repository, filter_criteria, formatter, batch_size, limit, projection):
+    async for batch in iter_batches(repository, filter_criteria, formatter, None, limit, projection, batch_size=batch_size):
+        yield "".join(json.dumps(item, default=str) + "\n" for item in batch)
+
+
+async def stream_json_object(fields):
+    """
+    Write a JSON object incrementally. fields is a list of (key, value, count_key); when value is an
+    async iterator of batches it is written as an array element by element, followed by count_key.
+    """
+    yield "{"
+    for position, (key, value, count_key) in enumerate(fields):
+        prefix = ", " if position else ""
+        if not hasattr(value, "__aiter__"):
+            yield f"{prefix}{json.dumps(key)}: {json.dumps(value, default=str)}"
+            continue
+        yield f"{prefix}{json.dumps(key)}: ["
+        count = 0
+        try:
+            async for batch in value:
+                if batch:
+                    yield ("," if count else "") + ",".join(json.dumps(item, default=str) for item in batch)
+                    count += len(batch)
+        except Exception as e:
+            # Headers are already sent, so the truncated body is the only error signal left
+            logger.error(f"Streaming {key} failed after {count} rows: {e}")
+            raise
+        yield "]"
+        if count_key:
+            yield f", {json.dumps(count_key)}: {count}"
+    yield "}"
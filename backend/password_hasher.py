@@ -0,0 +1,121 @@
+"""
+Password hashing module for CyberShield-AI.
+Runs bcrypt on a bounded worker pool with admission control so hashing never blocks the event loop.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+import asyncio
+import bcrypt
+import logging
+import os
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger("password_hasher")
+
+
+class PasswordHasher:
+    """Bounded bcrypt executor; rejects work with 503 once the queue is full."""
+
+    def __init__(self):
+        # bcrypt releases the GIL, so a thread per core gives real parallelism
+        self.workers = int(os.environ.get("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+        self.max_pending = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", str(self.workers * 8)))
+        self.timeout_seconds = float(os.environ.get("PASSWORD_HASH_TIMEOUT_SECONDS", "5"))
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.max_queue_depth = 0
+        self.latency_total_ms = 0.0
+        self.latency_max_ms = 0.0
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._submit(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())
+        return hashed.decode('utf-8')
+
+    async def check(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(bcrypt.checkpw, password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Authentication service is busy. Please retry shortly.",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._pending - self._active)
+
+        future = self.executor.submit(self._run, fn, *args)
+        # Release the slot when the work really finishes, even if the caller timed out
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            logger.warning("Password hashing timed out")
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication service timed out. Please retry shortly.",
+                headers={"Retry-After": "1"}
+            )
+
+    def _run(self, fn, *args):
+        with self._lock:
+            self._active += 1
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._active -= 1
+                self.completed += 1
+                self.latency_total_ms += elapsed_ms
+                self.latency_max_ms = max(self.latency_max_ms, elapsed_ms)
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "active": self._active,
+                "queue_depth": max(0, self._pending - self._active),
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "latency_avg_ms": round(self.latency_total_ms / self.completed, 3) if self.completed else 0,
+                "latency_max_ms": round(self.latency_max_ms, 3),
+            }
+
+
+# Create a single instance
+password_hasher = PasswordHasher()
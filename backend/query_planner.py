@@ -0,0 +1,70 @@
+"""
+Query planner module for CyberShield-AI.
+Groups the aggregations a report needs into one $facet pipeline per collection and runs the collections concurrently.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from database import mongo
+from repositories import run_db
+import asyncio
+import logging
+
+# Set up logging
+logger = logging.getLogger("query_planner")
+
+
+class FacetPlan:
+    """A set of named sub-pipelines per collection, executed as one round trip per collection."""
+
+    def __init__(self):
+        self._facets = {}
+
+    def add(self, collection, name, stages, match=None):
+        """Register a sub-pipeline; match is its filter, hoisted in front of the $facet so indexes still apply."""
+        self._facets.setdefault(collection, {})[name] = (match, list(stages))
+        return self
+
+    @property
+    def collections(self):
+        return list(self._facets)
+
+    @property
+    def round_trips(self):
+        return len(self._facets)
+
+    def pipeline(self, collection):
+        """$match on what any facet needs, then $facet; sub-pipelines inside $facet cannot use indexes."""
+        facets = self._facets[collection]
+        matches = [match for match, _ in facets.values()]
+        stages = []
+        if all(matches):
+            unique = []
+            for match in matches:
+                if match not in unique:
+                    unique.append(match)
+            stages.append({"$match": unique[0] if len(unique) == 1 else {"$or": unique}})
+        stages.append({"$facet": {
+            name: ([{"$match": match}] if match and len(facets) > 1 else []) + sub_stages
+            for name, (match, sub_stages) in facets.items()
+        }})
+        return stages
+
+    def _run_one(self, db, collection):
+        rows = list(db[collection].aggregate(self.pipeline(collection), allowDiskUse=True))
+        return rows[0] if rows else {name: [] for name in self._facets[collection]}
+
+    def execute(self, db=None):
+        """Blocking execution for CLI and executor callers; collections still run in parallel."""
+        db = db if db is not None else mongo.get_database()
+        if len(self._facets) == 1:
+            return {collection: self._run_one(db, collection) for collection in self._facets}
+        with ThreadPoolExecutor(max_workers=len(self._facets), thread_name_prefix="facet") as executor:
+            futures = {collection: executor.submit(self._run_one, db, collection) for collection in self._facets}
+            return {collection: future.result() for collection, future in futures.items()}
+
+    async def run(self, db=None):
+        """Awaitable execution: one aggregate per collection on the database executor, gathered concurrently."""
+        db = db if db is not None else mongo.get_database()
+        collections = list(self._facets)
+        results = await asyncio.gather(*[run_db(self._run_one, db, collection) for collection in collections])
+        return dict(zip(collections, results))
@@ -0,0 +1,200 @@
+"""
+Rate limiting module for CyberShield-AI.
+Sliding-window failed-login counters keyed by email, IP and email+IP, used for alert thresholds and lockouts.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from database import mongo
+from repositories import run_db
+import logging
+import math
+import os
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger("rate_limiter")
+
+
+class InMemoryCounterBackend:
+    """Per-process counters stored as fixed-width time buckets, bounded by an LRU key limit."""
+
+    blocking = False
+
+    def __init__(self, bucket_seconds=60, retention_seconds=86400, max_keys=100000):
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_seconds
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key, now):
+        bucket = int(now // self.bucket_seconds)
+        oldest = bucket - self.retention_seconds // self.bucket_seconds
+        with self._lock:
+            buckets = self._counters.pop(key, None) or {}
+            for stale in [b for b in buckets if b < oldest]:
+                del buckets[stale]
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+            self._counters[key] = buckets
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+
+    def count(self, key, window_seconds, now):
+        return sum(count for _, count in self.buckets(key, window_seconds, now))
+
+    def buckets(self, key, window_seconds, now):
+        """(bucket, count) pairs inside the window, oldest first."""
+        first = int((now - window_seconds) // self.bucket_seconds) + 1
+        with self._lock:
+            buckets = self._counters.get(key)
+            if not buckets:
+                return []
+            return sorted((bucket, count) for bucket, count in buckets.items() if bucket >= first)
+
+    def clear(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def key_count(self):
+        return len(self._counters)
+
+
+class MongoCounterBackend:
+    """Counters shared by every worker, stored as one small document per key and time bucket."""
+
+    blocking = True
+
+    def __init__(self, bucket_seconds=60, retention_seconds=86400, collection="rate_counters"):
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_seconds
+        self.collection_name = collection
+
+    @property
+    def collection(self):
+        return mongo.get_database()[self.collection_name]
+
+    def add(self, key, now):
+        bucket = int(now // self.bucket_seconds)
+        self.collection.update_one(
+            {"key": key, "bucket": bucket},
+            {
+                "$inc": {"count": 1},
+                "$setOnInsert": {"expires_at": datetime.utcfromtimestamp(now) + timedelta(seconds=self.retention_seconds)}
+            },
+            upsert=True
+        )
+
+    def count(self, key, window_seconds, now):
+        return sum(count for _, count in self.buckets(key, window_seconds, now))
+
+    def buckets(self, key, window_seconds, now):
+        """(bucket, count) pairs inside the window, oldest first."""
+        first = int((now - window_seconds) // self.bucket_seconds) + 1
+        cursor = self.collection.find({"key": key, "bucket": {"$gte": first}}, {"bucket": 1, "count": 1, "_id": 0}).sort("bucket", 1)
+        return [(doc["bucket"], doc.get("count", 0)) for doc in cursor]
+
+    def clear(self, key):
+        self.collection.delete_many({"key": key})
+
+    def key_count(self):
+        return None
+
+
+class LoginRateLimiter:
+    """
+    Tracks failed logins per email, per IP and per email+IP pair and decides on alerts and lockouts.
+
+    The pair locks first, at a low threshold, so one attacker is stopped without locking the account
+    for its owner; the higher email and IP thresholds catch guessing spread over many IPs or accounts.
+    """
+
+    def __init__(self, backend=None):
+        self.alert_window_seconds = int(os.environ.get("LOGIN_ALERT_WINDOW_SECONDS", "86400"))
+        self.lockout_window_seconds = int(os.environ.get("LOGIN_LOCKOUT_WINDOW_SECONDS", "900"))
+        self.pair_lockout_threshold = int(os.environ.get("LOGIN_LOCKOUT_PAIR_THRESHOLD", "5"))
+        self.email_lockout_threshold = int(os.environ.get("LOGIN_LOCKOUT_EMAIL_THRESHOLD", "10"))
+        self.ip_lockout_threshold = int(os.environ.get("LOGIN_LOCKOUT_IP_THRESHOLD", "30"))
+        if backend is None:
+            retention = max(self.alert_window_seconds, self.lockout_window_seconds)
+            if os.environ.get("RATE_LIMIT_BACKEND", "memory") == "mongo":
+                backend = MongoCounterBackend(retention_seconds=retention)
+            else:
+                backend = InMemoryCounterBackend(retention_seconds=retention)
+        self.backend = backend
+        self.lockouts = 0
+
+    async def _call(self, fn, *args):
+        if self.backend.blocking:
+            return await run_db(fn, *args)
+        return fn(*args)
+
+    async def _count(self, key, window_seconds, now):
+        return await self._call(self.backend.count, key, window_seconds, now)
+
+    async def record_failure(self, email, ip_address=None, reason=None, now=None):
+        """Count a failed login and return the failure totals inside the alert window."""
+        now = now if now is not None else time.time()
+        await self._call(self.backend.add, f"email:{email}", now)
+        if reason == "incorrect_password":
+            await self._call(self.backend.add, f"email_password:{email}", now)
+        if ip_address:
+            await self._call(self.backend.add, f"ip:{ip_address}", now)
+            await self._call(self.backend.add, f"pair:{email}:{ip_address}", now)
+        return {
+            "email_failures": await self._count(f"email:{email}", self.alert_window_seconds, now),
+            "password_failures": await self._count(f"email_password:{email}", self.alert_window_seconds, now),
+        }
+
+    async def _retry_after(self, key, threshold, now):
+        buckets = await self._call(self.backend.buckets, key, self.lockout_window_seconds, now)
+        remaining = sum(count for _, count in buckets)
+        for bucket, count in buckets:
+            if remaining < threshold:
+                break
+            remaining -= count
+            if remaining < threshold:
+                # The key drops under the threshold once this bucket slides out of the window
+                return max(1, math.ceil(bucket * self.backend.bucket_seconds + self.lockout_window_seconds - now))
+        return 0
+
+    async def lockout_remaining(self, email, ip_address=None, now=None):
+        """Seconds until enough counted failures expire to lift every lockout that applies, or 0 if none does."""
+        now = now if now is not None else time.time()
+        checks = [(f"email:{email}", self.email_lockout_threshold)]
+        if ip_address:
+            checks = [(f"pair:{email}:{ip_address}", self.pair_lockout_threshold)] + checks + [(f"ip:{ip_address}", self.ip_lockout_threshold)]
+        retry_after = 0
+        for key, threshold in checks:
+            retry_after = max(retry_after, await self._retry_after(key, threshold, now))
+        if retry_after:
+            self.lockouts += 1
+        return retry_after
+
+    async def reset(self, email, ip_address=None):
+        """
+        Forget the failures against an account that was just logged into successfully.
+        The IP counter is kept: logging into one owned account must not lift a lockout earned guessing others.
+        """
+        keys = [f"email:{email}", f"email_password:{email}"]
+        if ip_address:
+            keys.append(f"pair:{email}:{ip_address}")
+        for key in keys:
+            await self._call(self.backend.clear, key)
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "tracked_keys": self.backend.key_count(),
+            "alert_window_seconds": self.alert_window_seconds,
+            "lockout_window_seconds": self.lockout_window_seconds,
+            "pair_lockout_threshold": self.pair_lockout_threshold,
+            "email_lockout_threshold": self.email_lockout_threshold,
+            "ip_lockout_threshold": self.ip_lockout_threshold,
+            "lockouts": self.lockouts,
+        }
+
+
+# Create a single instance
+login_rate_limiter = LoginRateLimiter()
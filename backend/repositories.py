@@ -0,0 +1,145 @@
+"""
+Async data access layer for CyberShield-AI.
+Awaitable repositories over the shared MongoDB pool so async endpoints never block the event loop.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from database import mongo
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import functools
+import os
+
+# Dedicated executor for blocking driver calls; sized to the connection pool so
+# every worker thread can hold a connection without starving FastAPI's threadpool
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("MONGO_EXECUTOR_WORKERS", str(mongo.max_pool_size))),
+    thread_name_prefix="mongo-io",
+)
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking pymongo call on the database executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+class AsyncCollection:
+    """Awaitable wrapper around one collection of the shared database."""
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def collection(self):
+        return mongo.get_database()[self.name]
+
+    async def find_one(self, filter, projection=None, **kwargs):
+        return await run_db(self.collection.find_one, filter, projection, **kwargs)
+
+    async def find(self, filter=None, projection=None, **kwargs):
+        """Return matching documents as a list; accepts pymongo find() options such as sort and limit."""
+        def _find():
+            return list(self.collection.find(filter or {}, projection, **kwargs))
+        return await run_db(_find)
+
+    async def insert_one(self, document):
+        return await run_db(self.collection.insert_one, document)
+
+    async def insert_many(self, documents, ordered=False):
+        return await run_db(self.collection.insert_many, documents, ordered=ordered)
+
+    async def update_one(self, filter, update, upsert=False):
+        return await run_db(self.collection.update_one, filter, update, upsert=upsert)
+
+    async def count_documents(self, filter):
+        return await run_db(self.collection.count_documents, filter)
+
+    async def estimated_document_count(self):
+        """Collection size from metadata; no scan, but ignores filters."""
+        return await run_db(self.collection.estimated_document_count)
+
+    async def aggregate(self, pipeline, **kwargs):
+        def _aggregate():
+            return list(self.collection.aggregate(pipeline, **kwargs))
+        return await run_db(_aggregate)
+
+
+class UserRepository(AsyncCollection):
+    def __init__(self):
+        super().__init__("users")
+
+    async def find_by_email(self, email, projection=None):
+        return await self.find_one({"email": email}, projection)
+
+
+class LoginLogRepository(AsyncCollection):
+    def __init__(self):
+        super().__init__("login_logs")
+
+    async def recent(self, limit=100, filter=None):
+        return await self.find(filter, sort=[("timestamp", -1)], limit=limit)
+
+
+class SecurityEventRepository(AsyncCollection):
+    def __init__(self):
+        super().__init__("security_events")
+
+    async def recent(self, limit=100, filter=None):
+        return await self.find(filter, sort=[("timestamp", -1)], limit=limit)
+
+
+class AccessLogRepository(AsyncCollection):
+    def __init__(self):
+        super().__init__("access_logs")
+
+    async def recent(self, limit=100, filter=None):
+        return await self.find(filter, sort=[("timestamp", -1)], limit=limit)
+
+
+class PhoneLogRepository(AsyncCollection):
+    def __init__(self):
+        super().__init__("phone_logs")
+
+
+class PhoneVerificationRepository(AsyncCollection):
+    def __init__(self):
+        super().__init__("phone_verifications")
+
+    async def find_by_phone(self, phone_number, projection=None):
+        return await self.find_one({"phone_number": phone_number}, projection)
+
+    async def record_verification(self, phone_number, fields, created_at):
+        """Insert or refresh a number's verification in one atomic upsert; returns True if it was new."""
+        update = {"$set": fields, "$setOnInsert": {"created_at": created_at}}
+        try:
+            result = await self.update_one({"phone_number": phone_number}, update, upsert=True)
+        except DuplicateKeyError:
+            # A concurrent first verification won the insert; the retry matches its document
+            result = await self.update_one({"phone_number": phone_number}, update, upsert=True)
+        return result.upserted_id is not None
+
+
+class Repositories:
+    """Container for every repository used by the routers."""
+
+    def __init__(self):
+        self.users = UserRepository()
+        self.login_logs = LoginLogRepository()
+        self.security_events = SecurityEventRepository()
+        self.access_logs = AccessLogRepository()
+        self.phone_logs = PhoneLogRepository()
+        self.phone_verifications = PhoneVerificationRepository()
+        self.analysis_results = AsyncCollection("analysis_results")
+        self.login_logs_daily = AsyncCollection("login_logs_daily")
+
+    def collection(self, name):
+        """Look up a repository by collection name."""
+        repository = getattr(self, name, None)
+        if not isinstance(repository, AsyncCollection):
+            raise ValueError(f"Unknown collection: {name}")
+        return repository
+
+
+# Create a single instance
+repos = Repositories()
@@ -0,0 +1,73 @@
+"""
+Request limits module for CyberShield-AI.
+Rejects oversized request bodies before FastAPI reads and parses them.
+"""
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+import logging
+
+# Set up logging
+logger = logging.getLogger("request_limits")
+
+
+class _BodyTooLarge(HTTPException):
+    # An HTTPException so FastAPI's body parsing re-raises it as a 413 instead of a generic 400
+    def __init__(self, max_bytes):
+        super().__init__(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware answering 413 once a body under one of path_prefixes exceeds max_bytes."""
+
+    def __init__(self, app, max_bytes, path_prefixes=("/",)):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_prefixes = tuple(path_prefixes)
+
+    def _too_large(self):
+        return JSONResponse(status_code=413, content={"detail": f"Request body exceeds {self.max_bytes} bytes"})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        # Declared length: refuse without reading a byte of the body
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_bytes:
+                    logger.warning(f"Rejected {declared}-byte body for {scope['path']}")
+                    await self._too_large()(scope, receive, send)
+                    return
+
+        # Chunked uploads have no declared length, so count bytes as they arrive
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _BodyTooLarge(self.max_bytes)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if response_started:
+                raise
+            logger.warning(f"Rejected streamed body over {self.max_bytes} bytes for {scope['path']}")
+            await self._too_large()(scope, receive, send)
@@ -0,0 +1,203 @@
+"""
+Response cache module for CyberShield-AI.
+Short-lived cache for expensive read endpoints with request coalescing, ETags and hit/miss metrics.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from database import mongo
+from repositories import run_db
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger("response_cache")
+
+
+class InMemoryCacheBackend:
+    """Per-process LRU of cache entries, each expiring after its own TTL."""
+
+    blocking = False
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self):
+        return len(self._entries)
+
+
+class MongoCacheBackend:
+    """Entries shared by every worker, expired by a TTL index on expires_at."""
+
+    blocking = True
+
+    def __init__(self, collection="response_cache"):
+        self.collection_name = collection
+
+    @property
+    def collection(self):
+        return mongo.get_database()[self.collection_name]
+
+    def get(self, key, now):
+        doc = self.collection.find_one({"_id": key})
+        if doc is None or doc["expires_at_epoch"] <= now:
+            return None
+        return {"value": json.loads(doc["value"]), "etag": doc["etag"], "expires_at": doc["expires_at_epoch"]}
+
+    def set(self, key, entry):
+        self.collection.replace_one({"_id": key}, {
+            "_id": key,
+            "value": json.dumps(entry["value"]),
+            "etag": entry["etag"],
+            "expires_at_epoch": entry["expires_at"],
+            "expires_at": datetime.utcfromtimestamp(entry["expires_at"]) + timedelta(seconds=60),
+        }, upsert=True)
+
+    def size(self):
+        return None
+
+
+class ResponseCache:
+    """Caches endpoint results by path and query string; concurrent misses share one computation."""
+
+    def __init__(self, backend=None):
+        self.default_ttl = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "5"))
+        self.enabled = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+        if backend is None:
+            if os.environ.get("RESPONSE_CACHE_BACKEND", "memory") == "mongo":
+                backend = MongoCacheBackend()
+            else:
+                backend = InMemoryCacheBackend(int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "256")))
+        self.backend = backend
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.per_endpoint = {}
+
+    async def _call(self, fn, *args):
+        if self.backend.blocking:
+            return await run_db(fn, *args)
+        return fn(*args)
+
+    def _count(self, endpoint, outcome):
+        counters = self.per_endpoint.setdefault(endpoint, {"hits": 0, "misses": 0, "coalesced": 0})
+        counters[outcome] += 1
+
+    @staticmethod
+    def cache_key(request: Request):
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    async def _build_entry(self, compute, ttl):
+        value = jsonable_encoder(await compute())
+        etag = '"' + hashlib.sha1(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest() + '"'
+        return {"value": value, "etag": etag, "expires_at": time.time() + ttl}
+
+    async def _fill(self, key, ttl, compute):
+        entry = await self._build_entry(compute, ttl)
+        try:
+            await self._call(self.backend.set, key, entry)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to store cache entry {key}: {e}")
+        return entry
+
+    async def get_or_compute(self, key, compute, ttl=None, endpoint=None):
+        """Return the cached entry for key, or run compute() once for every concurrent caller."""
+        endpoint = endpoint or key
+        ttl = self.default_ttl if ttl is None else ttl
+        if not self.enabled:
+            self._count(endpoint, "misses")
+            self.misses += 1
+            return await self._build_entry(compute, ttl)
+
+        try:
+            entry = await self._call(self.backend.get, key, time.time())
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to read cache entry {key}: {e}")
+            entry = None
+        if entry is not None:
+            self.hits += 1
+            self._count(endpoint, "hits")
+            return entry
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop:
+            self.coalesced += 1
+            self._count(endpoint, "coalesced")
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        self._count(endpoint, "misses")
+        # The fill runs as its own task so a caller that disconnects only stops waiting, not the shared compute
+        task = loop.create_task(self._fill(key, ttl, compute))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._fill_done(key, done))
+        return await asyncio.shield(task)
+
+    def _fill_done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every waiter was cancelled before it was raised
+        if not task.cancelled():
+            task.exception()
+
+    async def respond(self, request: Request, compute, ttl=None):
+        """Serve compute() through the cache with ETag/Cache-Control headers, answering 304 on a matching If-None-Match."""
+        entry = await self.get_or_compute(self.cache_key(request), compute, ttl=ttl, endpoint=request.url.path)
+        max_age = max(0, int(entry["expires_at"] - time.time()))
+        headers = {"ETag": entry["etag"], "Cache-Control": f"private, max-age={max_age}"}
+        if request.headers.get("if-none-match") == entry["etag"]:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(entry["value"], headers=headers)
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "default_ttl_seconds": self.default_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0,
+            "endpoints": self.per_endpoint,
+        }
+
+
+# Create a single instance
+response_cache = ResponseCache()
@@ -0,0 +1,187 @@
+"""
+Retention module for CyberShield-AI.
+Rolls audit collections up into hourly/daily aggregates and deletes raw rows past their retention period.
+
+Usage:
+    python retention.py run
+"""
+
+from datetime import datetime, timedelta
+from database import mongo
+from repositories import run_db
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+# Set up logging
+logger = logging.getLogger("retention")
+
+
+class RetentionPolicy:
+    """How long raw rows of one collection are kept and which fields their rollups group by."""
+
+    def __init__(self, collection, retain_days, dimensions, extra_metrics=None):
+        self.collection = collection
+        self.retain_days = int(os.environ.get(f"RETENTION_{collection.upper()}_DAYS", str(retain_days)))
+        self.dimensions = dimensions
+        # name -> (accumulator, raw field); daily rows re-apply the accumulator to the hourly values
+        self.extra_metrics = extra_metrics or {}
+        self.hourly_collection = f"{collection}_hourly"
+        self.daily_collection = f"{collection}_daily"
+
+
+TTL_GRACE_DAYS = int(os.environ.get("RETENTION_TTL_GRACE_DAYS", "7"))
+
+RETENTION_POLICIES = {
+    "login_logs": RetentionPolicy("login_logs", 90, ["status", "reason"]),
+    "access_logs": RetentionPolicy(
+        "access_logs", 30, ["endpoint", "method", "status_code"],
+        extra_metrics={"duration_ms_sum": ("$sum", "$duration_ms"), "duration_ms_max": ("$max", "$duration_ms")}
+    ),
+    "security_events": RetentionPolicy("security_events", 180, ["event_type", "severity"]),
+}
+
+
+def ttl_seconds(collection):
+    """TTL backstop for a collection: retention plus a grace period so the rollup job runs first."""
+    policy = RETENTION_POLICIES[collection]
+    return (policy.retain_days + TTL_GRACE_DAYS) * 86400
+
+
+def _hourly_accumulators(policy):
+    accumulators = {"count": {"$sum": 1}}
+    for name, (operator, field) in policy.extra_metrics.items():
+        accumulators[name] = {operator: field}
+    return accumulators
+
+
+def _daily_accumulators(policy):
+    accumulators = {"count": {"$sum": "$count"}}
+    for name, (operator, _) in policy.extra_metrics.items():
+        accumulators[name] = {operator: f"${name}"}
+    return accumulators
+
+
+def _rollup_hours(db, policy, start, end):
+    group_id = {"hour": {"$dateTrunc": {"date": "$timestamp", "unit": "hour"}}}
+    group_id.update({dimension: f"${dimension}" for dimension in policy.dimensions})
+    db[policy.collection].aggregate([
+        {"$match": {"timestamp": {"$gte": start, "$lt": end}}},
+        {"$group": {"_id": group_id, **_hourly_accumulators(policy)}},
+        {"$merge": {"into": policy.hourly_collection, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ])
+
+
+def _rollup_days(db, policy, start, end):
+    # Daily rows are rebuilt from the hourly rows, so re-running a day is idempotent
+    day_start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    last_day_start = (end - timedelta(microseconds=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    group_id = {"day": {"$dateTrunc": {"date": "$_id.hour", "unit": "day"}}}
+    group_id.update({dimension: f"$_id.{dimension}" for dimension in policy.dimensions})
+    db[policy.hourly_collection].aggregate([
+        {"$match": {"_id.hour": {"$gte": day_start, "$lt": last_day_start + timedelta(days=1)}}},
+        {"$group": {"_id": group_id, **_daily_accumulators(policy)}},
+        {"$merge": {"into": policy.daily_collection, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ])
+
+
+def apply_policy(db, policy, now=None):
+    """Roll up every completed hour since the last run, then delete raw rows older than the retention period."""
+    now = now or datetime.utcnow()
+    current_hour = now.replace(minute=0, second=0, microsecond=0)
+    state = db.retention_state.find_one({"_id": policy.collection}) or {}
+    start = state.get("rolled_up_until")
+    if start is None:
+        oldest = db[policy.collection].find_one({}, {"timestamp": 1}, sort=[("timestamp", 1)])
+        if not oldest or not oldest.get("timestamp"):
+            return {"collection": policy.collection, "rolled_up_hours": 0, "deleted": 0}
+        start = oldest["timestamp"].replace(minute=0, second=0, microsecond=0)
+
+    # Work in one-day chunks so a first run over a large backlog stays bounded
+    rolled_up_hours = 0
+    chunk_start = start
+    while chunk_start < current_hour:
+        chunk_end = min(chunk_start + timedelta(days=1), current_hour)
+        _rollup_hours(db, policy, chunk_start, chunk_end)
+        _rollup_days(db, policy, chunk_start, chunk_end)
+        rolled_up_hours += int((chunk_end - chunk_start).total_seconds() // 3600)
+        db.retention_state.update_one(
+            {"_id": policy.collection},
+            {"$set": {"rolled_up_until": chunk_end, "last_run": now}},
+            upsert=True
+        )
+        chunk_start = chunk_end
+
+    # Only rows that are already in the rollups may be deleted
+    cutoff = min(now - timedelta(days=policy.retain_days), chunk_start)
+    deleted = db[policy.collection].delete_many({"timestamp": {"$lt": cutoff}}).deleted_count
+    return {"collection": policy.collection, "rolled_up_hours": rolled_up_hours, "deleted": deleted}
+
+
+class RetentionEngine:
+    """Runs every retention policy on a fixed interval in the background."""
+
+    def __init__(self):
+        self.interval_seconds = int(os.environ.get("RETENTION_INTERVAL_SECONDS", "3600"))
+        self.enabled = os.environ.get("RETENTION_ENABLED", "true").lower() == "true"
+        self._task = None
+        self.last_run = None
+        self.last_results = []
+
+    def run_once(self, db=None):
+        db = db if db is not None else mongo.get_database()
+        results = []
+        for policy in RETENTION_POLICIES.values():
+            try:
+                results.append(apply_policy(db, policy))
+            except Exception as e:
+                logger.error(f"Retention failed for {policy.collection}: {e}")
+                results.append({"collection": policy.collection, "error": str(e)})
+        self.last_run = datetime.utcnow()
+        self.last_results = results
+        return results
+
+    async def _loop(self):
+        while True:
+            await run_db(self.run_once)
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "interval_seconds": self.interval_seconds,
+            "policies": {name: policy.retain_days for name, policy in RETENTION_POLICIES.items()},
+            "last_run": str(self.last_run) if self.last_run else None,
+            "last_results": self.last_results,
+        }
+
+
+# Create a single instance
+retention_engine = RetentionEngine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run CyberShield-AI log retention and rollups")
+    parser.add_argument("command", choices=["run"])
+    parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(retention_engine.run_once(), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,18 @@ Security monitoring API for CyberShield-AI.
 Provides endpoints for security monitoring and alerts.
 """
 
-from fastapi import APIRouter, Request, HTTPException, Depends, Query
+from fastapi import APIRouter, Request, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from datetime import datetime, timedelta
+import json
 import logging
 import traceback
-from pymongo import MongoClient
+from live_feed import LiveFeedFull, live_feed
 from security_logger import security_logger
+from threat_detector import threat_detector
+from repositories import repos
+from response_cache import response_cache
+from pagination import EXPORT_MAX_ROWS, date_range_filter, fetch_page, count_total, stream_ndjson
 import time
 from typing import Dict, List, Any, Optional
 
@@ -22,16 +28,34 @@ router = APIRouter(
     tags=["security-monitor"],
 )
 
-def get_db():
-    """Get MongoDB connection with error handling."""
-    try:
-        client = MongoClient("mongodb://cybershield-mongodb:27017")
-        db = client.cybershield_db
-        return db
-    except Exception as e:
-        logger.error(f"MongoDB connection error: {e}")
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Database connection error: {str(e)}")
+# Fields the formatters below read; exports and pages fetch nothing else
+LOGIN_ATTEMPT_FIELDS = {"email": 1, "timestamp": 1, "status": 1, "reason": 1, "source": 1, "ip_address": 1, "user_agent": 1}
+SECURITY_EVENT_FIELDS = {"timestamp": 1, "event_type": 1, "severity": 1, "details": 1, "user_id": 1}
+
+def _format_login_attempt(log):
+    return {
+        "id": str(log["_id"]),
+        "email": log.get("email", ""),
+        "timestamp": str(log.get("timestamp", "")),
+        "status": log.get("status", ""),
+        "reason": log.get("reason", ""),
+        "source": log.get("source", ""),
+        "ip_address": log.get("ip_address", ""),
+        "user_agent": log.get("user_agent", "")
+    }
+
+def _format_security_event(event):
+    return {
+        "id": str(event["_id"]),
+        "timestamp": str(event.get("timestamp", "")),
+        "event_type": event.get("event_type", ""),
+        "severity": event.get("severity", ""),
+        "details": event.get("details", {}),
+        "user_id": event.get("user_id", "")
+    }
+
+live_feed.set_formatter("login_logs", _format_login_attempt)
+live_feed.set_formatter("security_events", _format_security_event)
 
 @router.get("/login-attempts")
 async def get_login_attempts(
@@ -40,7 +64,11 @@ async def get_login_attempts(
     email: Optional[str] = Query(None, description="Filter by email"),
     from_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     to_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    limit: int = Query(50, ge=1, le=1000, description="Maximum number of results")
+    limit: int = Query(50, ge=1, le=1000, description="Maximum number of results"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: bool = Query(True, description="Set to false to skip counting matching documents"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams matching rows up to max_rows"),
+    max_rows: int = Query(EXPORT_MAX_ROWS, ge=1, le=EXPORT_MAX_ROWS, description="Row cap for ndjson exports")
 ):
     """
     Get login attempts with filtering options.
@@ -48,8 +76,6 @@ async def get_login_attempts(
     start_time = time.time()
     
     try:
-        db = get_db()
-        
         # Build filter
         filter_criteria = {}
         
@@ -59,52 +85,33 @@ async def get_login_attempts(
         if email:
             filter_criteria["email"] = email.lower()
             
-        # Handle date range
-        if from_date or to_date:
-            filter_criteria["timestamp"] = {}
-            
-            if from_date:
-                try:
-                    from_datetime = datetime.strptime(from_date, "%Y-%m-%d")
-                    filter_criteria["timestamp"]["$gte"] = from_datetime
-                except ValueError:
-                    raise HTTPException(status_code=400, detail="Invalid from_date format. Use YYYY-MM-DD")
-                    
-            if to_date:
-                try:
-                    to_datetime = datetime.strptime(to_date, "%Y-%m-%d")
-                    # Add one day to include the entire end date
-                    to_datetime = to_datetime + timedelta(days=1)
-                    filter_criteria["timestamp"]["$lt"] = to_datetime
-                except ValueError:
-                    raise HTTPException(status_code=400, detail="Invalid to_date format. Use YYYY-MM-DD")
+        # Handle date range; the end date is inclusive
+        filter_criteria.update(date_range_filter(from_date, to_date))
+        
+        if format == "ndjson":
+            # Built before logging success: a malformed cursor raises its 400 here, not mid-stream
+            lines = stream_ndjson(repos.login_logs, filter_criteria, _format_login_attempt, cursor, limit=max_rows, projection=LOGIN_ATTEMPT_FIELDS)
+            ip_address = request.client.host if request.client else None
+            await security_logger.log_access(
+                endpoint="/security-monitor/login-attempts",
+                method="GET",
+                ip_address=ip_address,
+                status_code=200,
+                duration_ms=round((time.time() - start_time) * 1000)
+            )
+            return StreamingResponse(lines, media_type="application/x-ndjson")
         
         # Execute query
-        login_logs = list(db.login_logs.find(
-            filter_criteria
-        ).sort("timestamp", -1).limit(limit))
-        
-        # Format results
-        formatted_logs = []
-        for log in login_logs:
-            formatted_logs.append({
-                "id": str(log["_id"]),
-                "email": log.get("email", ""),
-                "timestamp": str(log.get("timestamp", "")),
-                "status": log.get("status", ""),
-                "reason": log.get("reason", ""),
-                "source": log.get("source", ""),
-                "ip_address": log.get("ip_address", ""),
-                "user_agent": log.get("user_agent", "")
-            })
+        login_logs, next_cursor = await fetch_page(repos.login_logs, filter_criteria, limit, cursor, LOGIN_ATTEMPT_FIELDS)
+        formatted_logs = [_format_login_attempt(log) for log in login_logs]
         
         # Get total count for pagination
-        total_count = db.login_logs.count_documents(filter_criteria)
+        total_count = await count_total(repos.login_logs, filter_criteria, include_total)
         
         # Log API access
         ip_address = request.client.host if request.client else None
         duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/security-monitor/login-attempts",
             method="GET",
             ip_address=ip_address,
@@ -115,6 +122,7 @@ async def get_login_attempts(
         return {
             "total": total_count,
             "returned": len(formatted_logs),
+            "next_cursor": next_cursor,
             "login_attempts": formatted_logs
         }
         
@@ -122,7 +130,7 @@ async def get_login_attempts(
         # Log API access for HTTP exception
         ip_address = request.client.host if request.client else None
         duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/security-monitor/login-attempts",
             method="GET",
             ip_address=ip_address,
@@ -138,7 +146,7 @@ async def get_login_attempts(
         # Log API error
         ip_address = request.client.host if request.client else None
         duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/security-monitor/login-attempts",
             method="GET",
             ip_address=ip_address,
@@ -155,7 +163,11 @@ async def get_security_events(
     event_type: Optional[str] = Query(None, description="Filter by event type"),
     from_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     to_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    limit: int = Query(50, ge=1, le=1000, description="Maximum number of results")
+    limit: int = Query(50, ge=1, le=1000, description="Maximum number of results"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: bool = Query(True, description="Set to false to skip counting matching documents"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams matching rows up to max_rows"),
+    max_rows: int = Query(EXPORT_MAX_ROWS, ge=1, le=EXPORT_MAX_ROWS, description="Row cap for ndjson exports")
 ):
     """
     Get security events with filtering options.
@@ -163,8 +175,6 @@ async def get_security_events(
     start_time = time.time()
     
     try:
-        db = get_db()
-        
         # Build filter
         filter_criteria = {}
         
@@ -174,50 +184,33 @@ async def get_security_events(
         if event_type:
             filter_criteria["event_type"] = event_type
             
-        # Handle date range
-        if from_date or to_date:
-            filter_criteria["timestamp"] = {}
-            
-            if from_date:
-                try:
-                    from_datetime = datetime.strptime(from_date, "%Y-%m-%d")
-                    filter_criteria["timestamp"]["$gte"] = from_datetime
-                except ValueError:
-                    raise HTTPException(status_code=400, detail="Invalid from_date format. Use YYYY-MM-DD")
-                    
-            if to_date:
-                try:
-                    to_datetime = datetime.strptime(to_date, "%Y-%m-%d")
-                    # Add one day to include the entire end date
-                    to_datetime = to_datetime + timedelta(days=1)
-                    filter_criteria["timestamp"]["$lt"] = to_datetime
-                except ValueError:
-                    raise HTTPException(status_code=400, detail="Invalid to_date format. Use YYYY-MM-DD")
+        # Handle date range; the end date is inclusive
+        filter_criteria.update(date_range_filter(from_date, to_date))
+        
+        if format == "ndjson":
+            # Built before logging success: a malformed cursor raises its 400 here, not mid-stream
+            lines = stream_ndjson(repos.security_events, filter_criteria, _format_security_event, cursor, limit=max_rows, projection=SECURITY_EVENT_FIELDS)
+            ip_address = request.client.host if request.client else None
+            await security_logger.log_access(
+                endpoint="/security-monitor/security-events",
+                method="GET",
+                ip_address=ip_address,
+                status_code=200,
+                duration_ms=round((time.time() - start_time) * 1000)
+            )
+            return StreamingResponse(lines, media_type="application/x-ndjson")
         
         # Execute query
-        security_events = list(db.security_events.find(
-            filter_criteria
-        ).sort("timestamp", -1).limit(limit))
-        
-        # Format results
-        formatted_events = []
-        for event in security_events:
-            formatted_events.append({
-                "id": str(event["_id"]),
-                "timestamp": str(event.get("timestamp", "")),
-                "event_type": event.get("event_type", ""),
-                "severity": event.get("severity", ""),
-                "details": event.get("details", {}),
-                "user_id": event.get("user_id", "")
-            })
+        security_events, next_cursor = await fetch_page(repos.security_events, filter_criteria, limit, cursor, SECURITY_EVENT_FIELDS)
+        formatted_events = [_format_security_event(event) for event in security_events]
         
         # Get total count for pagination
-        total_count = db.security_events.count_documents(filter_criteria)
+        total_count = await count_total(repos.security_events, filter_criteria, include_total)
         
         # Log API access
         ip_address = request.client.host if request.client else None
         duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/security-monitor/security-events",
             method="GET",
             ip_address=ip_address,
@@ -228,6 +221,7 @@ async def get_security_events(
         return {
             "total": total_count,
             "returned": len(formatted_events),
+            "next_cursor": next_cursor,
             "security_events": formatted_events
         }
         
@@ -235,7 +229,7 @@ async def get_security_events(
         # Log API access for HTTP exception
         ip_address = request.client.host if request.client else None
         duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/security-monitor/security-events",
             method="GET",
             ip_address=ip_address,
@@ -251,7 +245,7 @@ async def get_security_events(
         # Log API error
         ip_address = request.client.host if request.client else None
         duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
+        await security_logger.log_access(
             endpoint="/security-monitor/security-events",
             method="GET",
             ip_address=ip_address,
@@ -261,291 +255,223 @@ async def get_security_events(
         
         raise HTTPException(status_code=500, detail=f"Error retrieving security events: {str(e)}")
 
-@router.get("/active-threats")
-async def get_active_threats(request: Request):
-    """
-    Get currently active security threats that need attention.
-    """
-    start_time = time.time()
-    
-    try:
-        db = get_db()
-        
-        # Time thresholds
-        now = datetime.utcnow()
-        last_hour"""
-Security monitoring API for CyberShield-AI.
-Provides endpoints for security monitoring and alerts.
-"""
+async def _aggregate_recent_failures(last_hour):
+    """Fallback for active threats while the threat detector is still restoring its state; uses the detector's thresholds."""
+    # IPs with repeated failed logins in the last hour
+    pipeline = [
+        {
+            "$match": {
+                "status": "failed",
+                "timestamp": {"$gte": last_hour},
+                "ip_address": {"$exists": True, "$ne": None}
+            }
+        },
+        {
+            "$group": {
+                "_id": "$ip_address",
+                "count": {"$sum": 1},
+                "last_attempt": {"$max": "$timestamp"}
+            }
+        },
+        {
+            "$match": {
+                "count": {"$gte": threat_detector.rules["ip"].threshold}
+            }
+        },
+        {
+            "$sort": {"count": -1}
+        }
+    ]
 
-from fastapi import APIRouter, Request, HTTPException, Depends, Query
-from datetime import datetime, timedelta
-import logging
-import traceback
-from pymongo import MongoClient
-from security_logger import security_logger
-import time
-from typing import Dict, List, Any, Optional
+    brute_force_ips = []
+    for ip_data in await repos.login_logs.aggregate(pipeline):
+        brute_force_ips.append({
+            "ip_address": ip_data["_id"],
+            "failed_attempts": ip_data["count"],
+            "last_attempt": str(ip_data["last_attempt"])
+        })
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger("security_monitor_api")
+    # Accounts with repeated incorrect passwords in the last hour
+    pipeline = [
+        {
+            "$match": {
+                "status": "failed",
+                "reason": "incorrect_password",
+                "timestamp": {"$gte": last_hour}
+            }
+        },
+        {
+            "$group": {
+                "_id": "$email",
+                "count": {"$sum": 1},
+                "last_attempt": {"$max": "$timestamp"}
+            }
+        },
+        {
+            "$match": {
+                "count": {"$gte": threat_detector.rules["email"].threshold}
+            }
+        },
+        {
+            "$sort": {"count": -1}
+        }
+    ]
 
-# Create router
-router = APIRouter(
-    prefix="/security-monitor",
-    tags=["security-monitor"],
-)
+    targeted_accounts = []
+    for account_data in await repos.login_logs.aggregate(pipeline):
+        targeted_accounts.append({
+            "email": account_data["_id"],
+            "failed_attempts": account_data["count"],
+            "last_attempt": str(account_data["last_attempt"])
+        })
 
-def get_db():
-    """Get MongoDB connection with error handling."""
-    try:
-        client = MongoClient("mongodb://cybershield-mongodb:27017")
-        db = client.cybershield_db
-        return db
-    except Exception as e:
-        logger.error(f"MongoDB connection error: {e}")
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Database connection error: {str(e)}")
+    return brute_force_ips, targeted_accounts
 
-@router.get("/login-attempts")
-async def get_login_attempts(
-    request: Request,
-    status: Optional[str] = Query(None, description="Filter by status (success/failed)"),
-    email: Optional[str] = Query(None, description="Filter by email"),
-    from_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    to_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    limit: int = Query(50, ge=1, le=1000, description="Maximum number of results")
-):
+async def _compute_active_threats():
+    """Collect the currently active threats; served through the response cache."""
+    # Time thresholds
+    now = datetime.utcnow()
+    last_hour = now - timedelta(hours=1)
+    last_day = now - timedelta(days=1)
+
+    # Unresolved high and critical events from the last 24 hours
+    critical_events = await repos.security_events.recent(limit=50, filter={
+        "severity": {"$in": ["high", "critical"]},
+        "timestamp": {"$gte": last_day}
+    })
+
+    formatted_events = []
+    for event in critical_events:
+        formatted_events.append({
+            "id": str(event["_id"]),
+            "timestamp": str(event.get("timestamp", "")),
+            "event_type": event.get("event_type", ""),
+            "severity": event.get("severity", ""),
+            "details": event.get("details", {})
+        })
+
+    if threat_detector.ready:
+        # Served from the detector's sliding windows instead of re-grouping the last hour of logins
+        brute_force_ips = [
+            {"ip_address": row["key"], "failed_attempts": row["count"], "last_attempt": str(row["last_attempt"])}
+            for row in threat_detector.flagged("ip", "active")
+        ]
+        targeted_accounts = [
+            {"email": row["key"], "failed_attempts": row["count"], "last_attempt": str(row["last_attempt"])}
+            for row in threat_detector.flagged("email", "active")
+        ]
+    else:
+        brute_force_ips, targeted_accounts = await _aggregate_recent_failures(last_hour)
+
+    active_threats_count = len(formatted_events) + len(brute_force_ips) + len(targeted_accounts)
+
+    return {
+        "timestamp": str(now),
+        "active_threats_count": active_threats_count,
+        "threat_level": "high" if (brute_force_ips or any(e["severity"] == "critical" for e in formatted_events)) else "medium" if active_threats_count > 0 else "low",
+        "critical_events": formatted_events,
+        "brute_force_ips": brute_force_ips,
+        "targeted_accounts": targeted_accounts
+    }
+
+@router.get("/active-threats")
+async def get_active_threats(request: Request):
     """
-    Get login attempts with filtering options.
+    Get currently active security threats that need attention.
     """
     start_time = time.time()
     
     try:
-        db = get_db()
-        
-        # Build filter
-        filter_criteria = {}
-        
-        if status:
-            filter_criteria["status"] = status
-            
-        if email:
-            filter_criteria["email"] = email.lower()
-            
-        # Handle date range
-        if from_date or to_date:
-            filter_criteria["timestamp"] = {}
-            
-            if from_date:
-                try:
-                    from_datetime = datetime.strptime(from_date, "%Y-%m-%d")
-                    filter_criteria["timestamp"]["$gte"] = from_datetime
-                except ValueError:
-                    raise HTTPException(status_code=400, detail="Invalid from_date format. Use YYYY-MM-DD")
-                    
-            if to_date:
-                try:
-                    to_datetime = datetime.strptime(to_date, "%Y-%m-%d")
-                    # Add one day to include the entire end date
-                    to_datetime = to_datetime + timedelta(days=1)
-                    filter_criteria["timestamp"]["$lt"] = to_datetime
-                except ValueError:
-                    raise HTTPException(status_code=400, detail="Invalid to_date format. Use YYYY-MM-DD")
-        
-        # Execute query
-        login_logs = list(db.login_logs.find(
-            filter_criteria
-        ).sort("timestamp", -1).limit(limit))
-        
-        # Format results
-        formatted_logs = []
-        for log in login_logs:
-            formatted_logs.append({
-                "id": str(log["_id"]),
-                "email": log.get("email", ""),
-                "timestamp": str(log.get("timestamp", "")),
-                "status": log.get("status", ""),
-                "reason": log.get("reason", ""),
-                "source": log.get("source", ""),
-                "ip_address": log.get("ip_address", ""),
-                "user_agent": log.get("user_agent", "")
-            })
-        
-        # Get total count for pagination
-        total_count = db.login_logs.count_documents(filter_criteria)
+        response = await response_cache.respond(request, _compute_active_threats)
         
         # Log API access
         ip_address = request.client.host if request.client else None
         duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
-            endpoint="/security-monitor/login-attempts",
+        await security_logger.log_access(
+            endpoint="/security-monitor/active-threats",
             method="GET",
             ip_address=ip_address,
-            status_code=200,
+            status_code=response.status_code,
             duration_ms=duration_ms
         )
         
-        return {
-            "total": total_count,
-            "returned": len(formatted_logs),
-            "login_attempts": formatted_logs
-        }
-        
-    except HTTPException as http_exception:
-        # Log API access for HTTP exception
-        ip_address = request.client.host if request.client else None
-        duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
-            endpoint="/security-monitor/login-attempts",
-            method="GET",
-            ip_address=ip_address,
-            status_code=http_exception.status_code,
-            duration_ms=duration_ms
-        )
-        raise http_exception
+        return response
         
     except Exception as e:
-        logger.error(f"Error getting login attempts: {e}")
+        logger.error(f"Error getting active threats: {e}")
         logger.error(traceback.format_exc())
         
         # Log API error
         ip_address = request.client.host if request.client else None
         duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
-            endpoint="/security-monitor/login-attempts",
+        await security_logger.log_access(
+            endpoint="/security-monitor/active-threats",
             method="GET",
             ip_address=ip_address,
             status_code=500,
             duration_ms=duration_ms
         )
         
-        raise HTTPException(status_code=500, detail=f"Error retrieving login attempts: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving active threats: {str(e)}")
 
-@router.get("/security-events")
-async def get_security_events(
+
+def _live_types(types):
+    if not types:
+        return None
+    return {name.strip() for name in types.split(",") if name.strip()}
+
+@router.get("/live")
+async def live_events_sse(
     request: Request,
-    severity: Optional[str] = Query(None, description="Filter by severity (low/medium/high/critical)"),
-    event_type: Optional[str] = Query(None, description="Filter by event type"),
-    from_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    to_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    limit: int = Query(50, ge=1, le=1000, description="Maximum number of results")
+    resume: Optional[str] = Query(None, description="Last event id received; Last-Event-ID takes precedence"),
+    types: Optional[str] = Query(None, description="Comma-separated entry types, e.g. login_logs,security_events")
 ):
     """
-    Get security events with filtering options.
+    Server-sent events feed of new login attempts, security events and periodic metric deltas.
+    Replaces polling /login-attempts and /security-events; reconnecting browsers resume via Last-Event-ID.
     """
-    start_time = time.time()
-    
-    try:
-        db = get_db()
-        
-        # Build filter
-        filter_criteria = {}
-        
-        if severity:
-            filter_criteria["severity"] = severity
-            
-        if event_type:
-            filter_criteria["event_type"] = event_type
-            
-        # Handle date range
-        if from_date or to_date:
-            filter_criteria["timestamp"] = {}
-            
-            if from_date:
-                try:
-                    from_datetime = datetime.strptime(from_date, "%Y-%m-%d")
-                    filter_criteria["timestamp"]["$gte"] = from_datetime
-                except ValueError:
-                    raise HTTPException(status_code=400, detail="Invalid from_date format. Use YYYY-MM-DD")
-                    
-            if to_date:
-                try:
-                    to_datetime = datetime.strptime(to_date, "%Y-%m-%d")
-                    # Add one day to include the entire end date
-                    to_datetime = to_datetime + timedelta(days=1)
-                    filter_criteria["timestamp"]["$lt"] = to_datetime
-                except ValueError:
-                    raise HTTPException(status_code=400, detail="Invalid to_date format. Use YYYY-MM-DD")
-        
-        # Execute query
-        security_events = list(db.security_events.find(
-            filter_criteria
-        ).sort("timestamp", -1).limit(limit))
-        
-        # Format results
-        formatted_events = []
-        for event in security_events:
-            formatted_events.append({
-                "id": str(event["_id"]),
-                "timestamp": str(event.get("timestamp", "")),
-                "event_type": event.get("event_type", ""),
-                "severity": event.get("severity", ""),
-                "details": event.get("details", {}),
-                "user_id": event.get("user_id", "")
-            })
-        
-        # Get total count for pagination
-        total_count = db.security_events.count_documents(filter_criteria)
-        
-        # Log API access
-        ip_address = request.client.host if request.client else None
-        duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
-            endpoint="/security-monitor/security-events",
-            method="GET",
-            ip_address=ip_address,
-            status_code=200,
-            duration_ms=duration_ms
-        )
-        
-        return {
-            "total": total_count,
-            "returned": len(formatted_events),
-            "security_events": formatted_events
-        }
-        
-    except HTTPException as http_exception:
-        # Log API access for HTTP exception
-        ip_address = request.client.host if request.client else None
-        duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
-            endpoint="/security-monitor/security-events",
-            method="GET",
-            ip_address=ip_address,
-            status_code=http_exception.status_code,
-            duration_ms=duration_ms
-        )
-        raise http_exception
-        
-    except Exception as e:
-        logger.error(f"Error getting security events: {e}")
-        logger.error(traceback.format_exc())
-        
-        # Log API error
-        ip_address = request.client.host if request.client else None
-        duration_ms = round((time.time() - start_time) * 1000)
-        security_logger.log_access(
-            endpoint="/security-monitor/security-events",
-            method="GET",
-            ip_address=ip_address,
-            status_code=500,
-            duration_ms=duration_ms
-        )
-        
-        raise HTTPException(status_code=500, detail=f"Error retrieving security events: {str(e)}")
+    if live_feed.full:
+        raise HTTPException(status_code=503, detail="Live feed is at capacity, fall back to polling")
+    resume_token = request.headers.get("last-event-id") or resume
 
-@router.get("/active-threats")
-async def get_active_threats(request: Request):
-    """
-    Get currently active security threats that need attention.
-    """
-    start_time = time.time()
-    
+    async def events():
+        yield f"retry: {int(live_feed.heartbeat_seconds * 1000)}\n\n"
+        async for token, entry in live_feed.subscribe(resume_token, _live_types(types)):
+            if entry is None:
+                if await request.is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {token}\nevent: {entry['type']}\ndata: {json.dumps(entry['data'], default=str)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/live/ws")
+async def live_events_ws(
+    websocket: WebSocket,
+    resume: Optional[str] = Query(None),
+    types: Optional[str] = Query(None)
+):
+    """WebSocket variant of /live; each message is {"id", "type", "data"}."""
+    # Fast path only: another client can still take the last slot before subscribe() runs
+    if live_feed.full:
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
     try:
-        db = get_db()
-        
-        # Time thresholds
-        now = datetime.utcnow()
-        last_hour
\ No newline at end of file
+        async for token, entry in live_feed.subscribe(resume, _live_types(types)):
+            if entry is None:
+                await websocket.send_json({"type": "heartbeat"})
+            else:
+                await websocket.send_text(json.dumps({"id": token, "type": entry["type"], "data": entry["data"]}, default=str))
+    except LiveFeedFull:
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
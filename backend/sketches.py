@@ -0,0 +1,258 @@
+"""
+Sketches module for CyberShield-AI.
+Fixed-size, mergeable summaries of login streams for counts that would otherwise need unbounded sets.
+"""
+
+from array import array
+import hashlib
+import heapq
+import math
+import os
+
+HLL_PRECISION = int(os.environ.get("HLL_PRECISION", "10"))
+CMS_WIDTH = int(os.environ.get("CMS_WIDTH", "2048"))
+CMS_DEPTH = int(os.environ.get("CMS_DEPTH", "4"))
+TOP_K = int(os.environ.get("HEAVY_HITTERS_TOP_K", "20"))
+
+_HASH_BITS = 64
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(_HASH_BITS + 1)]
+
+
+def hash64(value):
+    """Stable 64-bit hash; Python's hash() is salted per process, so sketches from other workers would not merge."""
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Distinct-count estimate in 2^p one-byte registers (standard error about 1.04 / sqrt(2^p)).
+
+    Small sets are kept as their exact hashes until they would outgrow the registers, so the
+    common key with a handful of values costs a few hundred bytes and counts exactly.
+    """
+
+    __slots__ = ("p", "registers", "hashes")
+
+    def __init__(self, p=HLL_PRECISION):
+        if not 4 <= p <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.p = p
+        self.registers = None
+        self.hashes = set()
+
+    @property
+    def m(self):
+        return 1 << self.p
+
+    @property
+    def sparse_limit(self):
+        return max(8, self.m >> 6)
+
+    def add(self, value):
+        self.add_hash(hash64(value))
+
+    def add_hash(self, hashed):
+        if self.registers is None:
+            self.hashes.add(hashed)
+            if len(self.hashes) > self.sparse_limit:
+                self._densify()
+            return
+        self._set_register(hashed)
+
+    def _set_register(self, hashed):
+        index = hashed >> (_HASH_BITS - self.p)
+        rest = hashed & ((1 << (_HASH_BITS - self.p)) - 1)
+        rank = (_HASH_BITS - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def _densify(self):
+        self.registers = bytearray(self.m)
+        for hashed in self.hashes:
+            self._set_register(hashed)
+        self.hashes = None
+
+    def count(self):
+        if self.registers is None:
+            return len(self.hashes)
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m) if m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / sum(map(_INVERSE_POWERS.__getitem__, self.registers))
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        """Fold another sketch of the same precision into this one (union of the two sets)."""
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        if other.registers is None:
+            for hashed in other.hashes:
+                self.add_hash(hashed)
+            return self
+        if self.registers is None:
+            self._densify()
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    @classmethod
+    def union(cls, sketches, p=HLL_PRECISION):
+        merged = cls(p)
+        for sketch in sketches:
+            merged.merge(sketch)
+        return merged
+
+    def to_bytes(self):
+        if self.registers is None:
+            return bytes([self.p, 0]) + b"".join(hashed.to_bytes(8, "big") for hashed in sorted(self.hashes))
+        return bytes([self.p, 1]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        sketch = cls(data[0])
+        if data[1]:
+            sketch.registers = bytearray(data[2:])
+            sketch.hashes = None
+        else:
+            sketch.hashes = {int.from_bytes(data[offset:offset + 8], "big") for offset in range(2, len(data), 8)}
+        return sketch
+
+    def size_bytes(self):
+        return self.m if self.registers is not None else 8 * len(self.hashes)
+
+
+class CountMinSketch:
+    """
+    Frequency estimates in depth rows of width counters; estimates never undercount and
+    overcount by at most e / width of the stream total with probability 1 - e^-depth.
+    """
+
+    __slots__ = ("width", "depth", "counts", "total")
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.counts = array("Q", bytes(8 * width * depth))
+        self.total = 0
+
+    def _cells(self, hashed):
+        # Double hashing: one 64-bit hash yields every row's column
+        low, high = hashed & 0xFFFFFFFF, hashed >> 32
+        width = self.width
+        return [row * width + (low + row * high) % width for row in range(self.depth)]
+
+    def add_hash(self, hashed, count=1):
+        """Add count occurrences and return the updated estimate."""
+        counts = self.counts
+        estimate = None
+        for cell in self._cells(hashed):
+            counts[cell] += count
+            if estimate is None or counts[cell] < estimate:
+                estimate = counts[cell]
+        self.total += count
+        return estimate
+
+    def add(self, value, count=1):
+        return self.add_hash(hash64(value), count)
+
+    def estimate(self, value):
+        counts = self.counts
+        return min(counts[cell] for cell in self._cells(hash64(value)))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min sketches of different shapes")
+        self.counts = array("Q", map(sum, zip(self.counts, other.counts)))
+        self.total += other.total
+        return self
+
+    def to_bytes(self):
+        return self.counts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, width, depth, total):
+        sketch = cls(width, depth)
+        sketch.counts = array("Q")
+        sketch.counts.frombytes(data)
+        sketch.total = total
+        return sketch
+
+
+class HeavyHitters:
+    """Count-Min sketch plus the k values with the highest estimates, kept in a lazily cleaned min-heap."""
+
+    __slots__ = ("k", "sketch", "top", "_heap")
+
+    def __init__(self, k=TOP_K, width=CMS_WIDTH, depth=CMS_DEPTH, sketch=None):
+        self.k = k
+        self.sketch = sketch if sketch is not None else CountMinSketch(width, depth)
+        # value -> current estimate for the tracked candidates
+        self.top = {}
+        self._heap = []
+
+    def add(self, value, count=1):
+        self._offer(value, self.sketch.add(value, count))
+
+    def _offer(self, value, estimate):
+        top = self.top
+        if value in top or len(top) < self.k:
+            top[value] = estimate
+            heapq.heappush(self._heap, (estimate, value))
+        else:
+            floor = self._floor()
+            if estimate <= floor[0]:
+                return
+            heapq.heappop(self._heap)
+            del top[floor[1]]
+            top[value] = estimate
+            heapq.heappush(self._heap, (estimate, value))
+        if len(self._heap) > 4 * self.k:
+            # Drop superseded entries so the heap stays O(k)
+            self._heap = [(estimate, value) for value, estimate in top.items()]
+            heapq.heapify(self._heap)
+
+    def _floor(self):
+        heap, top = self._heap, self.top
+        while heap[0][1] not in top or top[heap[0][1]] != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0]
+
+    def most_common(self, n=None):
+        ranked = sorted(self.top.items(), key=lambda item: (-item[1], str(item[0])))
+        return ranked if n is None else ranked[:n]
+
+    def merge(self, other):
+        """Union of two streams: sketches add up, candidates are re-estimated from the merged sketch."""
+        self.sketch.merge(other.sketch)
+        candidates = set(self.top) | set(other.top)
+        self.top, self._heap = {}, []
+        for value in candidates:
+            self._offer(value, self.sketch.estimate(value))
+        return self
+
+    @classmethod
+    def union(cls, parts, k=TOP_K, width=CMS_WIDTH, depth=CMS_DEPTH):
+        merged = cls(k, width, depth)
+        for part in parts:
+            merged.merge(part)
+        return merged
+
+    def to_document(self):
+        return {
+            "k": self.k,
+            "width": self.sketch.width,
+            "depth": self.sketch.depth,
+            "total": self.sketch.total,
+            "counts": self.sketch.to_bytes(),
+            "top": [[value, estimate] for value, estimate in self.top.items()],
+        }
+
+    @classmethod
+    def from_document(cls, doc):
+        sketch = CountMinSketch.from_bytes(doc["counts"], doc["width"], doc["depth"], doc["total"])
+        hitters = cls(doc["k"], sketch=sketch)
+        for value, estimate in doc["top"]:
+            hitters._offer(value, estimate)
+        return hitters
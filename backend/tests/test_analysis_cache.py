@@ -0,0 +1,68 @@
+from analysis_cache import AnalysisCache, content_hash
+import asyncio
+
+class FakeAnalyzer:
+    def __init__(self):
+        self.version = "v1"
+        self.calls = []
+
+    async def analyze_many(self, texts):
+        self.calls.append(list(texts))
+        return [{"isHateSpeech": "hate" in text.lower(), "matchedTerms": [], "score": 0.0, "modelScore": None} for text in texts]
+
+def _memory_cache(analyzer):
+    cache = AnalysisCache(analyzer=analyzer)
+    cache.persist = False
+    return cache
+
+def test_key_ignores_case_and_spacing_but_not_version():
+    assert content_hash("I  HATE it", "v1") == content_hash("i hate it", "v1")
+    assert content_hash("i hate it", "v1") != content_hash("i hate it", "v2")
+
+def test_repeated_content_skips_the_analyzer():
+    analyzer = FakeAnalyzer()
+    cache = _memory_cache(analyzer)
+
+    async def scenario():
+        first = await cache.analyze_many(["I hate it", "fine", "i hate   it"])
+        second = await cache.analyze("Fine")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert analyzer.calls == [["I hate it", "fine"]]
+    assert [result["isHateSpeech"] for result in first] == [True, False, True]
+    assert second["isHateSpeech"] is False
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 3)
+
+def test_version_change_invalidates_entries():
+    analyzer = FakeAnalyzer()
+    cache = _memory_cache(analyzer)
+    asyncio.run(cache.analyze("text"))
+    analyzer.version = "v2"
+    asyncio.run(cache.analyze("text"))
+
+    assert len(analyzer.calls) == 2
+
+def test_expired_entries_are_recomputed():
+    analyzer = FakeAnalyzer()
+    cache = _memory_cache(analyzer)
+    cache.ttl = 0
+    asyncio.run(cache.analyze("text"))
+    asyncio.run(cache.analyze("text"))
+
+    assert len(analyzer.calls) == 2
+
+def test_unrecorded_texts_bypass_the_memo_and_remembered_results_are_served():
+    analyzer = FakeAnalyzer()
+    cache = _memory_cache(analyzer)
+
+    async def scenario():
+        await cache.analyze_many(["window one"], record=False)
+        await cache.analyze_many(["window one"], record=False)
+        cache.remember("whole document", {"isHateSpeech": True, "matchedTerms": ["x"], "score": 1.0, "modelScore": None})
+        return await cache.analyze("Whole  document")
+
+    document = asyncio.run(scenario())
+    assert analyzer.calls == [["window one"], ["window one"]]
+    assert cache.memory.size() == 1 and document["isHateSpeech"] is True
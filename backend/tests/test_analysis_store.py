@@ -0,0 +1,60 @@
+from analysis_store import AnalysisStore, MODE_FULL, MODE_HASH, stored_text
+from log_pipeline import log_pipeline
+import hashlib
+
+class RecordingPipeline:
+    def __init__(self):
+        self.enqueued = []
+
+    def enqueue(self, collection, document):
+        self.enqueued.append((collection, document))
+
+    def stats(self):
+        return {"queued": 0}
+
+def _result(is_hate):
+    return {"isHateSpeech": is_hate, "matchedTerms": ["hate*"] if is_hate else [], "score": 1.0 if is_hate else 0.0, "modelScore": None}
+
+def _key(i):
+    return hashlib.sha256(str(i).encode()).hexdigest()
+
+def test_excerpt_mode_keeps_verdict_and_prefix_only():
+    store = AnalysisStore(pipeline=RecordingPipeline())
+    store.excerpt_chars = 10
+    doc = store.document("I hate this very long message", _result(True), _key(1), "v1")
+
+    assert doc["excerpt"] == "I hate thi"
+    assert doc["text_length"] == 29
+    assert "text" not in doc and "text_compressed" not in doc
+    assert stored_text(doc) == "I hate thi"
+
+def test_full_mode_round_trips_compressed_text():
+    store = AnalysisStore(pipeline=RecordingPipeline())
+    store.mode, store.compression = MODE_FULL, "zlib"
+    text = "the same sentence again. " * 400
+    doc = store.document(text, _result(False), _key(2), "v1")
+
+    assert len(doc["text_compressed"]) < len(text) / 10
+    assert stored_text(doc) == text
+    assert store.stats()["compression_ratio"] < 0.1
+
+def test_negatives_are_sampled_deterministically():
+    pipeline = RecordingPipeline()
+    store = AnalysisStore(pipeline=pipeline)
+    store.mode = MODE_HASH
+    store.sample_negatives = 0.1
+    keys = [_key(i) for i in range(2000)]
+
+    store.record(["text"] * 2000, [_result(False)] * 2000, keys, "v1")
+    store.record(["text"] * 10, [_result(True)] * 10, keys[:10], "v1")
+
+    negatives = [doc for _, doc in pipeline.enqueued if not doc["is_hate_speech"]]
+    assert 120 < len(negatives) < 280
+    assert sum(1 for _, doc in pipeline.enqueued if doc["is_hate_speech"]) == 10
+    assert all(store.keep(doc["content_hash"], _result(False)) for doc in negatives)
+    assert store.stats()["sampled_out"] == 2000 - len(negatives)
+
+def test_default_pipeline_is_separate_from_the_audit_queue():
+    store = AnalysisStore()
+    assert store.pipeline is not log_pipeline
+    assert store.pipeline.name == "analysis-pipeline"
@@ -0,0 +1,120 @@
+from analysis_cache import AnalysisCache
+from chunking import ChunkedAnalyzer, iter_windows
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from request_limits import BodySizeLimitMiddleware
+import asyncio
+
+def score(text):
+    return {"isHateSpeech": "hate" in text, "matchedTerms": ["hate"] if "hate" in text else [], "score": 1.0 if "hate" in text else 0.0, "modelScore": None}
+
+class FakeCache:
+    def __init__(self):
+        self.batches = []
+        self.remembered = []
+
+    async def analyze_many(self, texts, record=True):
+        assert not record
+        self.batches.append(len(texts))
+        return [score(text) for text in texts]
+
+    def remember(self, text, result):
+        self.remembered.append((text, result))
+
+class CountingAnalyzer:
+    version = "v1"
+
+    def __init__(self):
+        self.texts = 0
+
+    async def analyze_many(self, texts):
+        self.texts += len(texts)
+        return [score(text) for text in texts]
+
+class RecordingStore:
+    def __init__(self):
+        self.keys = []
+
+    def record(self, texts, results, keys, version):
+        self.keys.extend(keys)
+
+def test_windows_cover_text_with_overlap_and_whole_words():
+    text = " ".join(f"word{i}" for i in range(500))
+    windows = list(iter_windows(text, 100, 20))
+
+    assert windows[0][0] == 0 and windows[-1][1] == len(text)
+    for (start, end), (next_start, _) in zip(windows, windows[1:]):
+        assert next_start < end
+        assert end - start <= 100
+        assert text[next_start - 1] == " " and text[end - 1] == " "
+
+def test_unbroken_text_still_advances():
+    assert list(iter_windows("x" * 250, 100, 20)) == [(0, 100), (80, 180), (160, 250)]
+
+def test_early_exit_stops_after_first_confident_chunk():
+    text = "calm words " * 200 + "I hate this " + "calm words " * 200
+    analyzer = ChunkedAnalyzer(cache=FakeCache())
+    analyzer.window_chars, analyzer.overlap_chars, analyzer.batch_size = 200, 40, 4
+
+    full = asyncio.run(analyzer.analyze(text))
+    early = asyncio.run(analyzer.analyze(text, early_exit=True))
+
+    assert full["isHateSpeech"] and early["isHateSpeech"]
+    assert full["stoppedEarly"] is False and early["stoppedEarly"] is True
+    assert len(early["chunks"]) < len(full["chunks"])
+    hit = early["chunks"][-1]
+    assert "hate" in text[hit["start"]:hit["end"]]
+
+def test_only_the_complete_document_result_is_recorded():
+    text = "calm words " * 200 + "I hate this " + "calm words " * 200
+    cache = FakeCache()
+    analyzer = ChunkedAnalyzer(cache=cache)
+    analyzer.window_chars, analyzer.overlap_chars, analyzer.batch_size = 200, 40, 4
+
+    asyncio.run(analyzer.analyze(text, early_exit=True))
+    assert cache.remembered == []
+    asyncio.run(analyzer.analyze(text))
+    assert cache.remembered == [(text, {"isHateSpeech": True, "matchedTerms": ["hate"], "score": 1.0, "modelScore": None})]
+
+def test_oversized_bodies_are_rejected_before_parsing():
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=64, path_prefixes=("/analyze",))
+
+    class Body(BaseModel):
+        text: str
+
+    @app.post("/analyze")
+    def analyze(body: Body):
+        return {"length": len(body.text)}
+
+    client = TestClient(app)
+    assert client.post("/analyze", json={"text": "short"}).json() == {"length": 5}
+    assert client.post("/analyze", json={"text": "x" * 100}).status_code == 413
+
+    def chunked_body():
+        yield b'{"text": "'
+        for _ in range(10):
+            yield b"x" * 20
+        yield b'"}'
+    assert client.post("/analyze", content=chunked_body(), headers={"content-type": "application/json"}).status_code == 413
+
+def test_repeated_long_text_is_served_from_the_cache():
+    text = "calm words " * 200 + "I hate this " + "calm words " * 200
+    analyzer_fn, store = CountingAnalyzer(), RecordingStore()
+    cache = AnalysisCache(analyzer=analyzer_fn, store=store)
+    cache.persist = True
+    cache._load = lambda keys: {}
+    analyzer = ChunkedAnalyzer(cache=cache)
+    analyzer.window_chars, analyzer.overlap_chars, analyzer.batch_size = 200, 40, 4
+
+    async def scenario():
+        first = await analyzer.analyze(text, include_chunks=False)
+        windows = analyzer_fn.texts
+        second = await analyzer.analyze(text, include_chunks=False)
+        return first, windows, second
+
+    first, windows, second = asyncio.run(scenario())
+    assert windows > 1 and analyzer_fn.texts == windows
+    assert second == first and "chunks" not in second
+    assert len(store.keys) == 1
@@ -0,0 +1,42 @@
+from dashboard_metrics import batch_update, summary_response
+from datetime import datetime
+
+def test_login_batch_increments_status_and_day_counters():
+    now = datetime(2024, 5, 10, 9)
+    update = batch_update("login_logs", [
+        {"status": "success", "timestamp": now},
+        {"status": "failed", "timestamp": now},
+        {"status": "failed", "timestamp": now},
+    ])
+
+    assert update["$inc"] == {
+        "logins.success": 1,
+        "logins_by_day.2024-05-10.success": 1,
+        "logins.failed": 2,
+        "logins_by_day.2024-05-10.failed": 2,
+    }
+    assert batch_update("access_logs", [{"timestamp": now}]) is None
+
+def test_security_events_push_newest_first():
+    events = [{"_id": i, "severity": "high", "timestamp": datetime(2024, 5, 10, 9, i)} for i in range(3)]
+    update = batch_update("security_events", events, recent_events_limit=2)
+
+    assert update["$inc"] == {"events_by_severity.high": 3}
+    push = update["$push"]["recent_events"]
+    assert [event["_id"] for event in push["$each"]] == ["2", "1", "0"]
+    assert push["$slice"] == 2 and push["$position"] == 0
+
+def test_summary_response_matches_endpoint_shape():
+    doc = {
+        "logins": {"success": 6, "failed": 2},
+        "logins_by_day": {"2024-04-01": {"success": 5}, "2024-05-10": {"success": 1, "failed": 2}},
+        "events_by_severity": {"high": 1, "low": 2, "critical": 4},
+        "users": {"total": 3},
+        "users_by_day": {"2024-05-10": 1},
+    }
+    summary = summary_response(doc, now=datetime(2024, 5, 10, 12))
+
+    assert summary["login_metrics"] == {"total_logins": 6, "today_logins": 1, "total_failed": 2, "today_failed": 2, "failure_rate": 25.0}
+    assert summary["security_events"] == {"high": 1, "medium": 0, "low": 2, "total": 3}
+    assert summary["user_metrics"] == {"total_users": 3, "new_users_today": 1}
+    assert summary["login_trends"] == {"dates": ["2024-05-10"], "success": [1], "failed": [2]}
@@ -0,0 +1,109 @@
+from heavy_hitters import DAY_SECONDS, HeavyHitterTracker
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
+
+NOW = datetime(2024, 5, 10, 12, 0)
+TODAY = int((NOW - datetime(1970, 1, 1)).total_seconds() // DAY_SECONDS)
+
+def matches(doc, filter):
+    for field, condition in filter.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+            if "$gte" in condition and not (value is not None and value >= condition["$gte"]):
+                return False
+            if "$lte" in condition and not (value is not None and value <= condition["$lte"]):
+                return False
+            if "$lt" in condition and not (value is not None and value < condition["$lt"]):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+class FakeCursor(list):
+    def batch_size(self, size):
+        return self
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = {}
+        for index, doc in enumerate(docs):
+            self.docs[doc.get("_id", index)] = doc
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self.docs[operation._filter["_id"]] = dict(operation._doc)
+
+    def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate")
+        self.docs[doc["_id"]] = doc
+
+    def delete_many(self, filter):
+        for doc_id in [doc_id for doc_id, doc in self.docs.items() if matches(doc, filter)]:
+            del self.docs[doc_id]
+
+    def find(self, filter, projection=None):
+        return FakeCursor(doc for doc in self.docs.values() if matches(doc, filter))
+
+    def find_one(self, filter):
+        found = self.find(filter)
+        return found[0] if found else None
+
+class FakeDb(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+def failed(email, ip, days_ago=0, reason="incorrect_password"):
+    return {"email": email, "ip_address": ip, "status": "failed", "reason": reason, "timestamp": NOW - timedelta(days=days_ago)}
+
+def tracker(worker_id):
+    tracker = HeavyHitterTracker()
+    tracker.worker_id = worker_id
+    return tracker
+
+def test_top_lists_cover_the_window_and_respect_thresholds():
+    hitters = tracker("a")
+    rows = [failed("a@gmail.com", "1.1.1.1", days_ago=n % 3) for n in range(9)]
+    rows += [failed("b@gmail.com", "2.2.2.2", reason="user_not_found") for _ in range(6)]
+    rows += [failed("c@gmail.com", "3.3.3.3", days_ago=9) for _ in range(20)]
+    hitters.observe(rows, today=TODAY)
+
+    assert hitters.top("ip", 3, today=TODAY) == [("1.1.1.1", 9), ("2.2.2.2", 6)]
+    # user_not_found rows only count against the IP; rows older than the window are ignored
+    assert hitters.top("email", 3, min_count=3, today=TODAY) == [("a@gmail.com", 9)]
+    # A week later only today's bucket is still inside the eight-day window
+    assert hitters.top("ip", 3, today=TODAY + 7) == [("2.2.2.2", 6), ("1.1.1.1", 3)]
+
+def test_workers_merge_through_checkpoints():
+    db = FakeDb()
+    first, second = tracker("a"), tracker("b")
+    first.observe([failed("x@gmail.com", "1.1.1.1") for _ in range(4)], today=TODAY)
+    second.observe([failed("x@gmail.com", "1.1.1.1") for _ in range(3)] + [failed("y@gmail.com", "2.2.2.2") for _ in range(5)], today=TODAY)
+    first.checkpoint(db, today=TODAY)
+    second.checkpoint(db, today=TODAY)
+    first.checkpoint(db, today=TODAY)
+
+    assert first.top("ip", 2, today=TODAY) == second.top("ip", 2, today=TODAY) == [("1.1.1.1", 7), ("2.2.2.2", 5)]
+    assert first.peer_workers == 1
+
+    # A restart under the same worker id restores its own days instead of counting them twice
+    restarted = tracker("a")
+    restarted.load(db, today=TODAY)
+    assert restarted.top("ip", 1, today=TODAY) == [("1.1.1.1", 7)]
+
+def test_only_one_worker_seeds_an_empty_collection():
+    db = FakeDb()
+    db["login_logs"] = FakeCollection([failed("a@gmail.com", "1.1.1.1", days_ago=n % 5) for n in range(10)])
+    first, second = tracker("a"), tracker("b")
+    first.load(db, today=TODAY, until=NOW)
+    second.load(db, today=TODAY, until=NOW)
+
+    assert first.seeded == 10 and second.seeded == 0
+    assert second.top("ip", 1, today=TODAY) == [("1.1.1.1", 10)]
+    assert first.ready and second.ready
@@ -0,0 +1,88 @@
+from inference import HateSpeechAnalyzer, MicroBatcher
+from fastapi import HTTPException
+from lexicon import LexiconEngine
+import asyncio
+import pytest
+
+class FakeClassifier:
+    available = True
+    version = "fake:none"
+
+    def __init__(self):
+        self.batches = []
+
+    def start(self):
+        pass
+
+    def predict(self, texts):
+        self.batches.append(list(texts))
+        return [0.9 if "awful" in text else 0.1 for text in texts]
+
+def test_concurrent_calls_share_batches():
+    classifier = FakeClassifier()
+    batcher = MicroBatcher(classifier.predict)
+    batcher.max_batch_size = 8
+    batcher.max_wait = 0.05
+
+    async def scenario():
+        return await asyncio.gather(*[batcher.predict([f"text {i}"]) for i in range(20)])
+
+    results = asyncio.run(scenario())
+    batcher.stop()
+    assert [result[0] for result in results] == [0.1] * 20
+    assert sum(len(batch) for batch in classifier.batches) == 20
+    assert max(len(batch) for batch in classifier.batches) == 8
+    assert len(classifier.batches) < 20
+
+def test_batch_failure_reaches_every_caller():
+    def broken(texts):
+        raise ValueError("model crashed")
+    batcher = MicroBatcher(broken)
+
+    with pytest.raises(ValueError):
+        asyncio.run(batcher.predict(["a", "b"]))
+    batcher.stop()
+
+def test_analyzer_combines_lexicon_and_model_scores():
+    lexicon = LexiconEngine(path="unused")
+    lexicon.load(entries=[("hate", 1.0)])
+    analyzer = HateSpeechAnalyzer(classifier=FakeClassifier(), lexicon=lexicon)
+
+    results = asyncio.run(analyzer.analyze_many(["I hate it", "that was awful", "fine"]))
+    analyzer.stop()
+    assert [result["isHateSpeech"] for result in results] == [True, True, False]
+    assert results[1] == {"isHateSpeech": True, "matchedTerms": [], "score": 0.9, "modelScore": 0.9}
+
+def test_cancelled_caller_does_not_stop_the_batcher():
+    classifier = FakeClassifier()
+    batcher = MicroBatcher(classifier.predict)
+    batcher.max_wait = 0.05
+
+    async def scenario():
+        cancelled = asyncio.ensure_future(batcher.predict(["first"]))
+        kept = asyncio.ensure_future(batcher.predict(["awful second"]))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        first = await asyncio.wait_for(kept, 2)
+        return first, await asyncio.wait_for(batcher.predict(["third"]), 2)
+
+    first, later = asyncio.run(scenario())
+    assert first == [0.9] and later == [0.1]
+    assert batcher._thread.is_alive()
+    batcher.stop()
+
+def test_short_results_fail_the_leftover_callers_and_full_queue_is_503():
+    batcher = MicroBatcher(lambda texts: [0.5])
+    batcher.max_wait = 0.05
+
+    async def scenario():
+        return await asyncio.gather(batcher.predict(["a"]), batcher.predict(["b"]), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [0.5] in results and any(isinstance(result, RuntimeError) for result in results)
+
+    batcher.max_queue = 0
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(batcher.predict(["c"]))
+    assert error.value.status_code == 503
+    batcher.stop()
@@ -0,0 +1,48 @@
+from lexicon import LexiconEngine, normalize
+import os
+import time
+
+def make_engine(entries):
+    engine = LexiconEngine(path="unused")
+    engine.load(entries=entries)
+    return engine
+
+def test_normalization_undoes_common_obfuscation():
+    assert normalize("H4T3ful") == "hateful"
+    assert normalize("s.t.u.p.i.d!!") == "stupid"
+    assert normalize("Stüpid   people") == "stupid people"
+    assert normalize("room 101") == "room 101"
+
+def test_word_boundaries_and_prefix_terms():
+    engine = make_engine([("kill*", 1.0), ("hate", 1.0), ("stupid", 0.3)])
+
+    assert engine.analyze("I will kiiill you")[1] == ["kill*"]
+    assert engine.analyze("killers everywhere")[1] == ["kill*"]
+    assert engine.analyze("great skill, nice kilogram")[1] == []
+    assert engine.analyze("whatever, chateau")[1] == []
+    assert engine.analyze("I HATE mondays") == (True, ["hate"], 1.0)
+
+def test_score_sums_weights_against_threshold():
+    engine = make_engine([("stupid", 0.3), ("idiot", 0.3)])
+
+    assert engine.analyze("stupid") == (False, ["stupid"], 0.3)
+    assert engine.analyze("stupid idiot") == (True, ["idiot", "stupid"], 0.6)
+
+def test_phrases_match_across_whitespace():
+    engine = make_engine([("go back home", 1.0)])
+    assert engine.analyze("you should GO  BACK home now")[1] == ["go back home"]
+    assert engine.analyze("go back homework")[1] == []
+
+def test_reload_picks_up_file_changes(tmp_path):
+    path = tmp_path / "lexicon.txt"
+    path.write_text("# comment\nhate\n", encoding="utf-8")
+    engine = LexiconEngine(path=str(path))
+    first_version = engine.version
+    assert engine.analyze("nasty troll")[0] is False
+
+    path.write_text("hate\ntroll\t0.8\n", encoding="utf-8")
+    os.utime(path, (time.time() + 5, time.time() + 5))
+
+    assert engine.reload_if_changed() is True
+    assert engine.version != first_version
+    assert engine.analyze("nasty troll") == (True, ["troll"], 0.8)
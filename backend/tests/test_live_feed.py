@@ -0,0 +1,143 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from live_feed import LiveFeed, LiveFeedFull, live_feed
+from starlette.websockets import WebSocketDisconnect
+import asyncio
+import pytest
+import security_monitor_api
+
+def make_feed(buffer_size=100):
+    feed = LiveFeed()
+    feed.buffer_size = buffer_size
+    feed._buffer = type(feed._buffer)(maxlen=buffer_size)
+    feed.metrics_interval = 0
+    feed.heartbeat_seconds = 0.05
+    feed.set_formatter("login_logs", lambda log: {"email": log["email"], "status": log["status"]})
+    return feed
+
+async def take(subscription, count):
+    items = []
+    async for token, entry in subscription:
+        if entry is not None:
+            items.append((token, entry))
+        if len(items) == count:
+            break
+    return items
+
+def test_batches_fan_out_to_every_subscriber():
+    async def scenario():
+        feed = make_feed()
+        feed.start()
+        first, second = feed.subscribe(), feed.subscribe()
+        readers = [asyncio.ensure_future(take(first, 2)), asyncio.ensure_future(take(second, 2))]
+        await asyncio.sleep(0.01)
+        feed.on_batch("login_logs", [{"email": "a@gmail.com", "status": "failed"}, {"email": "b@gmail.com", "status": "success"}])
+        feed.on_batch("access_logs", [{"endpoint": "/x"}])
+        results = await asyncio.gather(*readers)
+        await feed.stop()
+        return feed, results
+
+    feed, results = asyncio.run(scenario())
+    for items in results:
+        assert [entry["data"]["email"] for _, entry in items] == ["a@gmail.com", "b@gmail.com"]
+        assert items[1][0] == feed.token(2)
+    assert feed.published == 2
+    assert feed._deltas == {"logins.failed": 1, "logins.success": 1}
+
+def test_resume_token_replays_missed_entries():
+    async def scenario():
+        feed = make_feed()
+        feed.start()
+        feed._publish([{"type": "login_logs", "data": {"n": n}} for n in range(5)])
+        items = await take(feed.subscribe(feed.token(2)), 3)
+        await feed.stop()
+        return items
+
+    items = asyncio.run(scenario())
+    assert [entry["data"]["n"] for _, entry in items] == [2, 3, 4]
+
+def test_stale_or_foreign_token_gets_a_reset():
+    async def scenario():
+        feed = make_feed(buffer_size=3)
+        feed.start()
+        feed._publish([{"type": "login_logs", "data": {"n": n}} for n in range(10)])
+        stale = await take(feed.subscribe(feed.token(1)), 1)
+        foreign = await take(feed.subscribe("deadbeef-4"), 1)
+        await feed.stop()
+        return feed, stale, foreign
+
+    feed, stale, foreign = asyncio.run(scenario())
+    assert stale[0][1]["type"] == "reset" and stale[0][0] == feed.token(10)
+    assert foreign[0][1]["type"] == "reset"
+    assert feed.gaps == 2
+
+def test_slow_client_falls_behind_without_blocking_publishers():
+    async def scenario():
+        feed = make_feed(buffer_size=4)
+        feed.start()
+        subscription = feed.subscribe()
+        reader = asyncio.ensure_future(subscription.__anext__())
+        await asyncio.sleep(0.01)
+        feed._publish([{"type": "login_logs", "data": {"n": 0}}])
+        first = await reader
+        # The client stalls while far more entries arrive than the buffer holds
+        feed._publish([{"type": "login_logs", "data": {"n": n}} for n in range(1, 20)])
+        second = await subscription.__anext__()
+        third = await subscription.__anext__()
+        await subscription.aclose()
+        await feed.stop()
+        return feed, first, second, third
+
+    feed, first, second, third = asyncio.run(scenario())
+    assert first[1]["data"] == {"n": 0}
+    assert second[1]["type"] == "reset"
+    assert third[1]["data"] == {"n": 16}
+    assert feed.clients == 0
+
+def test_heartbeats_and_client_limit():
+    async def scenario():
+        feed = make_feed()
+        feed.max_clients = 1
+        feed.start()
+        subscription = feed.subscribe()
+        heartbeat = await subscription.__anext__()
+        assert feed.full
+        try:
+            await feed.subscribe().__anext__()
+            rejected = False
+        except RuntimeError:
+            rejected = True
+        await subscription.aclose()
+        await feed.stop()
+        return feed, heartbeat, rejected
+
+    feed, heartbeat, rejected = asyncio.run(scenario())
+    assert heartbeat == (None, None)
+    assert rejected and feed.rejected == 1
+
+def test_metrics_deltas_are_published_periodically():
+    async def scenario():
+        feed = make_feed()
+        feed.metrics_interval = 0.02
+        feed.start()
+        feed._publish([{"type": "login_logs", "data": {"status": "failed"}}])
+        items = await take(feed.subscribe(feed.token(0)), 2)
+        await feed.stop()
+        return items
+
+    items = asyncio.run(scenario())
+    assert items[1][1] == {"type": "metrics", "data": {"interval_seconds": 0.02, "deltas": {"logins.failed": 1}}}
+
+def test_websocket_closes_with_try_again_when_the_last_slot_is_taken(monkeypatch):
+    async def taken(resume_token=None, types=None):
+        # Another client subscribed between the endpoint's capacity check and this call
+        raise LiveFeedFull("Live feed is at its client limit")
+        yield
+
+    monkeypatch.setattr(live_feed, "subscribe", taken)
+    app = FastAPI()
+    app.include_router(security_monitor_api.router)
+    with TestClient(app).websocket_connect("/security-monitor/live/ws") as websocket:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_text()
+    assert closed.value.code == 1013
@@ -0,0 +1,71 @@
+from log_pipeline import LogPipeline, OVERFLOW_SPILL
+import os
+
+class RecordingWriter:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, collection, documents):
+        self.calls.append((collection, list(documents)))
+
+def test_batches_are_grouped_by_collection_and_drained_on_stop():
+    writer = RecordingWriter()
+    pipeline = LogPipeline(writer=writer)
+    pipeline.batch_size = 10
+    pipeline.flush_interval = 60
+
+    ids = [pipeline.enqueue("login_logs", {"n": i}) for i in range(3)]
+    pipeline.enqueue("access_logs", {"n": 99})
+    pipeline.stop()
+
+    written = {collection: docs for collection, docs in writer.calls}
+    assert [doc["n"] for doc in written["login_logs"]] == [0, 1, 2]
+    assert [str(doc["_id"]) for doc in written["login_logs"]] == ids
+    assert pipeline.stats()["flushed"] == 4
+    assert pipeline.stats()["queued"] == 0
+
+def test_drop_oldest_when_queue_is_full():
+    writer = RecordingWriter()
+    pipeline = LogPipeline(writer=writer)
+    pipeline.flush_interval = 60
+    pipeline.max_queue = 2
+
+    for i in range(4):
+        pipeline.enqueue("login_logs", {"n": i})
+    pipeline.stop()
+
+    assert [doc["n"] for doc in writer.calls[0][1]] == [2, 3]
+    assert pipeline.stats()["dropped"] == 2
+
+def test_spilled_documents_are_replayed_on_start(tmp_path):
+    writer = RecordingWriter()
+    pipeline = LogPipeline(writer=writer)
+    pipeline.spill_path = str(tmp_path / "spill.jsonl")
+    pipeline.overflow_policy = OVERFLOW_SPILL
+    pipeline.flush_interval = 60
+    pipeline.max_queue = 1
+
+    pipeline.enqueue("security_events", {"n": 1})
+    pipeline.enqueue("security_events", {"n": 2})
+    pipeline.stop()
+    assert pipeline.stats()["spilled"] == 1
+
+    pipeline.start()
+    pipeline.stop()
+
+    flushed = [doc["n"] for _, docs in writer.calls for doc in docs]
+    assert sorted(flushed) == [1, 2]
+    assert not os.path.exists(pipeline.spill_path)
+
+def test_listeners_see_written_batches_only():
+    seen = []
+    def failing_writer(collection, documents):
+        if collection == "access_logs":
+            raise RuntimeError("down")
+    pipeline = LogPipeline(writer=failing_writer)
+    pipeline.flush_interval = 0
+    pipeline.add_listener(lambda collection, documents: seen.append((collection, len(documents))))
+
+    pipeline._write([("login_logs", {"n": 1}), ("login_logs", {"n": 2}), ("access_logs", {"n": 3})])
+
+    assert seen == [("login_logs", 2)]
@@ -14,6 +14,14 @@ def test_health_check():
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
 
+def test_pool_stats_endpoint():
+    response = client.get("/db-admin/pool-stats")
+    assert response.status_code == 200
+    pool = response.json()["pool"]
+    assert pool["max_pool_size"] > 0
+    assert "checked_out" in pool
+    assert "connections_created" in pool
+
 def test_analyze_endpoint_normal_text():
     response = client.post(
         "/analyze",
@@ -0,0 +1,24 @@
+from model_manager import ModelManager, STATE_DISABLED, STATE_LOADING, STATE_WARMING
+
+def test_missing_model_leaves_service_ready_in_lexicon_mode(tmp_path):
+    manager = ModelManager(model_path=str(tmp_path / "missing"))
+    manager.start()
+
+    assert manager.state == STATE_DISABLED
+    assert manager.ready is True
+    assert manager.available is False
+    assert manager.error
+
+def test_not_ready_while_loading_or_warming():
+    manager = ModelManager(model_path="unused")
+    for state in (STATE_LOADING, STATE_WARMING):
+        manager.state = state
+        assert manager.ready is False
+        assert manager.available is False
+
+def test_positive_label_detection():
+    assert ModelManager._positive_index({0: "NOT_HATE", 1: "HATE"}) == 1
+    assert ModelManager._positive_index({0: "HATE", 1: "NON_HATE"}) == 0
+    assert ModelManager._positive_index({0: "non-toxic", 1: "toxic"}) == 1
+    assert ModelManager._positive_index({0: "neutral", 1: "toxic"}) == 1
+    assert ModelManager._positive_index({0: "LABEL_0", 1: "LABEL_1"}) == 1
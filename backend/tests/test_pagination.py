@@ -0,0 +1,99 @@
+from pagination import decode_cursor, encode_cursor, fetch_page, iter_batches, keyset_filter, stream_json_object, stream_ndjson
+from bson import ObjectId
+from datetime import datetime
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+import asyncio
+import json
+import pytest
+
+class ListRepository:
+    """Applies the keyset filter and sort in Python, like the server would."""
+    name = "login_logs"
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.projections = []
+
+    async def find(self, filter=None, projection=None, sort=None, limit=0, **kwargs):
+        self.projections.append(projection)
+        def after_cursor(doc):
+            clause = (filter or {}).get("$or")
+            if not clause:
+                return True
+            timestamp, last_id = clause[1]["timestamp"], clause[1]["_id"]["$lt"]
+            return doc["timestamp"] < timestamp or (doc["timestamp"] == timestamp and doc["_id"] < last_id)
+        matching = sorted((doc for doc in self.documents if after_cursor(doc)), key=lambda doc: (doc["timestamp"], doc["_id"]), reverse=True)
+        return matching[:limit]
+
+def test_cursor_round_trip_and_rejects_garbage():
+    doc = {"timestamp": datetime(2024, 5, 10, 12, 30, 1), "_id": ObjectId()}
+    assert decode_cursor(encode_cursor(doc)) == (doc["timestamp"], doc["_id"])
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+    assert error.value.status_code == 400
+
+def test_keyset_filter_keeps_existing_criteria():
+    doc = {"timestamp": datetime(2024, 5, 10), "_id": ObjectId()}
+    combined = keyset_filter({"status": "failed"}, encode_cursor(doc))
+    assert combined["$and"][0] == {"status": "failed"}
+    assert keyset_filter({"status": "failed"}) == {"status": "failed"}
+
+def test_pages_cover_ties_without_gaps_or_duplicates():
+    same_time = datetime(2024, 5, 10, 12)
+    repository = ListRepository([{"timestamp": same_time, "_id": ObjectId()} for _ in range(10)])
+
+    async def walk():
+        seen, cursor = [], None
+        while True:
+            documents, cursor = await fetch_page(repository, {}, 3, cursor)
+            seen.extend(doc["_id"] for doc in documents)
+            if cursor is None:
+                return seen
+
+    seen = asyncio.run(walk())
+    assert len(seen) == 10 and len(set(seen)) == 10
+
+def test_ndjson_stream_exports_every_row():
+    repository = ListRepository([{"timestamp": datetime(2024, 5, d), "_id": ObjectId()} for d in range(1, 8)])
+
+    async def collect():
+        return "".join([chunk async for chunk in stream_ndjson(repository, {}, lambda doc: {"id": str(doc["_id"])}, batch_size=2)])
+
+    lines = asyncio.run(collect()).splitlines()
+    assert len(lines) == 7
+    assert all("id" in json.loads(line) for line in lines)
+
+def test_ndjson_stream_stops_at_the_limit_and_projects():
+    repository = ListRepository([{"timestamp": datetime(2024, 5, d), "_id": ObjectId()} for d in range(1, 8)])
+    projection = {"timestamp": 1}
+
+    async def collect():
+        return "".join([chunk async for chunk in stream_ndjson(repository, {}, lambda doc: {"id": str(doc["_id"])}, batch_size=2, limit=3, projection=projection)])
+
+    assert len(asyncio.run(collect()).splitlines()) == 3
+    assert repository.projections == [projection, projection]
+
+def test_malformed_cursor_is_a_400_before_the_ndjson_stream_starts():
+    repository = ListRepository([{"timestamp": datetime(2024, 5, 1), "_id": ObjectId()}])
+    app = FastAPI()
+
+    @app.get("/export")
+    def export(cursor: str = None):
+        return StreamingResponse(stream_ndjson(repository, {}, lambda doc: {"id": str(doc["_id"])}, cursor), media_type="application/x-ndjson")
+
+    client = TestClient(app)
+    assert client.get("/export", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert len(client.get("/export").text.splitlines()) == 1
+
+def test_json_object_stream_is_valid_and_bounded():
+    repository = ListRepository([{"timestamp": datetime(2024, 5, d), "_id": ObjectId()} for d in range(1, 8)])
+    logs = iter_batches(repository, {}, lambda doc: {"day": doc["timestamp"].day}, limit=5, batch_size=2)
+
+    async def collect():
+        return "".join([chunk async for chunk in stream_json_object([("message", "Logs retrieved", None), ("logs", logs, "count")])])
+
+    body = json.loads(asyncio.run(collect()))
+    assert body["count"] == 5
+    assert [row["day"] for row in body["logs"]] == [7, 6, 5, 4, 3]
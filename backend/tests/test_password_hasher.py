@@ -0,0 +1,34 @@
+from fastapi import HTTPException
+from password_hasher import PasswordHasher
+import asyncio
+import pytest
+import time
+
+def test_hash_and_check_round_trip():
+    hasher = PasswordHasher()
+
+    async def scenario():
+        hashed = await hasher.hash("Str0ng!pass")
+        return await hasher.check("Str0ng!pass", hashed), await hasher.check("wrong", hashed)
+
+    assert asyncio.run(scenario()) == (True, False)
+    assert hasher.stats()["completed"] == 3
+    hasher.shutdown()
+
+def test_rejects_with_503_when_saturated():
+    hasher = PasswordHasher()
+    hasher.workers = 1
+    hasher.max_pending = 1
+
+    async def scenario():
+        slow = asyncio.ensure_future(hasher._submit(time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as excinfo:
+            await hasher._submit(time.sleep, 0)
+        await slow
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert hasher.stats()["rejected"] == 1
+    hasher.shutdown()
@@ -0,0 +1,40 @@
+from pymongo.errors import DuplicateKeyError
+from repositories import PhoneVerificationRepository
+from datetime import datetime
+import asyncio
+
+class Result:
+    def __init__(self, upserted_id):
+        self.upserted_id = upserted_id
+
+class FakeVerifications(PhoneVerificationRepository):
+    def __init__(self, race=False):
+        super().__init__()
+        self.race = race
+        self.calls = []
+
+    async def update_one(self, filter, update, upsert=False):
+        self.calls.append((filter, update, upsert))
+        if self.race and len(self.calls) == 1:
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return Result(None if self.race else "new-id")
+
+def test_verification_is_one_upsert_with_created_at_on_insert():
+    repo = FakeVerifications()
+    now = datetime(2024, 5, 10, 9)
+    is_new = asyncio.run(repo.record_verification("+919876543210", {"firebase_uid": "uid-1", "verified_at": now}, now))
+
+    assert is_new is True
+    assert repo.calls == [(
+        {"phone_number": "+919876543210"},
+        {"$set": {"firebase_uid": "uid-1", "verified_at": now}, "$setOnInsert": {"created_at": now}},
+        True,
+    )]
+
+def test_losing_a_concurrent_insert_retries_as_an_update():
+    repo = FakeVerifications(race=True)
+    now = datetime(2024, 5, 10, 9)
+    is_new = asyncio.run(repo.record_verification("+919876543210", {"verified_at": now}, now))
+
+    assert is_new is False
+    assert len(repo.calls) == 2
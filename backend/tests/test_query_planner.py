@@ -0,0 +1,52 @@
+from query_planner import FacetPlan
+from security_dashboard import threats_analysis_plan
+from datetime import datetime
+import asyncio
+
+class FakeCollection:
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def aggregate(self, pipeline, **kwargs):
+        self.calls.append((self.name, pipeline))
+        if self.name == "empty":
+            return iter([])
+        return iter([{name: [{"collection": self.name}] for name in pipeline[-1]["$facet"]}])
+
+class FakeDb:
+    def __init__(self):
+        self.calls = []
+
+    def __getitem__(self, name):
+        return FakeCollection(name, self.calls)
+
+def test_filters_are_hoisted_in_front_of_the_facet():
+    plan = FacetPlan()
+    plan.add("login_logs", "a", [{"$count": "n"}], match={"status": "failed"})
+    plan.add("login_logs", "b", [{"$count": "n"}], match={"status": "success"})
+    plan.add("users", "only", [{"$count": "n"}], match={"email": "x"})
+    plan.add("security_events", "all", [{"$count": "n"}])
+    plan.add("security_events", "high", [{"$count": "n"}], match={"severity": "high"})
+
+    logins = plan.pipeline("login_logs")
+    assert logins[0] == {"$match": {"$or": [{"status": "failed"}, {"status": "success"}]}}
+    assert logins[1]["$facet"]["a"] == [{"$match": {"status": "failed"}}, {"$count": "n"}]
+    assert plan.pipeline("users") == [{"$match": {"email": "x"}}, {"$facet": {"only": [{"$count": "n"}]}}]
+    # One facet reads the whole collection, so nothing can be hoisted
+    events = plan.pipeline("security_events")
+    assert len(events) == 1 and events[0]["$facet"]["high"][0] == {"$match": {"severity": "high"}}
+
+def test_one_round_trip_per_collection():
+    plan = threats_analysis_plan(now=datetime(2024, 5, 10, 12))
+    plan.add("empty", "nothing", [{"$count": "n"}])
+    db = FakeDb()
+
+    results = plan.execute(db)
+    assert sorted(name for name, _ in db.calls) == ["empty", "login_logs", "security_events"]
+    assert results["login_logs"]["password_guessing"] == [{"collection": "login_logs"}]
+    assert results["empty"] == {"nothing": []}
+
+    db.calls.clear()
+    assert asyncio.run(plan.run(db)) == results
+    assert len(db.calls) == plan.round_trips == 3
@@ -0,0 +1,77 @@
+from rate_limiter import InMemoryCounterBackend, LoginRateLimiter
+import asyncio
+
+def test_sliding_window_drops_old_buckets():
+    backend = InMemoryCounterBackend(bucket_seconds=60, retention_seconds=600)
+    backend.add("email:a@gmail.com", 1000)
+    backend.add("email:a@gmail.com", 1300)
+    backend.add("email:a@gmail.com", 1310)
+
+    assert backend.count("email:a@gmail.com", 600, 1320) == 3
+    assert backend.count("email:a@gmail.com", 120, 1320) == 2
+    assert backend.count("email:b@gmail.com", 600, 1320) == 0
+
+def test_key_limit_evicts_least_recently_used():
+    backend = InMemoryCounterBackend(max_keys=2)
+    backend.add("ip:1", 0)
+    backend.add("ip:2", 0)
+    backend.add("ip:1", 0)
+    backend.add("ip:3", 0)
+
+    assert backend.key_count() == 2
+    assert backend.count("ip:2", 60, 0) == 0
+    assert backend.count("ip:1", 60, 0) == 2
+
+def test_failures_trigger_lockout():
+    limiter = LoginRateLimiter(backend=InMemoryCounterBackend())
+    limiter.email_lockout_threshold = 3
+
+    async def scenario():
+        results = []
+        for _ in range(3):
+            results.append(await limiter.record_failure("a@gmail.com", "10.0.0.1", "incorrect_password"))
+        return results, await limiter.lockout_remaining("a@gmail.com", "10.0.0.1"), await limiter.lockout_remaining("b@gmail.com")
+
+    results, locked, other = asyncio.run(scenario())
+    assert results[-1] == {"email_failures": 3, "password_failures": 3}
+    assert 0 < locked <= limiter.lockout_window_seconds
+    assert other == 0
+
+def test_lockout_lifts_when_the_oldest_counted_failure_expires():
+    limiter = LoginRateLimiter(backend=InMemoryCounterBackend(bucket_seconds=60))
+    limiter.lockout_window_seconds, limiter.email_lockout_threshold = 900, 3
+
+    async def scenario():
+        for now in (6000, 6300, 6600, 6660):
+            await limiter.record_failure("a@gmail.com", None, "incorrect_password", now=now)
+        # Four failures against a threshold of three: the lock lifts once the second oldest leaves the window
+        return [await limiter.lockout_remaining("a@gmail.com", now=now) for now in (6700, 7199, 7200)]
+
+    assert asyncio.run(scenario()) == [500, 1, 0]
+
+def test_pair_locks_before_the_account_and_success_resets():
+    limiter = LoginRateLimiter(backend=InMemoryCounterBackend())
+    limiter.pair_lockout_threshold, limiter.email_lockout_threshold = 2, 10
+
+    async def scenario():
+        for _ in range(2):
+            await limiter.record_failure("a@gmail.com", "10.0.0.1", "incorrect_password", now=1000)
+        attacker = await limiter.lockout_remaining("a@gmail.com", "10.0.0.1", now=1010)
+        owner = await limiter.lockout_remaining("a@gmail.com", "10.0.0.2", now=1010)
+        await limiter.reset("a@gmail.com", "10.0.0.1")
+        return attacker, owner, await limiter.lockout_remaining("a@gmail.com", "10.0.0.1", now=1010)
+
+    attacker, owner, after_success = asyncio.run(scenario())
+    assert attacker > 0 and owner == 0 and after_success == 0
+
+def test_successful_login_does_not_lift_an_ip_lockout():
+    limiter = LoginRateLimiter(backend=InMemoryCounterBackend())
+    limiter.ip_lockout_threshold = 3
+
+    async def scenario():
+        for n in range(3):
+            await limiter.record_failure(f"victim{n}@gmail.com", "10.0.0.1", "incorrect_password", now=1000)
+        await limiter.reset("attacker@gmail.com", "10.0.0.1")
+        return await limiter.lockout_remaining("victim3@gmail.com", "10.0.0.1", now=1010)
+
+    assert asyncio.run(scenario()) > 0
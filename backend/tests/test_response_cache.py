@@ -0,0 +1,77 @@
+from response_cache import InMemoryCacheBackend, ResponseCache
+import asyncio
+
+def test_lru_backend_expires_and_evicts():
+    backend = InMemoryCacheBackend(max_entries=2)
+    backend.set("a", {"value": 1, "expires_at": 10})
+    backend.set("b", {"value": 2, "expires_at": 100})
+    backend.get("a", 5)
+    backend.set("c", {"value": 3, "expires_at": 100})
+
+    assert backend.get("b", 5) is None
+    assert backend.get("a", 11) is None
+    assert backend.get("c", 5)["value"] == 3
+
+def test_concurrent_misses_share_one_computation():
+    cache = ResponseCache(backend=InMemoryCacheBackend())
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"threats": len(calls)}
+
+    async def scenario():
+        entries = await asyncio.gather(*[cache.get_or_compute("/summary?", compute, ttl=30) for _ in range(20)])
+        again = await cache.get_or_compute("/summary?", compute, ttl=30)
+        return entries, again
+
+    entries, again = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {entry["etag"] for entry in entries} == {again["etag"]}
+    assert again["value"] == {"threats": 1}
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 19, 1)
+
+def test_failed_computation_is_not_cached():
+    cache = ResponseCache(backend=InMemoryCacheBackend())
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("mongo unavailable")
+        return {"ok": True}
+
+    async def scenario():
+        try:
+            await cache.get_or_compute("k", compute)
+        except RuntimeError:
+            pass
+        return await cache.get_or_compute("k", compute)
+
+    assert asyncio.run(scenario())["value"] == {"ok": True}
+    assert len(attempts) == 2
+
+def test_cancelled_leader_does_not_cancel_the_shared_computation():
+    cache = ResponseCache(backend=InMemoryCacheBackend())
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"threats": 3}
+
+    async def scenario():
+        leader = asyncio.ensure_future(cache.get_or_compute("/summary?", compute, ttl=30))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_compute("/summary?", compute, ttl=30))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        entry = await waiter
+        return leader.cancelled(), entry, await cache.get_or_compute("/summary?", compute, ttl=30)
+
+    leader_cancelled, entry, again = asyncio.run(scenario())
+    assert leader_cancelled and entry["value"] == {"threats": 3}
+    assert len(calls) == 1 and again["etag"] == entry["etag"]
+    assert cache.stats()["hits"] == 1
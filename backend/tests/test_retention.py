@@ -0,0 +1,48 @@
+from retention import RetentionPolicy, TTL_GRACE_DAYS, apply_policy, ttl_seconds
+from datetime import datetime, timedelta
+
+class RecordingCollection:
+    def __init__(self, docs=None):
+        self.docs = docs or []
+        self.pipelines = []
+        self.deleted_before = None
+
+    def find_one(self, filter, projection=None, sort=None):
+        return min(self.docs, key=lambda doc: doc["timestamp"]) if self.docs else None
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return []
+
+    def update_one(self, filter, update, upsert=False):
+        self.docs.append({**filter, **update["$set"]})
+
+    def delete_many(self, filter):
+        self.deleted_before = filter["timestamp"]["$lt"]
+        return type("Result", (), {"deleted_count": 0})()
+
+class RecordingDatabase(dict):
+    def __missing__(self, name):
+        self[name] = RecordingCollection()
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+def test_ttl_backstop_outlives_retention():
+    assert ttl_seconds("login_logs") == (90 + TTL_GRACE_DAYS) * 86400
+
+def test_rollup_runs_before_delete_and_only_up_to_watermark():
+    now = datetime(2024, 5, 10, 12, 30)
+    policy = RetentionPolicy("login_logs", 1, ["status"])
+    db = RecordingDatabase()
+    db["login_logs"] = RecordingCollection([{"timestamp": now - timedelta(days=2, minutes=10)}])
+
+    result = apply_policy(db, policy, now=now)
+
+    assert result["rolled_up_hours"] == 48
+    assert len(db["login_logs"].pipelines) == 2
+    assert db["retention_state"].docs[-1]["rolled_up_until"] == datetime(2024, 5, 10, 12)
+    assert db["login_logs"].deleted_before == now - timedelta(days=1)
+    daily_group = db["login_logs_hourly"].pipelines[0][1]["$group"]
+    assert daily_group["count"] == {"$sum": "$count"}
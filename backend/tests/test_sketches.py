@@ -0,0 +1,79 @@
+from sketches import CountMinSketch, HeavyHitters, HyperLogLog
+from collections import Counter
+import random
+
+def test_small_sets_are_counted_exactly():
+    sketch = HyperLogLog(10)
+    for value in ["a@gmail.com", "b@gmail.com", "a@gmail.com", "c@gmail.com"]:
+        sketch.add(value)
+    assert sketch.count() == 3 and sketch.registers is None
+
+def test_estimate_error_stays_within_a_few_percent():
+    for cardinality in (1000, 50000):
+        sketch = HyperLogLog(10)
+        for n in range(cardinality):
+            sketch.add(f"user{n}@gmail.com")
+        assert abs(sketch.count() - cardinality) / cardinality < 0.08
+        assert sketch.size_bytes() == 1024
+
+def test_merge_is_a_union_across_buckets_and_workers():
+    monday, tuesday, exact = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+    for n in range(3000):
+        monday.add(f"10.0.{n // 256}.{n % 256}")
+        exact.add(f"10.0.{n // 256}.{n % 256}")
+    for n in range(2000, 6000):
+        tuesday.add(f"10.0.{n // 256}.{n % 256}")
+        exact.add(f"10.0.{n // 256}.{n % 256}")
+    # A worker's sketch round-trips through bytes before it is merged elsewhere
+    merged = HyperLogLog.union([monday, HyperLogLog.from_bytes(tuesday.to_bytes())], p=10)
+    assert merged.registers == exact.registers
+    assert abs(merged.count() - 6000) / 6000 < 0.08
+
+def test_sparse_sketch_round_trips_and_merges_into_dense():
+    sparse = HyperLogLog(10)
+    sparse.add("1.2.3.4")
+    restored = HyperLogLog.from_bytes(sparse.to_bytes())
+    assert restored.hashes == sparse.hashes
+
+    dense = HyperLogLog(10)
+    for n in range(500):
+        dense.add(str(n))
+    before = dense.count()
+    dense.merge(restored)
+    assert dense.count() >= before
+
+def synthetic_failures(count, keys, seed=11):
+    # Zipf-like attack traffic: a few keys take most of the failures, a long tail takes the rest
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) ** 1.1 for rank in range(keys)]
+    return rng.choices([f"10.{rank // 256}.{rank % 256}.1" for rank in range(keys)], weights, k=count)
+
+def test_count_min_estimates_bracket_the_exact_counts():
+    stream = synthetic_failures(50000, 5000)
+    exact = Counter(stream)
+    sketch = CountMinSketch(2048, 4)
+    for value in stream:
+        sketch.add(value)
+    # e / width of the stream is the documented bound; allow it for every key checked
+    bound = 2.72 / 2048 * len(stream)
+    for value, count in exact.most_common(200):
+        assert count <= sketch.estimate(value) <= count + bound
+
+def test_heavy_hitters_match_exact_aggregation_on_synthetic_data():
+    stream = synthetic_failures(50000, 5000)
+    # The exact answer is what the $group + $sort over the week returned
+    exact = [value for value, _ in Counter(stream).most_common(10)]
+
+    single = HeavyHitters(k=20)
+    workers = [HeavyHitters(k=20) for _ in range(3)]
+    for index, value in enumerate(stream):
+        single.add(value)
+        workers[index % 3].add(value)
+    merged = HeavyHitters.union(workers, k=20)
+
+    for hitters in (single, merged):
+        top = [value for value, _ in hitters.most_common(10)]
+        assert top[:3] == exact[:3]
+        assert len(set(top) & set(exact)) >= 9
+    restored = HeavyHitters.from_document(merged.to_document())
+    assert restored.most_common(3) == merged.most_common(3)
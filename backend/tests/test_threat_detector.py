@@ -0,0 +1,142 @@
+from threat_detector import ThreatDetector, WindowCounter, _epoch
+from datetime import datetime, timedelta
+
+NOW = datetime(2024, 5, 10, 12, 0)
+
+class FakeCursor(list):
+    def sort(self, field, direction):
+        return FakeCursor(sorted(self, key=lambda doc: doc[field], reverse=direction < 0))
+
+    def batch_size(self, size):
+        return self
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = {doc.get("_id", index): doc for index, doc in enumerate(docs or [])}
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            if hasattr(operation, "_doc"):
+                self.docs[operation._filter["_id"]] = dict(operation._doc)
+            else:
+                self.docs.pop(operation._filter["_id"], None)
+
+    def find_one(self, filter):
+        return self.docs.get(filter["_id"])
+
+    def find(self, filter, projection=None):
+        if "timestamp" in filter:
+            low, high = filter["timestamp"]["$gt"], filter["timestamp"]["$lte"]
+            return FakeCursor(doc for doc in self.docs.values() if doc["status"] == "failed" and low < doc["timestamp"] <= high)
+        return FakeCursor(doc for doc_id, doc in self.docs.items() if doc_id != filter["_id"]["$ne"])
+
+class FakeDb(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+def failed(email, ip, minutes_ago, reason="incorrect_password"):
+    return {"email": email, "ip_address": ip, "status": "failed", "reason": reason, "timestamp": NOW - timedelta(minutes=minutes_ago)}
+
+def make_detector():
+    detector = ThreatDetector()
+    emitted = []
+    detector.emit = emitted.append
+    return detector, emitted
+
+def test_window_counter_expires_old_buckets_and_merges_late_events():
+    counter = WindowCounter()
+    for bucket in (1, 1, 3, 2, 5):
+        counter.add(bucket)
+    assert [bucket for bucket, _ in counter.buckets] == [1, 2, 3, 5]
+    assert counter.expire(3) == 2
+    assert counter.total == 2
+
+def test_alert_fires_once_per_threshold_crossing():
+    detector, emitted = make_detector()
+    detector.observe([failed("a@gmail.com", "10.0.0.1", 10 - n) for n in range(3)])
+    detector.observe([failed("a@gmail.com", "10.0.0.1", 5)])
+    detector.observe([failed("b@gmail.com", "10.0.0.1", 4, reason="user_not_found")])
+
+    kinds = sorted((event["event_type"], event["severity"]) for event in emitted)
+    # Three incorrect passwords flag the email in both windows but raise one event; the IP reaches five failures on the last row
+    assert kinds == [("brute_force", "high"), ("password_guessing", "high")]
+    assert emitted[0]["details"]["source"] == "threat_detector"
+
+    detector.observe([failed("a@gmail.com", "10.0.0.1", 1)])
+    assert len(emitted) == 2
+
+    rows = detector.flagged("email", "active", now=_epoch(NOW))
+    assert rows[0]["key"] == "a@gmail.com" and rows[0]["count"] == 5
+    assert [row["key"] for row in detector.flagged("ip", "active", now=_epoch(NOW))] == ["10.0.0.1"]
+
+def test_slow_crossing_alerts_once_at_the_week_severity():
+    detector, emitted = make_detector()
+    detector.observe([failed("a@gmail.com", None, 60 * 24 * day) for day in (3, 2, 1)])
+    detector.observe([failed("a@gmail.com", None, 0)])
+    assert [(event["event_type"], event["severity"]) for event in emitted] == [("password_guessing", "medium")]
+    assert emitted[0]["details"]["time_window_seconds"] == 7 * 86400
+
+def test_burst_after_a_slow_crossing_escalates_to_high():
+    detector, emitted = make_detector()
+    detector.observe([failed("a@gmail.com", None, 60 * 24 * day) for day in (3, 2, 1)])
+    detector.observe([failed("a@gmail.com", None, 3 - n) for n in range(3)])
+    assert [event["severity"] for event in emitted] == ["medium", "high"]
+    assert emitted[1]["details"]["failed_attempts"] == 3
+
+def test_active_view_drops_keys_once_the_window_passes():
+    detector, _ = make_detector()
+    detector.observe([failed("a@gmail.com", None, 50 - n) for n in range(3)])
+    assert detector.flagged("email", "active", now=_epoch(NOW))
+    later = _epoch(NOW + timedelta(minutes=30))
+    assert detector.flagged("email", "active", now=later) == []
+    # The week window still holds the same failures
+    assert detector.flagged("email", "week", now=later)[0]["count"] == 3
+
+def test_key_count_stays_bounded():
+    detector, _ = make_detector()
+    detector.max_keys = 10
+    detector.observe([failed(f"user{n}@gmail.com", f"10.0.0.{n}", 1) for n in range(50)])
+    assert len(detector._state["email"]) == 10 and len(detector._state["ip"]) == 10
+    assert detector.evicted == 80
+
+def test_checkpoint_restore_replays_only_the_gap():
+    db = FakeDb()
+    detector, _ = make_detector()
+    detector.observe([failed("a@gmail.com", "10.0.0.1", 20 - n) for n in range(2)])
+    detector.checkpoint(db, now=_epoch(NOW))
+    assert db.threat_detector_state.docs["_meta"]["last_event_at"] == _epoch(NOW - timedelta(minutes=19))
+
+    # Rows before the checkpoint are already in the state and must not be counted twice
+    db["login_logs"] = FakeCollection([failed("a@gmail.com", "10.0.0.1", 20 - n) for n in range(2)] + [failed("a@gmail.com", "10.0.0.2", 5)])
+    restored, emitted = make_detector()
+    restored.restore(until=NOW, db=db)
+
+    assert restored.ready and restored.replayed == 1 and emitted == []
+    assert restored.flagged("email", "active", now=_epoch(NOW))[0]["count"] == 3
+
+    # Live rows covered by the replay are skipped; later ones are counted
+    restored._catchup_until = NOW
+    restored.on_batch("login_logs", [failed("a@gmail.com", "10.0.0.2", 5), dict(failed("a@gmail.com", "10.0.0.2", 0), timestamp=NOW + timedelta(seconds=1))])
+    assert restored.flagged("email", "active", now=_epoch(NOW))[0]["count"] == 4
+
+def test_distinct_values_are_estimated_per_key_and_checkpointed():
+    detector, _ = make_detector()
+    detector.observe([failed(f"user{n}@gmail.com", "10.0.0.9", 30, reason="user_not_found") for n in range(2000)])
+    detector.observe([failed("a@gmail.com", f"10.1.0.{n}", 10 - n) for n in range(4)])
+
+    ip_row = detector.flagged("ip", "week", now=_epoch(NOW), distinct=True)[0]
+    # Per-key sketches trade accuracy for memory: about 9% standard error in 128 bytes
+    assert ip_row["count"] == 2000 and abs(ip_row["unique"] - 2000) / 2000 < 0.2
+    assert [sketch.size_bytes() for sketch in detector._state["ip"]["10.0.0.9"].distinct.values()] == [128]
+    assert ip_row["samples"] == [f"user{n}@gmail.com" for n in range(5)]
+    assert detector.flagged("email", "week", now=_epoch(NOW), distinct=True)[0]["unique"] == 4
+
+    db = FakeDb()
+    detector.checkpoint(db, now=_epoch(NOW))
+    restored, _ = make_detector()
+    restored.load(db, now=_epoch(NOW))
+    assert restored.flagged("ip", "week", now=_epoch(NOW), distinct=True)[0]["unique"] == ip_row["unique"]
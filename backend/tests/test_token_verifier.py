@@ -0,0 +1,67 @@
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from datetime import datetime, timedelta
+from firebase_admin import auth
+from google.auth import crypt, jwt as google_jwt
+from token_verifier import TokenVerifier
+import json
+import pytest
+import time
+
+PROJECT = "cybershield-test"
+
+def _key_pair():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken")])
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(1).not_valid_before(datetime.utcnow() - timedelta(days=1))
+            .not_valid_after(datetime.utcnow() + timedelta(days=1)).sign(key, hashes.SHA256()))
+    private_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    return private_pem.decode(), cert.public_bytes(serialization.Encoding.PEM).decode()
+
+PRIVATE_PEM, CERT_PEM = _key_pair()
+
+def _token(kid="key-1", **overrides):
+    now = int(time.time())
+    claims = {"iss": f"https://securetoken.google.com/{PROJECT}", "aud": PROJECT, "sub": "uid-1",
+              "iat": now, "auth_time": now, "exp": now + 3600, "phone_number": "+919876543210"}
+    claims.update(overrides)
+    signer = crypt.RSASigner.from_string(PRIVATE_PEM, key_id=kid)
+    return google_jwt.encode(signer, claims).decode()
+
+@pytest.fixture
+def verifier(tmp_path):
+    keys_file = tmp_path / "keys.json"
+    keys_file.write_text(json.dumps({"key-1": CERT_PEM}))
+    return TokenVerifier(project_id=PROJECT, keys_file=str(keys_file))
+
+def test_valid_token_is_verified_once_then_cached(verifier):
+    token = _token()
+    claims = verifier.verify_sync(token)
+    again = verifier.verify_sync(token)
+
+    assert claims["uid"] == "uid-1" and again["phone_number"] == "+919876543210"
+    stats = verifier.stats()
+    assert (stats["misses"], stats["hits"], stats["key_fetches"]) == (1, 1, 1)
+
+def test_expired_and_foreign_tokens_are_rejected(verifier):
+    with pytest.raises(auth.ExpiredIdTokenError):
+        verifier.verify_sync(_token(exp=int(time.time()) - 120))
+    with pytest.raises(auth.InvalidIdTokenError):
+        verifier.verify_sync(_token(aud="another-project"))
+    assert verifier.stats()["key_fetches"] == 0
+
+def test_tampered_token_fails_signature_check(verifier):
+    header, payload, signature = _token().split(".")
+    forged = _token(sub="someone-else").split(".")[1]
+    with pytest.raises(auth.InvalidIdTokenError):
+        verifier.verify_sync(".".join([header, forged, signature[::-1]]))
+    assert verifier.stats()["cached_tokens"] == 0
+
+def test_unknown_key_ids_do_not_refetch_every_time(verifier):
+    for _ in range(3):
+        with pytest.raises(auth.InvalidIdTokenError):
+            verifier.verify_sync(_token(kid="rotated-key"))
+    assert verifier.stats()["key_fetches"] == 1
@@ -0,0 +1,48 @@
+from fastapi import HTTPException
+from validators import (
+    ALLOWED_EMAIL_DOMAINS, check_email, evaluate_password_strength, is_valid_indian_phone,
+    validate_emails, validate_password, validate_phones,
+)
+import random
+import re
+import pytest
+
+def _regex_strength(password):
+    strength = 1 if len(password) >= 8 else 0
+    if re.search(r"[a-z]", password) and re.search(r"[A-Z]", password):
+        strength += 1
+    if re.search(r"[0-9]", password):
+        strength += 1
+    if re.search(r"[^a-zA-Z0-9]", password):
+        strength += 1
+    return strength
+
+def test_single_pass_strength_matches_regex_scoring():
+    rng = random.Random(3)
+    alphabet = "aZ9!é "
+    passwords = ["", "password", "Password1", "Passw0rd!", "ÄÖÜäöü12"]
+    passwords += ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(500)]
+    for password in passwords:
+        assert evaluate_password_strength(password) == _regex_strength(password), password
+
+def test_email_domain_allowlist():
+    assert check_email(" User@Gmail.com ", ALLOWED_EMAIL_DOMAINS) is None
+    assert check_email("user@example.com", ALLOWED_EMAIL_DOMAINS).startswith("Invalid email domain")
+    assert check_email("not-an-email", ALLOWED_EMAIL_DOMAINS) == "Invalid email format"
+    assert check_email("user@example.com") is None
+
+def test_validate_password_raises_with_reason():
+    assert validate_password("Str0ng!pass")
+    with pytest.raises(HTTPException) as error:
+        validate_password("short")
+    assert error.value.detail == "Password must be at least 8 characters"
+
+def test_batch_apis_report_each_input_in_order():
+    emails = validate_emails(["a@gmail.com", "b@example.com", "", "C@YAHOO.COM"])
+    assert [result["valid"] for result in emails] == [True, False, False, True]
+    assert emails[3]["value"] == "c@yahoo.com"
+
+    phones = validate_phones(["+919876543210", " +919876543210 ", "+915876543210", "+14155550100"])
+    assert [result["valid"] for result in phones] == [True, True, False, False]
+    assert validate_phones(["+14155550100"], indian_format=False)[0]["valid"]
+    assert is_valid_indian_phone("+919876543210") and not is_valid_indian_phone("919876543210")
@@ -0,0 +1,489 @@
+"""
+Threat detector module for CyberShield-AI.
+Tracks failed logins per IP and per email in sliding windows as they are written and raises security events on threshold crossings.
+
+Usage:
+    python threat_detector.py checkpoint
+    python threat_detector.py show
+"""
+
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from pymongo import DeleteOne, ReplaceOne
+from database import mongo
+from log_pipeline import log_pipeline
+from repositories import run_db
+from sketches import HyperLogLog
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger("threat_detector")
+
+META_ID = "_meta"
+# Distinct values per key are sketched per day and merged over the days a window covers
+DISTINCT_BUCKET_SECONDS = 86400
+# Per-key sketches stay small (128 bytes dense at p=7, about 9% error); there can be one per key and day
+DISTINCT_PRECISION = int(os.environ.get("THREAT_DISTINCT_PRECISION", "7"))
+SAMPLE_SIZE = 5
+
+
+def _epoch(timestamp):
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def _utc(epoch):
+    return datetime.utcfromtimestamp(epoch)
+
+
+class ThreatWindow:
+    """A trailing window, counted in fixed-width buckets so expiry is O(1) amortized."""
+
+    def __init__(self, name, seconds, bucket_seconds, severity):
+        self.name = name
+        self.seconds = int(os.environ.get(f"THREAT_{name.upper()}_WINDOW_SECONDS", str(seconds)))
+        self.bucket_seconds = bucket_seconds
+        self.severity = severity
+
+    def bucket(self, epoch):
+        return int(epoch // self.bucket_seconds)
+
+    def oldest_bucket(self, epoch):
+        return self.bucket(epoch - self.seconds) + 1
+
+
+class ThreatRule:
+    """Failed logins grouped by one document field, flagged once a window holds threshold of them."""
+
+    def __init__(self, name, key_field, threshold, event_type, condition, distinct_field):
+        self.name = name
+        self.key_field = key_field
+        # Field whose distinct values per key are estimated, e.g. emails tried from one IP
+        self.distinct_field = distinct_field
+        self.threshold = int(os.environ.get(f"THREAT_{name.upper()}_THRESHOLD", str(threshold)))
+        self.event_type = event_type
+        self.condition = condition
+
+    def key(self, document):
+        if document.get("status") != "failed" or not self.condition(document):
+            return None
+        return document.get(self.key_field) or None
+
+
+# "active" backs /security-monitor/active-threats, "week" the thresholds of /security-dashboard/threats-analysis
+THREAT_WINDOWS = (
+    ThreatWindow("active", 3600, 60, "high"),
+    ThreatWindow("week", 7 * 86400, 3600, "medium"),
+)
+
+THREAT_RULES = (
+    ThreatRule("ip", "ip_address", 5, "brute_force", lambda document: True, "email"),
+    ThreatRule("email", "email", 3, "password_guessing", lambda document: document.get("reason") == "incorrect_password", "ip_address"),
+)
+
+
+class WindowCounter:
+    """Count of one key's events per bucket; buckets stay sorted, late events are merged in place."""
+
+    __slots__ = ("buckets", "total")
+
+    def __init__(self, buckets=()):
+        self.buckets = deque([bucket, count] for bucket, count in buckets)
+        self.total = sum(count for _, count in self.buckets)
+
+    def add(self, bucket):
+        self.total += 1
+        if not self.buckets or self.buckets[-1][0] < bucket:
+            self.buckets.append([bucket, 1])
+            return
+        for index in range(len(self.buckets) - 1, -1, -1):
+            if self.buckets[index][0] == bucket:
+                self.buckets[index][1] += 1
+                return
+            if self.buckets[index][0] < bucket:
+                self.buckets.insert(index + 1, [bucket, 1])
+                return
+        self.buckets.appendleft([bucket, 1])
+
+    def expire(self, oldest_bucket):
+        while self.buckets and self.buckets[0][0] < oldest_bucket:
+            self.total -= self.buckets.popleft()[1]
+        return self.total
+
+
+class KeyState:
+    __slots__ = ("counters", "alerted", "last_attempt", "distinct", "samples")
+
+    def __init__(self, counters, alerted, last_attempt=0.0, distinct=None, samples=None):
+        self.counters = counters
+        self.alerted = alerted
+        self.last_attempt = last_attempt
+        # day bucket -> HyperLogLog of the rule's distinct field
+        self.distinct = distinct if distinct is not None else {}
+        self.samples = samples if samples is not None else []
+
+    def add_distinct(self, value, epoch, oldest_day):
+        day = int(epoch // DISTINCT_BUCKET_SECONDS)
+        if day < oldest_day:
+            return
+        sketch = self.distinct.get(day)
+        if sketch is None:
+            sketch = self.distinct[day] = HyperLogLog(DISTINCT_PRECISION)
+            for stale in [bucket for bucket in self.distinct if bucket < oldest_day]:
+                del self.distinct[stale]
+        sketch.add(value)
+        if len(self.samples) < SAMPLE_SIZE and value not in self.samples:
+            self.samples.append(value)
+
+    def distinct_count(self, oldest_day):
+        sketches = [sketch for day, sketch in self.distinct.items() if day >= oldest_day]
+        if len(sketches) == 1:
+            return sketches[0].count()
+        return HyperLogLog.union(sketches, p=DISTINCT_PRECISION).count()
+
+
+class ThreatDetector:
+    """Per-IP and per-email sliding-window failure counts, fed by the log pipeline and checkpointed to MongoDB."""
+
+    def __init__(self, collection="threat_detector_state", rules=THREAT_RULES, windows=THREAT_WINDOWS):
+        self.collection_name = collection
+        self.rules = {rule.name: rule for rule in rules}
+        self.windows = windows
+        self.max_keys = int(os.environ.get("THREAT_MAX_KEYS_PER_RULE", "100000"))
+        self.longest_window = max(window.seconds for window in windows)
+        self.checkpoint_interval = float(os.environ.get("THREAT_CHECKPOINT_SECONDS", "30"))
+        self.emit = lambda event: log_pipeline.enqueue("security_events", event)
+        # Keys in least-recently-seen order so idle keys are pruned from the front
+        self._state = {name: OrderedDict() for name in self.rules}
+        # Keys at or over the threshold per (rule, window): the active-threats view only looks at these
+        self._flagged = {(name, window.name): set() for name in self.rules for window in windows}
+        self._dirty = set()
+        self._removed = set()
+        self._lock = threading.Lock()
+        self._task = None
+        self._catchup_until = None
+        self.last_event_at = 0.0
+        self.ready = False
+        self.events = 0
+        self.replayed = 0
+        self.alerts = 0
+        self.evicted = 0
+        self.checkpoints = 0
+        self.last_checkpoint = None
+        self.errors = 0
+
+    def _collection(self, db=None):
+        db = db if db is not None else mongo.get_database()
+        return db[self.collection_name]
+
+    def _touch(self, rule_name, key):
+        keys = self._state[rule_name]
+        state = keys.get(key)
+        if state is None:
+            if len(keys) >= self.max_keys:
+                # A flood of one-off keys must not grow memory without bound
+                old_key, _ = keys.popitem(last=False)
+                self._forget(rule_name, old_key)
+                self.evicted += 1
+            state = keys[key] = KeyState([WindowCounter() for _ in self.windows], [False] * len(self.windows))
+        else:
+            keys.move_to_end(key)
+        self._dirty.add((rule_name, key))
+        self._removed.discard((rule_name, key))
+        return state
+
+    def _forget(self, rule_name, key):
+        for window in self.windows:
+            self._flagged[(rule_name, window.name)].discard(key)
+        self._dirty.discard((rule_name, key))
+        self._removed.add((rule_name, key))
+
+    def _observe(self, document, alerts):
+        epoch = _epoch(document["timestamp"])
+        self.last_event_at = max(self.last_event_at, epoch)
+        for rule in self.rules.values():
+            key = rule.key(document)
+            if key is None:
+                continue
+            state = self._touch(rule.name, key)
+            state.last_attempt = max(state.last_attempt, epoch)
+            crossed = None
+            for index, window in enumerate(self.windows):
+                counter = state.counters[index]
+                counter.add(window.bucket(epoch))
+                count = counter.expire(window.oldest_bucket(state.last_attempt))
+                if count < rule.threshold:
+                    state.alerted[index] = False
+                    continue
+                self._flagged[(rule.name, window.name)].add(key)
+                # Windows run shortest first, so the first one over the threshold sets the severity
+                if crossed is None:
+                    crossed = index
+            if crossed is not None and not state.alerted[crossed]:
+                # One event per crossing: the longer windows are over the threshold too and are covered by it,
+                # while a later burst in a shorter, more severe window still escalates
+                if alerts is not None:
+                    alerts.append(self._alert(rule, self.windows[crossed], key, state.counters[crossed].total, document))
+                for index in range(crossed, len(self.windows)):
+                    state.alerted[index] = True
+            value = document.get(rule.distinct_field)
+            if value:
+                state.add_distinct(value, epoch, self._oldest_day(state.last_attempt))
+
+    def _oldest_day(self, epoch):
+        return int((epoch - self.longest_window) // DISTINCT_BUCKET_SECONDS)
+
+    def _alert(self, rule, window, key, count, document):
+        other_field = "email" if rule.key_field == "ip_address" else "ip_address"
+        return {
+            "timestamp": datetime.utcnow(),
+            "event_type": rule.event_type,
+            "severity": window.severity,
+            "details": {
+                rule.key_field: key,
+                "failed_attempts": count,
+                "time_window_seconds": window.seconds,
+                f"last_{other_field}": document.get(other_field),
+                "source": "threat_detector",
+            },
+        }
+
+    def observe(self, documents, emit=True):
+        """Fold login log documents into the windows; returns the security events raised."""
+        alerts = [] if emit else None
+        with self._lock:
+            for document in documents:
+                self._observe(document, alerts)
+            self.events += len(documents)
+        for event in alerts or ():
+            self.alerts += 1
+            try:
+                self.emit(event)
+            except Exception as e:
+                logger.error(f"Failed to emit {event['event_type']} event: {e}")
+        return alerts or []
+
+    def on_batch(self, collection, documents):
+        """Log pipeline listener; rows up to the catch-up point are left to the startup replay."""
+        if collection != "login_logs":
+            return
+        if self._catchup_until is not None:
+            documents = [document for document in documents if document["timestamp"] > self._catchup_until]
+        if documents:
+            self.observe(documents)
+
+    def flagged(self, rule_name, window_name, now=None, distinct=False):
+        """
+        Keys currently at or over the rule's threshold in the window, most failures first.
+
+        With distinct=True each row also carries "unique", the HyperLogLog estimate of distinct
+        values of the rule's distinct field over the days the window touches, and a few "samples".
+        """
+        rule = self.rules[rule_name]
+        index = [window.name for window in self.windows].index(window_name)
+        window = self.windows[index]
+        now = now if now is not None else time.time()
+        oldest = window.oldest_bucket(now)
+        oldest_day = int((now - window.seconds) // DISTINCT_BUCKET_SECONDS)
+        rows = []
+        with self._lock:
+            flagged = self._flagged[(rule_name, window_name)]
+            for key in list(flagged):
+                state = self._state[rule_name].get(key)
+                count = state.counters[index].expire(oldest) if state is not None else 0
+                if count < rule.threshold:
+                    flagged.discard(key)
+                    if state is not None:
+                        state.alerted[index] = False
+                    continue
+                row = {"key": key, "count": count, "last_attempt": _utc(state.last_attempt)}
+                if distinct:
+                    row["unique"] = state.distinct_count(oldest_day)
+                    row["samples"] = list(state.samples)
+                rows.append(row)
+        rows.sort(key=lambda row: (-row["count"], row["key"]))
+        return rows
+
+    def _prune(self, now):
+        for rule_name, keys in self._state.items():
+            while keys:
+                key, state = next(iter(keys.items()))
+                if state.last_attempt > now - self.longest_window:
+                    break
+                del keys[key]
+                self._forget(rule_name, key)
+
+    def _snapshot(self, now):
+        with self._lock:
+            self._prune(now)
+            writes = []
+            for rule_name, key in self._dirty:
+                state = self._state[rule_name][key]
+                writes.append({
+                    "_id": f"{rule_name}:{key}",
+                    "rule": rule_name,
+                    "key": key,
+                    "windows": [list(map(list, counter.buckets)) for counter in state.counters],
+                    "alerted": list(state.alerted),
+                    "last_attempt": state.last_attempt,
+                    "distinct": {str(day): sketch.to_bytes() for day, sketch in state.distinct.items()},
+                    "samples": list(state.samples),
+                })
+            removed = [f"{rule_name}:{key}" for rule_name, key in self._removed]
+            self._dirty, self._removed = set(), set()
+            return writes, removed, self.last_event_at
+
+    def checkpoint(self, db=None, now=None):
+        """Persist the keys changed since the last checkpoint plus the newest event time seen."""
+        writes, removed, last_event_at = self._snapshot(now if now is not None else time.time())
+        operations = [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in writes]
+        operations += [DeleteOne({"_id": doc_id}) for doc_id in removed]
+        operations.append(ReplaceOne(
+            {"_id": META_ID},
+            {"_id": META_ID, "last_event_at": last_event_at, "updated_at": datetime.utcnow()},
+            upsert=True
+        ))
+        self._collection(db).bulk_write(operations, ordered=False)
+        self.checkpoints += 1
+        self.last_checkpoint = datetime.utcnow()
+        return len(writes), len(removed)
+
+    def load(self, db=None, now=None):
+        """Restore state from the last checkpoint; returns its last event time, or None without one."""
+        collection = self._collection(db)
+        meta = collection.find_one({"_id": META_ID})
+        if meta is None:
+            return None
+        now = now if now is not None else time.time()
+        with self._lock:
+            for doc in collection.find({"_id": {"$ne": META_ID}}).sort("last_attempt", 1):
+                if doc["rule"] not in self._state or len(doc["windows"]) != len(self.windows):
+                    continue
+                sketches = {int(day): HyperLogLog.from_bytes(data) for day, data in doc.get("distinct", {}).items()}
+                state = KeyState(
+                    [WindowCounter(buckets) for buckets in doc["windows"]], list(doc["alerted"]), doc["last_attempt"],
+                    # Sketches checkpointed at another precision cannot be merged; those days start over
+                    {day: sketch for day, sketch in sketches.items() if sketch.p == DISTINCT_PRECISION},
+                    list(doc.get("samples", []))
+                )
+                self._state[doc["rule"]][doc["key"]] = state
+                rule = self.rules[doc["rule"]]
+                for index, window in enumerate(self.windows):
+                    if state.counters[index].expire(window.oldest_bucket(now)) >= rule.threshold:
+                        self._flagged[(rule.name, window.name)].add(doc["key"])
+            self.last_event_at = max(self.last_event_at, meta["last_event_at"])
+        return meta["last_event_at"]
+
+    def catch_up(self, since, until, db=None):
+        """Replay failed logins written between the checkpoint and startup, without raising events again."""
+        db = db if db is not None else mongo.get_database()
+        cursor = db.login_logs.find(
+            {"status": "failed", "timestamp": {"$gt": since, "$lte": until}},
+            {"email": 1, "ip_address": 1, "status": 1, "reason": 1, "timestamp": 1}
+        ).sort("timestamp", 1).batch_size(5000)
+        batch = []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) >= 5000:
+                self.observe(batch, emit=False)
+                self.replayed += len(batch)
+                batch = []
+        if batch:
+            self.observe(batch, emit=False)
+            self.replayed += len(batch)
+
+    def restore(self, until=None, db=None):
+        """Load the checkpoint and replay the gap after it; with no checkpoint, replay the longest window."""
+        until = until or datetime.utcnow()
+        last_event_at = self.load(db, _epoch(until))
+        since = _utc(last_event_at) if last_event_at else until - timedelta(seconds=self.longest_window)
+        self.catch_up(since, until, db)
+        self.ready = True
+        logger.info(f"Threat detector restored (checkpoint: {last_event_at is not None}, replayed {self.replayed} rows)")
+
+    async def _run(self):
+        try:
+            await run_db(self.restore, self._catchup_until)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Threat detector restore failed, active threats fall back to aggregation: {e}")
+            return
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                await run_db(self.checkpoint)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Threat detector checkpoint failed: {e}")
+
+    def start(self):
+        if self._task is not None:
+            return
+        # Rows up to this point come from the replay, later ones from the log pipeline listener
+        self._catchup_until = datetime.utcnow()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.ready:
+            try:
+                await run_db(self.checkpoint)
+            except Exception as e:
+                logger.error(f"Final threat detector checkpoint failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            sketch_bytes = sum(
+                sketch.size_bytes() for keys in self._state.values() for state in keys.values() for sketch in state.distinct.values()
+            )
+        return {
+            "ready": self.ready,
+            "keys": {name: len(keys) for name, keys in self._state.items()},
+            "flagged": {f"{rule}.{window}": len(keys) for (rule, window), keys in self._flagged.items()},
+            "events": self.events,
+            "replayed": self.replayed,
+            "alerts": self.alerts,
+            "evicted": self.evicted,
+            "distinct_sketch_bytes": sketch_bytes,
+            "checkpoints": self.checkpoints,
+            "last_checkpoint": str(self.last_checkpoint) if self.last_checkpoint else None,
+            "errors": self.errors,
+        }
+
+
+# Create a single instance
+threat_detector = ThreatDetector()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or checkpoint the CyberShield-AI threat detector")
+    parser.add_argument("command", choices=["checkpoint", "show"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    # Rebuild from the stored checkpoint and the rows written since
+    threat_detector.restore()
+    if args.command == "checkpoint":
+        written, removed = threat_detector.checkpoint()
+        print(f"Checkpointed {written} keys, removed {removed}")
+    result = {
+        f"{rule}.{window.name}": threat_detector.flagged(rule, window.name)
+        for rule in threat_detector.rules for window in threat_detector.windows
+    }
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
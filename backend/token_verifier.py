@@ -0,0 +1,207 @@
+"""
+Token verifier module for CyberShield-AI.
+Verifies Firebase ID tokens against cached Google signing keys and remembers verified tokens until they expire.
+"""
+
+from firebase_admin import auth
+from google.auth import jwt as google_jwt
+from response_cache import InMemoryCacheBackend
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import requests
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger("token_verifier")
+
+FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def _project_id_from_credentials():
+    path = os.environ.get("FIREBASE_CREDENTIALS")
+    if not path:
+        return None
+    try:
+        with open(path, encoding="utf-8") as credentials_file:
+            return json.load(credentials_file).get("project_id")
+    except (OSError, ValueError):
+        return None
+
+
+class TokenVerifier:
+    """Firebase ID-token checks with a Cache-Control-aware key cache and a verified-token cache."""
+
+    def __init__(self, project_id=None, keys_file=None):
+        self.project_id = project_id or os.environ.get("FIREBASE_PROJECT_ID") or _project_id_from_credentials()
+        # A local {kid: PEM certificate} file replaces Google's endpoint, e.g. for offline tests
+        self.keys_file = keys_file or os.environ.get("FIREBASE_KEYS_FILE")
+        self.certs_url = os.environ.get("FIREBASE_CERTS_URL", FIREBASE_CERTS_URL)
+        self.refresh_margin = float(os.environ.get("FIREBASE_KEYS_REFRESH_MARGIN_SECONDS", "300"))
+        self.fallback_max_age = float(os.environ.get("FIREBASE_KEYS_DEFAULT_MAX_AGE_SECONDS", "3600"))
+        self.min_refresh_interval = float(os.environ.get("FIREBASE_KEYS_MIN_REFRESH_SECONDS", "60"))
+        self.clock_skew = int(os.environ.get("FIREBASE_CLOCK_SKEW_SECONDS", "10"))
+        self.tokens = InMemoryCacheBackend(int(os.environ.get("FIREBASE_TOKEN_CACHE_MAX_ENTRIES", "10000")))
+        self._keys = {}
+        self._keys_expire_at = 0.0
+        self._keys_fetched_at = 0.0
+        self._keys_lock = threading.Lock()
+        self._task = None
+        self.key_fetches = 0
+        self.key_fetch_errors = 0
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def _fetch_keys(self):
+        if self.keys_file:
+            with open(self.keys_file, encoding="utf-8") as keys_file:
+                return json.load(keys_file), float("inf")
+        response = requests.get(self.certs_url, timeout=10)
+        response.raise_for_status()
+        match = _MAX_AGE.search(response.headers.get("Cache-Control", ""))
+        max_age = float(match.group(1)) if match else self.fallback_max_age
+        return response.json(), time.time() + max_age
+
+    def refresh_keys(self):
+        """Fetch the key set now; the previous keys keep serving if the fetch fails."""
+        with self._keys_lock:
+            try:
+                keys, expires_at = self._fetch_keys()
+            except Exception as e:
+                self.key_fetch_errors += 1
+                logger.error(f"Failed to fetch Firebase signing keys: {e}")
+                if not self._keys:
+                    raise
+                return self._keys
+            self._keys = keys
+            self._keys_expire_at = expires_at
+            self._keys_fetched_at = time.time()
+            self.key_fetches += 1
+            logger.info(f"Loaded {len(keys)} Firebase signing keys")
+            return keys
+
+    def keys(self, kid=None):
+        keys = self._keys
+        now = time.time()
+        # An unknown kid usually means Google rotated keys early, but forged tokens must not trigger a fetch each
+        rotated = kid is not None and kid not in keys and now - self._keys_fetched_at >= self.min_refresh_interval
+        if not keys or now >= self._keys_expire_at or rotated:
+            keys = self.refresh_keys()
+        return keys
+
+    async def _refresh_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self._keys_expire_at - self.refresh_margin - time.time()
+            await asyncio.sleep(min(max(delay, 30.0), 86400.0))
+            await loop.run_in_executor(None, self.refresh_keys)
+
+    def start(self):
+        """Prefetch the keys so the first phone login does not wait on Google, then keep them fresh."""
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+
+        async def prefetch_then_refresh():
+            try:
+                await loop.run_in_executor(None, self.refresh_keys)
+            except Exception:
+                pass
+            await self._refresh_loop()
+
+        self._task = loop.create_task(prefetch_then_refresh())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _check_claims(self, header, claims, now):
+        if header.get("alg") != "RS256":
+            raise auth.InvalidIdTokenError("ID token must be signed with RS256")
+        if not header.get("kid"):
+            raise auth.InvalidIdTokenError("ID token has no key id")
+        if not self.project_id:
+            raise auth.InvalidIdTokenError("Firebase project id is not configured")
+        if claims.get("aud") != self.project_id:
+            raise auth.InvalidIdTokenError("ID token has an incorrect audience")
+        if claims.get("iss") != f"https://securetoken.google.com/{self.project_id}":
+            raise auth.InvalidIdTokenError("ID token has an incorrect issuer")
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise auth.InvalidIdTokenError("ID token has an invalid subject")
+        if claims.get("exp", 0) < now - self.clock_skew:
+            raise auth.ExpiredIdTokenError("ID token has expired", None)
+        if claims.get("iat", 0) > now + self.clock_skew or claims.get("auth_time", 0) > now + self.clock_skew:
+            raise auth.InvalidIdTokenError("ID token was issued in the future")
+
+    def verify_sync(self, id_token):
+        """Return the decoded claims (with uid) or raise InvalidIdTokenError / ExpiredIdTokenError."""
+        now = time.time()
+        key = hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+        entry = self.tokens.get(key, now)
+        if entry is not None:
+            self.hits += 1
+            return dict(entry["value"])
+        self.misses += 1
+
+        try:
+            try:
+                header = google_jwt.decode_header(id_token)
+                claims = google_jwt.decode(id_token, verify=False)
+            except Exception as e:
+                raise auth.InvalidIdTokenError(f"Malformed ID token: {e}", cause=e)
+            # Cheap claim checks first; the RSA signature check only runs for plausible tokens
+            self._check_claims(header, claims, now)
+            certs = self.keys(header["kid"])
+            if header["kid"] not in certs:
+                raise auth.InvalidIdTokenError("ID token was signed with an unknown key")
+            try:
+                google_jwt.decode(id_token, certs={header["kid"]: certs[header["kid"]]}, audience=self.project_id,
+                                  clock_skew_in_seconds=self.clock_skew)
+            except Exception as e:
+                raise auth.InvalidIdTokenError(f"ID token signature check failed: {e}", cause=e)
+        except auth.InvalidIdTokenError:
+            self.failures += 1
+            raise
+
+        claims["uid"] = claims["sub"]
+        self.tokens.set(key, {"value": claims, "expires_at": claims["exp"]})
+        return dict(claims)
+
+    async def verify(self, id_token):
+        now = time.time()
+        entry = self.tokens.get(hashlib.sha256(id_token.encode("utf-8")).hexdigest(), now)
+        if entry is not None:
+            self.hits += 1
+            return dict(entry["value"])
+        # Misses may block on a key fetch or an RSA check, so keep them off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, self.verify_sync, id_token)
+
+    def stats(self):
+        return {
+            "project_id": self.project_id,
+            "key_source": self.keys_file or self.certs_url,
+            "keys": len(self._keys),
+            "keys_expire_in_seconds": round(self._keys_expire_at - time.time()) if 0 < self._keys_expire_at < float("inf") else None,
+            "key_fetches": self.key_fetches,
+            "key_fetch_errors": self.key_fetch_errors,
+            "cached_tokens": self.tokens.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+        }
+
+
+# Create a single instance
+token_verifier = TokenVerifier()
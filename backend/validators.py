@@ -1,148 +1,244 @@
-"""Advanced validation utilities for CyberShield-AI."""
+"""Advanced validation utilities for CyberShield-AI.
+
+Patterns are compiled once at import, password strength is scored in one pass over
+the characters, and the check_* helpers return an error message instead of raising
+so bulk imports can validate thousands of values without exception overhead.
+"""
 
 import re
 from fastapi import HTTPException
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
+import string
+
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+INDIAN_PHONE_PATTERN = re.compile(r"\+91[6-9]\d{9}")
+_NON_DIGITS = re.compile(r"\D")
+
+# Registration is limited to these domains; listed in the order shown to users
+ALLOWED_EMAIL_DOMAINS_ORDERED = ("gmail.com", "yahoo.com", "charusat.edu.in", "charusat.ac.in")
+ALLOWED_EMAIL_DOMAINS = frozenset(ALLOWED_EMAIL_DOMAINS_ORDERED)
+
+_LOWER = frozenset(string.ascii_lowercase)
+_UPPER = frozenset(string.ascii_uppercase)
+_DIGITS = frozenset(string.digits)
+_HAS_LOWER, _HAS_UPPER, _HAS_DIGIT, _HAS_SPECIAL = 1, 2, 4, 8
+_ALL_CLASSES = _HAS_LOWER | _HAS_UPPER | _HAS_DIGIT | _HAS_SPECIAL
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def email_domain(email: str) -> Optional[str]:
+    """Domain part of an email address, or None when there is no '@'."""
+    _, at, domain = email.rpartition("@")
+    return domain if at else None
+
+
+def check_email(email: str, allowed_domains: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Check email format and domain without raising.
+
+    Args:
+        email: Email address to check
+        allowed_domains: Allowed domains; pass a frozenset for constant-time lookups
+
+    Returns:
+        Optional[str]: Error message, or None if the email is valid
+    """
+    if not email:
+        return "Email cannot be empty"
+    email = normalize_email(email)
+    if not EMAIL_PATTERN.fullmatch(email):
+        return "Invalid email format"
+    if allowed_domains and email_domain(email) not in allowed_domains:
+        listed = sorted(allowed_domains) if isinstance(allowed_domains, (set, frozenset)) else allowed_domains
+        return f"Invalid email domain. Please use one of: {', '.join(listed)}"
+    return None
+
 
 def validate_email(email: str, allowed_domains: Optional[List[str]] = None) -> bool:
     """
     Validate email format and domain.
-    
+
     Args:
         email: Email address to validate
         allowed_domains: List of allowed domains
-        
+
     Returns:
         bool: True if email is valid
-        
+
     Raises:
         HTTPException: If email is invalid
     """
-    if not email:
-        raise HTTPException(status_code=400, detail="Email cannot be empty")
-        
-    # Normalize email
-    email = email.strip().lower()
-    
-    # Check basic email format
-    email_pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-    if not re.match(email_pattern, email):
-        raise HTTPException(status_code=400, detail="Invalid email format")
-    
-    # Check domain if allowed domains specified
-    if allowed_domains:
-        try:
-            domain = email.split('@')[1]
-            if domain not in allowed_domains:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Invalid email domain. Please use one of: {', '.join(allowed_domains)}"
-                )
-        except IndexError:
-            raise HTTPException(status_code=400, detail="Invalid email format")
-    
+    error = check_email(email, allowed_domains)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
     return True
 
+
+def evaluate_password_strength(password: str) -> int:
+    """
+    Evaluate password strength on a scale of 0-4.
+
+    Criteria:
+    - Length >= 8 characters: +1
+    - Contains both uppercase and lowercase: +1
+    - Contains digits: +1
+    - Contains special characters: +1
+
+    Args:
+        password: Password to evaluate
+
+    Returns:
+        int: Strength score (0-4)
+    """
+    classes = 0
+    # One scan classifies every character; stop as soon as all four classes are seen
+    for ch in password:
+        if ch in _LOWER:
+            classes |= _HAS_LOWER
+        elif ch in _UPPER:
+            classes |= _HAS_UPPER
+        elif ch in _DIGITS:
+            classes |= _HAS_DIGIT
+        else:
+            classes |= _HAS_SPECIAL
+        if classes == _ALL_CLASSES:
+            break
+
+    strength = 1 if len(password) >= 8 else 0
+    if classes & _HAS_LOWER and classes & _HAS_UPPER:
+        strength += 1
+    if classes & _HAS_DIGIT:
+        strength += 1
+    if classes & _HAS_SPECIAL:
+        strength += 1
+    return strength
+
+
+def check_password(password: str, min_length: int = 8, max_length: int = 64, min_strength: int = 3) -> Optional[str]:
+    """
+    Check length and strength requirements without raising.
+
+    Returns:
+        Optional[str]: Error message, or None if the password is acceptable
+    """
+    if not password:
+        return "Password cannot be empty"
+    if len(password) < min_length:
+        return f"Password must be at least {min_length} characters"
+    if len(password) > max_length:
+        return f"Password must be at most {max_length} characters"
+    strength = evaluate_password_strength(password)
+    if strength < min_strength:
+        return f"Password is too weak (score: {strength}/4). Please include uppercase, lowercase, numbers, and special characters."
+    return None
+
+
 def validate_password(
-    password: str, 
-    min_length: int = 8, 
+    password: str,
+    min_length: int = 8,
     max_length: int = 64,
     min_strength: int = 3
 ) -> bool:
     """
     Validate password meets security requirements.
-    
+
     Args:
         password: Password to validate
         min_length: Minimum length required
         max_length: Maximum length allowed
         min_strength: Minimum strength score required
-        
+
     Returns:
         bool: True if password is valid
-        
+
     Raises:
         HTTPException: If password fails validation
     """
-    if not password:
-        raise HTTPException(status_code=400, detail="Password cannot be empty")
-        
-    # Check length
-    if len(password) < min_length:
-        raise HTTPException(status_code=400, detail=f"Password must be at least {min_length} characters")
-    
-    if len(password) > max_length:
-        raise HTTPException(status_code=400, detail=f"Password must be at most {max_length} characters")
-    
-    # Evaluate strength
-    strength = evaluate_password_strength(password)
-    
-    # Check if meets minimum strength
-    if strength < min_strength:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Password is too weak (score: {strength}/4). Please include uppercase, lowercase, numbers, and special characters."
-        )
-    
+    error = check_password(password, min_length, max_length, min_strength)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
     return True
 
-def evaluate_password_strength(password: str) -> int:
+
+def is_valid_indian_phone(phone: str) -> bool:
+    """Validate Indian phone number format (+91XXXXXXXXXX)"""
+    return INDIAN_PHONE_PATTERN.fullmatch(phone) is not None
+
+
+def check_phone(phone: str) -> Optional[str]:
     """
-    Evaluate password strength on a scale of 0-4.
-    
-    Criteria:
-    - Length >= 8 characters: +1
-    - Contains both uppercase and lowercase: +1
-    - Contains digits: +1
-    - Contains special characters: +1
-    
-    Args:
-        password: Password to evaluate
-        
+    Check that a phone number has 10-15 digits without raising.
+
     Returns:
-        int: Strength score (0-4)
+        Optional[str]: Error message, or None if the number is valid
     """
-    strength = 0
-    
-    # Length check
-    if len(password) >= 8:
-        strength += 1
-    
-    # Case check (both upper and lower)
-    if re.search(r"[a-z]", password) and re.search(r"[A-Z]", password):
-        strength += 1
-    
-    # Digit check
-    if re.search(r"[0-9]", password):
-        strength += 1
-    
-    # Special character check
-    if re.search(r"[^a-zA-Z0-9]", password):
-        strength += 1
-    
-    return strength
+    if not phone:
+        return "Phone number cannot be empty"
+    digits = _NON_DIGITS.sub("", phone)
+    if len(digits) < 10 or len(digits) > 15:
+        return "Phone number must be between 10 and 15 digits"
+    return None
+
 
 def validate_phone(phone: str) -> bool:
     """
     Validate phone number format.
-    
+
     Args:
         phone: Phone number to validate
-        
+
     Returns:
         bool: True if phone number is valid
-        
+
     Raises:
         HTTPException: If phone number is invalid
     """
-    if not phone:
-        raise HTTPException(status_code=400, detail="Phone number cannot be empty")
-    
-    # Remove any non-digit characters
-    phone_digits = re.sub(r'\D', '', phone)
-    
-    # Check length
-    if len(phone_digits) < 10 or len(phone_digits) > 15:
-        raise HTTPException(status_code=400, detail="Phone number must be between 10 and 15 digits")
-    
-    return True
\ No newline at end of file
+    error = check_phone(phone)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    return True
+
+
+def validate_emails(emails: Iterable[str], allowed_domains: Optional[Iterable[str]] = ALLOWED_EMAIL_DOMAINS) -> List[Dict]:
+    """
+    Validate many emails at once, e.g. for a bulk user import.
+
+    Args:
+        emails: Email addresses to validate
+        allowed_domains: Allowed domains, or None to accept any domain
+
+    Returns:
+        List[Dict]: One {"value", "valid", "error"} entry per input, in order; value is normalized
+    """
+    if allowed_domains is not None and not isinstance(allowed_domains, frozenset):
+        allowed_domains = frozenset(allowed_domains)
+    results = []
+    for email in emails:
+        error = check_email(email, allowed_domains)
+        results.append({"value": normalize_email(email) if email else email, "valid": error is None, "error": error})
+    return results
+
+
+def validate_phones(phones: Iterable[str], indian_format: bool = True) -> List[Dict]:
+    """
+    Validate many phone numbers at once.
+
+    Args:
+        phones: Phone numbers to validate
+        indian_format: Require +91XXXXXXXXXX instead of any 10-15 digit number
+
+    Returns:
+        List[Dict]: One {"value", "valid", "error"} entry per input, in order
+    """
+    results = []
+    for phone in phones:
+        phone = phone.strip() if phone else phone
+        if indian_format:
+            error = None if phone and is_valid_indian_phone(phone) else "Invalid phone number format. Use Indian format (+91XXXXXXXXXX)."
+        else:
+            error = check_phone(phone)
+        results.append({"value": phone, "valid": error is None, "error": error})
+    return results